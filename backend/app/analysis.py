@@ -0,0 +1,139 @@
+"""
+Analysis pipeline orchestration: PDF → facts → verification → report.
+"""
+import asyncio
+from pathlib import Path
+from typing import Callable
+
+from app.config import EXTRACTION_RULES, GROUNDING_ENABLED
+from app.schemas import AnalysisReport
+from app.reports import save_report
+from app import catalog, metrics
+from app.pipeline.pdf_processor import process_pdf
+from app.pipeline.gemini_analyzer import (
+    FIELD_NAMES, extract_facts_from_text, extract_facts_from_images, merge_facts,
+)
+from app.pipeline.rule_extractor import extract_facts as extract_rule_facts, missing_fields, can_skip_llm
+from app.pipeline.relevance import select_pages
+from app.pipeline.grounding import ground_facts
+from app.pipeline.verification import run_verification
+
+# Pipeline stages, in execution order (reported as job progress)
+STAGES = ["ingest", "extract", "ground", "verify", "save"]
+
+
+async def run_analysis(
+    source: bytes | Path,
+    filename: str,
+    doc_id: str | None = None,
+    on_stage: Callable[[str], None] | None = None,
+    ingest_in_pool: bool = False,
+    sha256: str | None = None
+) -> AnalysisReport:
+    """
+    Run the full analysis chain and save the report to UPLOAD_DIR/<doc_id>/report.json.
+    `source` is the PDF bytes or a streamed upload file (moved into the document directory).
+    `on_stage` is called with the stage name when each stage starts.
+    `ingest_in_pool` extracts text in the PDF process pool (batch mode).
+    """
+    def stage(name: str):
+        if on_stage:
+            on_stage(name)
+
+    try:
+        with metrics.collect_timings() as timings:
+            with metrics.span("analysis"):
+                report = await _analyze(source, filename, doc_id, stage, ingest_in_pool, sha256)
+        if timings is not None:
+            report.timings = timings.summary()
+
+        # Save report
+        stage("save")
+        with metrics.span("report.save"):
+            await asyncio.to_thread(save_report, report)
+            await asyncio.to_thread(catalog.index_report, report)
+    except Exception:
+        metrics.count("analyses_total", status="failed")
+        raise
+    metrics.count("analyses_total", status="done")
+    return report
+
+
+async def _analyze(
+    source: bytes | Path,
+    filename: str,
+    doc_id: str | None,
+    stage: Callable[[str], None],
+    ingest_in_pool: bool,
+    sha256: str | None
+) -> AnalysisReport:
+    """Ingest, extract, ground and verify; the report is returned unsaved."""
+    # Process PDF (CPU-bound PyMuPDF work runs off the event loop)
+    stage("ingest")
+    with metrics.span("pdf.ingest"):
+        doc_meta, page_info, page_texts = await asyncio.to_thread(
+            process_pdf, source, filename, doc_id, ingest_in_pool, sha256
+        )
+
+    # Route per page: pages with a text layer go to the text path (only the most
+    # PV-relevant ones), the rest to vision (image-only pages cannot be scored)
+    all_text_pages = [p for p in page_info if p.has_text]
+    text_pages = select_pages(all_text_pages)
+    image_pages = [p for p in page_info if not p.has_text]
+
+    stage("extract")
+
+    # Local rules first; Gemini only gets the fields they did not find confidently
+    rule_facts, llm_fields = [], None
+    if EXTRACTION_RULES != "off" and all_text_pages:
+        with metrics.span("extract.rules"):
+            rule_facts = await asyncio.to_thread(
+                extract_rule_facts,
+                [page_texts[p.page_no - 1] for p in all_text_pages],
+                [p.page_no for p in all_text_pages]
+            )
+        llm_fields = missing_fields(rule_facts, FIELD_NAMES)
+        if can_skip_llm(rule_facts) or not llm_fields:
+            text_pages = []  # required fields found: skip the text LLM call
+        if not llm_fields:
+            image_pages = []  # every field found
+    for p in text_pages + image_pages:
+        p.sent_to_llm = True
+
+    # Extract facts (both paths run concurrently)
+    text_task = extract_facts_from_text(
+        [page_texts[p.page_no - 1] for p in text_pages],
+        page_nos=[p.page_no for p in text_pages],
+        fields=llm_fields
+    ) if text_pages else asyncio.sleep(0, [])
+    image_task = extract_facts_from_images(
+        doc_meta.doc_id, image_pages, fields=llm_fields
+    ) if image_pages else asyncio.sleep(0, [])
+    text_facts, image_facts = await asyncio.gather(text_task, image_task)
+
+    # If text extraction failed, try the text pages as images too
+    if not text_facts and text_pages and not rule_facts:
+        metrics.count("external_retries_total", service="gemini", reason="text_as_images")
+        image_facts = merge_facts([image_facts, await extract_facts_from_images(doc_meta.doc_id, text_pages)])
+
+    facts = merge_facts([rule_facts, text_facts, image_facts])
+
+    # Check evidence snippets against the document text
+    stage("ground")
+    if GROUNDING_ENABLED:
+        with metrics.span("ground"):
+            facts = await asyncio.to_thread(ground_facts, doc_meta.doc_id, facts)
+
+    # Run verification
+    stage("verify")
+    with metrics.span("verify"):
+        verifications, flags, scorecard = await run_verification(facts)
+
+    return AnalysisReport(
+        document=doc_meta,
+        page_info=page_info,
+        facts=facts,
+        verifications=verifications,
+        red_flags=flags,
+        scorecard=scorecard
+    )
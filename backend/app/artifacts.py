@@ -0,0 +1,39 @@
+"""
+Content-addressed artifact index: sha256 of an uploaded PDF → doc_id.
+
+Re-uploading identical bytes reuses the stored pages, text and report of the
+earlier analysis instead of running the pipeline again.
+"""
+import json
+import os
+
+from app.config import UPLOAD_DIR
+
+INDEX_DIR = UPLOAD_DIR / "_index" / "sha256"
+
+
+def _index_path(sha256: str):
+    return INDEX_DIR / f"{sha256}.json"
+
+
+def lookup(sha256: str) -> str | None:
+    """Return the doc_id of a finished analysis of these bytes, if any."""
+    path = _index_path(sha256)
+    if not path.exists():
+        return None
+    try:
+        doc_id = json.loads(path.read_text(encoding="utf-8"))["doc_id"]
+    except Exception:
+        return None
+    if not (UPLOAD_DIR / doc_id / "report.json").exists():
+        return None
+    return doc_id
+
+
+def register(sha256: str, doc_id: str):
+    """Point sha256 at doc_id (atomic replace, last analysis wins)."""
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    path = _index_path(sha256)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({"doc_id": doc_id}), encoding="utf-8")
+    os.replace(tmp, path)
@@ -0,0 +1,288 @@
+"""
+Batch analysis: many PDFs (or ZIP archives of PDFs) in one request.
+
+Documents run as ordinary analysis jobs (see jobs.py), so batches share the
+worker pool and queue with single uploads: at most BATCH_CONCURRENCY
+documents of a batch are queued or running at once, each waiting for a free
+queue slot, and a batch is refused (503) while the queue is full. Batch jobs
+extract text in the PDF process pool.
+
+The manifest is returned immediately and kept up to date in memory and in
+UPLOAD_DIR/_batches/<batch_id>.json.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import zipfile
+import zlib
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+
+from fastapi import UploadFile
+
+from app.config import UPLOAD_DIR, BATCH_CONCURRENCY, BATCH_MAX_FILES, BATCH_MAX_MB
+from app.schemas import AnalysisReport, BatchDocument, BatchManifest
+from app.jobs import job_manager
+from app.uploads import (
+    CHUNK_BYTES, MAGIC_WINDOW, MAX_UPLOAD_BYTES, PDF_MAGIC, StoredUpload, UploadError, discard, incoming_path,
+    save_archive, save_upload,
+)
+
+BATCH_DIR = UPLOAD_DIR / "_batches"
+MAX_PDF_BYTES = MAX_UPLOAD_BYTES
+MAX_ZIP_BYTES = 200 * 1024 * 1024
+MAX_BATCH_BYTES = BATCH_MAX_MB * 1024 * 1024  # all PDFs of a batch, ZIP members included
+
+logger = logging.getLogger(__name__)
+
+
+class BatchError(ValueError):
+    """Invalid batch upload (wrong type, too large, too many files)."""
+
+
+def _extract(archive: zipfile.ZipFile, info: zipfile.ZipInfo, label: str) -> StoredUpload:
+    """
+    Copy one archive member to INCOMING_DIR in chunks (never more than its declared
+    size), checking the PDF signature like direct uploads.
+    """
+    path = incoming_path()
+    sha = hashlib.sha256()
+    size = 0
+    head = b""
+    try:
+        with archive.open(info) as src, open(path, "wb") as out:
+            while chunk := src.read(CHUNK_BYTES):
+                size += len(chunk)
+                if size > info.file_size:
+                    raise BatchError(f"{label}: size does not match the archive directory")
+                if len(head) < MAGIC_WINDOW:
+                    head += chunk[:MAGIC_WINDOW - len(head)]
+                    if len(head) >= MAGIC_WINDOW and PDF_MAGIC not in head:
+                        raise BatchError(f"{label}: not a PDF file")
+                sha.update(chunk)
+                out.write(chunk)
+        if PDF_MAGIC not in head:
+            raise BatchError(f"{label}: not a PDF file")
+    except BaseException:
+        discard(path)
+        raise
+    return StoredUpload(path, sha.hexdigest(), size)
+
+
+def _pdfs_from_zip(name: str, path: Path, max_files: int, max_bytes: int) -> list[tuple[str, StoredUpload]]:
+    """
+    PDF members of a ZIP archive, extracted to INCOMING_DIR. Sizes are checked
+    against the limits before anything is decompressed.
+    """
+    pdfs = []
+    try:
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                member = PurePosixPath(info.filename)
+                if info.is_dir() or member.suffix.lower() != ".pdf" or "__MACOSX" in member.parts:
+                    continue
+                if len(pdfs) >= max_files:
+                    raise BatchError(f"Too many files (max {BATCH_MAX_FILES})")
+                if info.file_size > MAX_PDF_BYTES:
+                    raise BatchError(f"{name}/{info.filename}: file too large (max {MAX_PDF_BYTES // 2**20}MB)")
+                max_bytes -= info.file_size
+                if max_bytes < 0:
+                    raise BatchError(f"Batch too large (max {BATCH_MAX_MB}MB of PDFs)")
+                pdfs.append((member.name, _extract(archive, info, f"{name}/{info.filename}")))
+    except (zipfile.BadZipFile, zlib.error, EOFError):
+        _discard_all(pdfs)
+        raise BatchError(f"{name}: not a valid ZIP archive")
+    except BaseException:
+        _discard_all(pdfs)
+        raise
+    return pdfs
+
+
+def _discard_all(pdfs: list[tuple[str, StoredUpload]]):
+    for _, upload in pdfs:
+        discard(upload.path)
+
+
+async def save_uploads(files: list[UploadFile]) -> list[tuple[str, StoredUpload]]:
+    """
+    Stream uploaded PDFs and ZIP archives of PDFs to disk as (filename, upload)
+    PDFs. Raises BatchError (nothing is left behind on disk).
+    """
+    pdfs: list[tuple[str, StoredUpload]] = []
+    try:
+        for file in files:
+            name = file.filename or ""
+            lower = name.lower()
+            used = sum(upload.size for _, upload in pdfs)
+            try:
+                if lower.endswith(".pdf"):
+                    pdfs.append((name, await save_upload(file, MAX_PDF_BYTES)))
+                elif lower.endswith(".zip"):
+                    archive = await save_archive(file, MAX_ZIP_BYTES)
+                    try:
+                        pdfs.extend(await asyncio.to_thread(
+                            _pdfs_from_zip, name, archive.path, BATCH_MAX_FILES - len(pdfs), MAX_BATCH_BYTES - used
+                        ))
+                    finally:
+                        discard(archive.path)
+                else:
+                    raise BatchError(f"{name}: only PDF and ZIP files supported")
+            except UploadError as e:
+                raise BatchError(f"{name}: {e}")
+
+            if len(pdfs) > BATCH_MAX_FILES:
+                raise BatchError(f"Too many files ({len(pdfs)}, max {BATCH_MAX_FILES})")
+            if sum(upload.size for _, upload in pdfs) > MAX_BATCH_BYTES:
+                raise BatchError(f"Batch too large (max {BATCH_MAX_MB}MB of PDFs)")
+
+        if not pdfs:
+            raise BatchError("No PDF files in upload")
+    except BaseException:
+        _discard_all(pdfs)
+        raise
+    return pdfs
+
+
+class BatchRunner:
+    """Runs batches as background tasks and tracks their manifests."""
+
+    def __init__(self, concurrency: int = BATCH_CONCURRENCY):
+        self.concurrency = concurrency
+        self._batches: dict[str, BatchManifest] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def start(self, pdfs: list[tuple[str, StoredUpload]], force: bool = False) -> BatchManifest:
+        """Create the manifest and start processing in the background (the batch owns the files)."""
+        created_at = datetime.now()
+        digest = hashlib.sha256("".join(upload.sha256 for _, upload in pdfs).encode()).hexdigest()
+        batch_id = f"BATCH-{created_at.strftime('%Y%m%d%H%M%S')}-{digest[:6]}"
+
+        manifest = BatchManifest(
+            batch_id=batch_id,
+            status="RUNNING",
+            created_at=created_at,
+            documents=[BatchDocument(filename=name) for name, _ in pdfs]
+        )
+        self._batches[batch_id] = manifest
+        task = asyncio.create_task(self._run(manifest, pdfs, force))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return manifest.model_copy(deep=True)
+
+    def get(self, batch_id: str) -> BatchManifest | None:
+        """Manifest of a running batch (see load() for finished ones)."""
+        manifest = self._batches.get(batch_id)
+        return manifest.model_copy(deep=True) if manifest is not None else None
+
+    @staticmethod
+    def load(batch_id: str) -> BatchManifest | None:
+        """Saved manifest (blocking file read)."""
+        path = BATCH_DIR / f"{batch_id}.json"
+        if path.exists():
+            return BatchManifest.model_validate_json(path.read_bytes())
+        return None
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, manifest: BatchManifest, pdfs: list[tuple[str, StoredUpload]], force: bool):
+        t0 = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        by_sha: dict[str, tuple[BatchDocument, asyncio.Task]] = {}  # identical files in a batch run once
+
+        async def run_one(entry: BatchDocument, upload: StoredUpload):
+            async with semaphore:
+                await self._analyze(entry, upload, force)
+            await self._save(manifest)
+
+        async def follow(entry: BatchDocument, first: BatchDocument, task: asyncio.Task):
+            await asyncio.shield(task)
+            entry.doc_id, entry.report_url, entry.traffic_light = first.doc_id, first.report_url, first.traffic_light
+            entry.status = "REUSED" if first.status in ("DONE", "REUSED") else first.status
+            entry.error = first.error
+
+        runs: list[asyncio.Task] = []
+        try:
+            await self._save(manifest)
+            for entry, (_, upload) in zip(manifest.documents, pdfs):
+                if upload.sha256 in by_sha:
+                    discard(upload.path)
+                    first_entry, first_task = by_sha[upload.sha256]
+                    runs.append(asyncio.create_task(follow(entry, first_entry, first_task)))
+                    continue
+                task = asyncio.create_task(run_one(entry, upload))
+                by_sha[upload.sha256] = (entry, task)
+                runs.append(task)
+            await asyncio.gather(*runs)
+            manifest.status = "DONE"
+        except BaseException as e:
+            # Never leave a RUNNING manifest behind (also on shutdown)
+            for task in runs:
+                task.cancel()
+            manifest.status = "FAILED"
+            for entry in manifest.documents:
+                if entry.status in ("PENDING", "RUNNING"):
+                    entry.status = "FAILED"
+                    entry.error = entry.error or "Batch aborted"
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            logger.exception("Batch %s failed", manifest.batch_id)
+        finally:
+            _discard_all(pdfs)  # analyzed files were moved away already
+            manifest.finished_at = datetime.now()
+            manifest.wall_ms = round((time.perf_counter() - t0) * 1000, 1)
+            for entry in manifest.documents:
+                manifest.counts[entry.status] = manifest.counts.get(entry.status, 0) + 1
+                for stage, ms in entry.timings_ms.items():
+                    manifest.stage_totals_ms[stage] = round(manifest.stage_totals_ms.get(stage, 0.0) + ms, 1)
+            await self._save(manifest)
+            self._batches.pop(manifest.batch_id, None)
+
+    async def _analyze(self, entry: BatchDocument, upload: StoredUpload, force: bool):
+        """Analyze one document as a job (or reuse an earlier report of the same bytes)."""
+        t0 = time.perf_counter()
+        job = await job_manager.submit_wait(upload, entry.filename, force=force, ingest_in_pool=True)
+        entry.status = "RUNNING"
+        entry.doc_id = job.doc_id
+        try:
+            report = await job_manager.wait(job.job_id)
+        except RuntimeError as e:
+            entry.status = "FAILED"
+            entry.error = str(e)
+            report = None
+        finished = None if job.reused else job_manager.get(job.job_id)
+        if finished is not None:
+            entry.timings_ms = {st.name: st.duration_ms for st in finished.stages if st.duration_ms is not None}
+        if report is None:
+            entry.total_ms = round((time.perf_counter() - t0) * 1000, 1)
+            return
+        self._finish(entry, report, "REUSED" if job.reused else "DONE", t0)
+
+    @staticmethod
+    def _finish(entry: BatchDocument, report: AnalysisReport, status: str, t0: float):
+        entry.status = status
+        entry.doc_id = report.document.doc_id
+        entry.report_url = f"/api/reports/{report.document.doc_id}"
+        entry.traffic_light = report.scorecard.traffic_light
+        entry.total_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+    @staticmethod
+    async def _save(manifest: BatchManifest):
+        """Snapshot the manifest on the loop, write it atomically in a thread."""
+        data = manifest.model_dump_json()
+        path = BATCH_DIR / f"{manifest.batch_id}.json"
+
+        def write():
+            BATCH_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp.write_text(data, encoding="utf-8")
+            tmp.replace(path)
+
+        await asyncio.to_thread(write)
+
+
+batch_runner = BatchRunner()
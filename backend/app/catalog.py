@@ -0,0 +1,236 @@
+"""
+Report catalog: one SQLite row of metadata per stored report.
+
+Filled when an analysis saves its report, so portfolio-wide listing and
+search never walk UPLOAD_DIR or parse report.json files. Timestamps are stored
+as fixed-width naive UTC text (TIMESTAMP_FORMAT), so comparing them as
+strings orders them correctly. The index can be rebuilt from the report
+directories:
+
+    python -m app.catalog reindex
+"""
+import argparse
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.config import UPLOAD_DIR
+from app.schemas import AnalysisReport, ReportSummary, ReportList
+from app.reports import REPORT_NAME
+from app.pipeline.verification import FactIndex
+
+CATALOG_PATH = UPLOAD_DIR / "_index" / "catalog.sqlite3"
+
+COLUMNS = [
+    "doc_id", "sha256", "filename", "created_at", "traffic_light",
+    "evidence_coverage", "consistency", "feasibility", "country_code", "power_kwp", "pvgis_delta_pct",
+]
+
+# Query parameter -> (column, SQL operator)
+FILTERS = {
+    "traffic_light": ("traffic_light", "="),
+    "country_code": ("country_code", "="),
+    "sha256": ("sha256", "="),
+    "created_from": ("created_at", ">="),
+    "created_to": ("created_at", "<="),
+    "min_evidence_coverage": ("evidence_coverage", ">="),
+    "min_consistency": ("consistency", ">="),
+    "min_feasibility": ("feasibility", ">="),
+    "max_feasibility": ("feasibility", "<="),
+    "min_kwp": ("power_kwp", ">="),
+    "max_kwp": ("power_kwp", "<="),
+    "min_pvgis_delta_pct": ("pvgis_delta_pct", ">="),
+    "max_pvgis_delta_pct": ("pvgis_delta_pct", "<="),
+}
+
+SORTABLE = {c for c in COLUMNS if c != "sha256"}
+
+# Naive UTC with microseconds always present (isoformat() drops them when zero)
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+SCHEMA_VERSION = 1  # 1: created_at normalized to TIMESTAMP_FORMAT
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _conn() -> sqlite3.Connection:
+    """One connection per thread; the schema is created on first use."""
+    global _initialized
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        CATALOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(CATALOG_PATH, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.row_factory = sqlite3.Row
+        _local.conn = conn
+    if not _initialized:
+        with _init_lock:
+            if _initialized:
+                return conn
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS reports ("
+                " doc_id TEXT PRIMARY KEY,"
+                " sha256 TEXT NOT NULL,"
+                " filename TEXT NOT NULL,"
+                " created_at TEXT NOT NULL,"
+                " traffic_light TEXT NOT NULL,"
+                " evidence_coverage INTEGER NOT NULL,"
+                " consistency INTEGER NOT NULL,"
+                " feasibility INTEGER NOT NULL,"
+                " country_code TEXT,"
+                " power_kwp REAL,"
+                " pvgis_delta_pct REAL)"
+            )
+            for column in ("sha256", "created_at", "traffic_light", "country_code", "power_kwp", "pvgis_delta_pct"):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{column} ON reports({column})")
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                _migrate_timestamps(conn)
+            _initialized = True
+    return conn
+
+
+def _timestamp(value: datetime) -> str:
+    """Catalog form of a datetime; naive values are local time (as reports record them)."""
+    return value.astimezone(timezone.utc).replace(tzinfo=None).strftime(TIMESTAMP_FORMAT)
+
+
+def _migrate_timestamps(conn: sqlite3.Connection):
+    """Rewrite created_at of rows indexed before timestamps were normalized."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:  # another process may have won
+            rows = conn.execute("SELECT doc_id, created_at FROM reports").fetchall()
+            conn.executemany(
+                "UPDATE reports SET created_at = ? WHERE doc_id = ?",
+                [(_timestamp(datetime.fromisoformat(created_at)), doc_id) for doc_id, created_at in rows]
+            )
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _row(report: AnalysisReport) -> tuple:
+    yield_check = next((v for v in report.verifications if v.check_type == "PVGIS_YIELD_SANITY"), None)
+    country = (yield_check.inputs.get("country_code") or None) if yield_check else None
+    return (
+        report.document.doc_id,
+        report.document.sha256,
+        report.document.filename,
+        _timestamp(report.document.created_at),
+        report.scorecard.traffic_light,
+        report.scorecard.evidence_coverage,
+        report.scorecard.consistency,
+        report.scorecard.feasibility,
+        country.upper() if country else None,
+        FactIndex(report.facts).number("declared_power_kwp"),
+        yield_check.delta_pct if yield_check else None,
+    )
+
+
+def index_report(report: AnalysisReport):
+    """Insert or replace the catalog row of a saved report."""
+    _conn().execute(
+        f"INSERT OR REPLACE INTO reports ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+        _row(report)
+    )
+
+
+def list_reports(
+    filters: dict[str, object] | None = None,
+    q: str | None = None,
+    sort: str = "-created_at",
+    limit: int = 50,
+    offset: int = 0
+) -> ReportList:
+    """
+    Page of catalog rows. `filters` uses the FILTERS keys (None values are ignored),
+    `q` matches the filename, `sort` is a column name with an optional "-" for descending.
+    """
+    where, params = [], []
+    for key, value in (filters or {}).items():
+        if value is None:
+            continue
+        if key not in FILTERS:
+            raise ValueError(f"Unknown filter: {key}")
+        column, op = FILTERS[key]
+        if isinstance(value, datetime):
+            value = _timestamp(value)
+        elif key in ("traffic_light", "country_code"):
+            value = str(value).upper()
+        where.append(f"{column} {op} ?")
+        params.append(value)
+    if q:
+        where.append("filename LIKE ? ESCAPE '\\'")
+        params.append("%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+
+    column = sort.lstrip("-")
+    if column not in SORTABLE:
+        raise ValueError(f"Cannot sort by: {column}")
+    direction = "DESC" if sort.startswith("-") else "ASC"
+
+    clause = f" WHERE {' AND '.join(where)}" if where else ""
+    conn = _conn()
+    total = conn.execute(f"SELECT COUNT(*) FROM reports{clause}", params).fetchone()[0]
+    rows = conn.execute(
+        f"SELECT {', '.join(COLUMNS)} FROM reports{clause}"
+        f" ORDER BY {column} IS NULL, {column} {direction}, doc_id LIMIT ? OFFSET ?",
+        params + [limit, offset]
+    ).fetchall()
+
+    return ReportList(
+        total=total,
+        limit=limit,
+        offset=offset,
+        items=[
+            ReportSummary(
+                **{**dict(row), "created_at": datetime.fromisoformat(row["created_at"]).replace(tzinfo=timezone.utc)},
+                report_url=f"/api/reports/{row['doc_id']}"
+            )
+            for row in rows
+        ]
+    )
+
+
+def reindex() -> tuple[int, int]:
+    """Rebuild the catalog from UPLOAD_DIR/*/report.json. Returns (indexed, failed)."""
+    indexed = failed = 0
+    doc_ids = []
+    conn = _conn()
+    conn.execute("BEGIN")
+    for path in sorted(Path(UPLOAD_DIR).glob(f"*/{REPORT_NAME}")):
+        try:
+            report = AnalysisReport.model_validate_json(path.read_bytes())
+        except Exception as e:
+            print(f"Skipping {path}: {e}")
+            failed += 1
+            continue
+        index_report(report)
+        doc_ids.append(report.document.doc_id)
+        indexed += 1
+
+    # Drop rows whose report no longer exists
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS present (doc_id TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM present")
+    conn.executemany("INSERT OR IGNORE INTO present VALUES (?)", [(d,) for d in doc_ids])
+    conn.execute("DELETE FROM reports WHERE doc_id NOT IN (SELECT doc_id FROM present)")
+    conn.execute("COMMIT")
+    return indexed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report catalog")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("reindex", help="rebuild the catalog from the report directories")
+    parser.parse_args()
+
+    indexed, failed = reindex()
+    print(f"Indexed {indexed} reports into {CATALOG_PATH} ({failed} unreadable)")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,3 +8,97 @@ UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "./uploads")).resolve()
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+# Uploads: streamed to disk in chunks, rejected as soon as they exceed the limit
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "50"))
+UPLOAD_CHUNK_KB = int(os.getenv("UPLOAD_CHUNK_KB", "1024"))
+
+# Background analysis jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "16"))
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "1000"))
+
+# On-demand page rendering (disk budget for cached page PNGs)
+RENDER_CACHE_MAX_MB = int(os.getenv("RENDER_CACHE_MAX_MB", "1024"))
+# Page image variants (thumb/screen/full): "webp" (needs Pillow with WebP support) or "jpeg"
+PAGE_IMAGE_FORMAT = os.getenv("PAGE_IMAGE_FORMAT", "webp").lower()
+
+# Multi-process PDF work (text extraction / rendering) for large documents
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+
+# Geocoding cache: how long "address not found" answers are kept
+GEOCODE_NEGATIVE_TTL_DAYS = float(os.getenv("GEOCODE_NEGATIVE_TTL_DAYS", "7"))
+
+# External service endpoints (override to use a self-hosted instance or a local stand-in)
+NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+PVGIS_API_URL = os.getenv("PVGIS_API_URL", "https://re.jrc.ec.europa.eu/api/v5_2/PVcalc")
+
+# Nominatim usage policy: max requests/second across ALL worker processes
+NOMINATIM_RATE_PER_S = float(os.getenv("NOMINATIM_RATE_PER_S", "1.0"))
+
+# PVGIS cache: per-kWp yield profiles keyed on a lat/lon grid
+PVGIS_GRID_DEG = float(os.getenv("PVGIS_GRID_DEG", "0.05"))
+PVGIS_CACHE_TTL_DAYS = float(os.getenv("PVGIS_CACHE_TTL_DAYS", "180"))
+PVGIS_CACHE_MAX_ENTRIES = int(os.getenv("PVGIS_CACHE_MAX_ENTRIES", "50000"))
+
+# Offline PVGIS yield grid (fallback when the PVGIS API is unavailable)
+YIELD_GRID_PATH = Path(os.getenv("YIELD_GRID_PATH", str(UPLOAD_DIR / "_pvgrid" / "yield_grid.npy"))).resolve()
+
+# Per-service concurrency caps (per process)
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "4"))
+PVGIS_CONCURRENCY = int(os.getenv("PVGIS_CONCURRENCY", "4"))
+
+# Batch analysis (documents run as jobs: BATCH_CONCURRENCY per batch queued or running at once)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "100"))
+# Total size of a batch request and of all its PDFs (ZIP members included)
+BATCH_MAX_MB = int(os.getenv("BATCH_MAX_MB", "500"))
+
+# Gemini response cache (keyed on anonymized content, model and prompt version)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+
+# Text extraction: "chunked" (page-aligned chunks sent concurrently, merged per field)
+# or "single" (one prompt, truncated at LLM_CHUNK_TOKENS)
+LLM_TEXT_MODE = os.getenv("LLM_TEXT_MODE", "chunked").lower()
+LLM_CHUNK_TOKENS = int(os.getenv("LLM_CHUNK_TOKENS", "7500"))
+
+# Vision extraction: image-only pages are rendered in memory at this DPI as JPEG
+VISION_DPI = int(os.getenv("VISION_DPI", "110"))
+VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", "75"))
+
+# Page relevance pre-ranking: send the top-N text pages plus any scoring at least
+# RELEVANCE_MIN_SCORE to the LLM (RELEVANCE_TOP_N=0 sends every page)
+RELEVANCE_TOP_N = int(os.getenv("RELEVANCE_TOP_N", "12"))
+RELEVANCE_MIN_SCORE = float(os.getenv("RELEVANCE_MIN_SCORE", "15"))
+
+# Rule-based fast path: "hybrid" runs local rules first and only asks Gemini for
+# what they could not find confidently (nothing, if all required fields were found); "off" disables it
+EXTRACTION_RULES = os.getenv("EXTRACTION_RULES", "hybrid").lower()
+RULES_MIN_CONFIDENCE = float(os.getenv("RULES_MIN_CONFIDENCE", "0.85"))
+RULES_REQUIRED_FIELDS = [
+    f.strip() for f in os.getenv(
+        "RULES_REQUIRED_FIELDS", "project_location_text,declared_power_kwp,declared_yield_kwh_per_kwp"
+    ).split(",") if f.strip()
+]
+
+# Evidence grounding: snippets must match the document text (word alignment score
+# >= GROUNDING_MIN_SCORE); facts with no grounded evidence get confidence x GROUNDING_PENALTY
+GROUNDING_ENABLED = os.getenv("GROUNDING_ENABLED", "true").lower() in ("1", "true", "yes")
+GROUNDING_MIN_SCORE = float(os.getenv("GROUNDING_MIN_SCORE", "0.8"))
+GROUNDING_PENALTY = float(os.getenv("GROUNDING_PENALTY", "0.5"))
+
+# Verification: default timeout for I/O-bound checks (geocoding + PVGIS)
+VERIFY_CHECK_TIMEOUT_S = float(os.getenv("VERIFY_CHECK_TIMEOUT_S", "30"))
+
+# Stored reports: pre-compressed siblings written next to report.json
+# (comma-separated: "gzip", "br" - brotli needs the optional `brotli` package; empty disables)
+REPORT_PRECOMPRESS = [
+    e.strip().lower() for e in os.getenv("REPORT_PRECOMPRESS", "gzip").split(",") if e.strip()
+]
+
+# Observability: timing spans + counters on GET /metrics (Prometheus text format),
+# and a per-span `timings` section in every report
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+REPORT_TIMINGS = os.getenv("REPORT_TIMINGS", "true").lower() in ("1", "true", "yes")
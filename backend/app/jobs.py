@@ -0,0 +1,304 @@
+"""
+Background analysis jobs: a bounded queue feeding a fixed-size worker pool.
+
+Submitting returns immediately with a job id (== doc_id); the report ends up
+in the usual UPLOAD_DIR/<doc_id>/report.json. When the queue is full new
+submissions are rejected so callers can shed load instead of piling up work.
+
+Identical uploads (same sha256) are coalesced onto the in-flight job or
+answered from the earlier report unless `force` is set.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from app.config import UPLOAD_DIR, JOB_WORKERS, JOB_QUEUE_SIZE, JOB_HISTORY_SIZE
+from app.schemas import AnalysisReport, JobStage, JobStatus, QueueStats
+from app.analysis import STAGES, run_analysis
+from app.pipeline.pdf_processor import make_doc_id
+from app import artifacts, reports
+from app.uploads import StoredUpload, discard
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity."""
+
+
+class _Job:
+    """In-memory job record (status + uploaded file until a worker picks it up; the report stays on disk)."""
+
+    def __init__(self, status: JobStatus, upload: StoredUpload, ingest_in_pool: bool = False):
+        self.status = status
+        self.upload: StoredUpload | None = upload
+        self.sha256 = upload.sha256
+        self.ingest_in_pool = ingest_in_pool
+        self.done = asyncio.Event()
+        self._stage_t0 = 0.0
+
+    def start_stage(self, name: str):
+        """Mark `name` as running and close the previous stage."""
+        self.finish_stage("DONE")
+        for s in self.status.stages:
+            if s.name == name:
+                s.status = "RUNNING"
+                s.started_at = datetime.now()
+                self._stage_t0 = time.perf_counter()
+
+    def finish_stage(self, status: str):
+        """Close the currently running stage (if any)."""
+        for s in self.status.stages:
+            if s.status == "RUNNING":
+                s.status = status
+                s.finished_at = datetime.now()
+                s.duration_ms = round((time.perf_counter() - self._stage_t0) * 1000, 1)
+
+
+class JobManager:
+    """Bounded FIFO of analysis jobs processed by `workers` asyncio tasks."""
+
+    def __init__(self, workers: int = JOB_WORKERS, queue_size: int = JOB_QUEUE_SIZE,
+                 history_size: int = JOB_HISTORY_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.history_size = history_size
+        self._queue: asyncio.Queue[str] | None = None
+        self._not_full: asyncio.Condition | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._jobs: OrderedDict[str, _Job] = OrderedDict()
+        self._queued: OrderedDict[str, None] = OrderedDict()
+        self._inflight: dict[str, str] = {}  # sha256 -> job_id
+        self._busy = 0
+        self._accepted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+
+    def _ensure_started(self):
+        """Start the worker pool on first use (inside the running loop)."""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._not_full = asyncio.Condition()
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def shutdown(self):
+        """Cancel workers (queued jobs are dropped)."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def check_capacity(self):
+        """Raise QueueFullError when no more jobs can be queued."""
+        self._ensure_started()
+        if self._queue.full():
+            self._rejected += 1
+            raise QueueFullError(f"Analysis queue is full ({self.queue_size} jobs)")
+
+    async def submit(
+        self, upload: StoredUpload, filename: str, force: bool = False, ingest_in_pool: bool = False
+    ) -> JobStatus:
+        """
+        Queue a streamed upload for analysis. Raises QueueFullError when at capacity.
+        Without `force`, identical bytes reuse the in-flight job or the last report.
+        The job owns the upload file from here on (it is removed when not analyzed).
+        """
+        self._ensure_started()
+        if not force:
+            reused = await self._reuse(upload.sha256)
+            if reused is not None:
+                discard(upload.path)
+                return reused
+        return self._enqueue(upload, filename, force, ingest_in_pool)
+
+    async def submit_wait(
+        self, upload: StoredUpload, filename: str, force: bool = False, ingest_in_pool: bool = False
+    ) -> JobStatus:
+        """Like submit(), but waits for room in the queue instead of raising (batch documents)."""
+        self._ensure_started()
+        if not force:
+            reused = await self._reuse(upload.sha256)
+            if reused is not None:
+                discard(upload.path)
+                return reused
+        async with self._not_full:
+            await self._not_full.wait_for(lambda: not self._queue.full())
+            return self._enqueue(upload, filename, force, ingest_in_pool)
+
+    def _enqueue(self, upload: StoredUpload, filename: str, force: bool, ingest_in_pool: bool) -> JobStatus:
+        """Create and queue the job (no awaits, so capacity and in-flight state cannot change underneath)."""
+        sha256 = upload.sha256
+        if not force:
+            # The same bytes may have been queued while we were checking the disk
+            reused = self._reuse_inflight(sha256)
+            if reused is not None:
+                discard(upload.path)
+                return reused
+
+        try:
+            self.check_capacity()
+        except QueueFullError:
+            discard(upload.path)
+            raise
+
+        doc_id = make_doc_id(sha256)
+        job_id, n = doc_id, 1
+        while job_id in self._jobs or (UPLOAD_DIR / job_id).exists():
+            n += 1
+            job_id = f"{doc_id}-{n}"
+
+        status = JobStatus(
+            job_id=job_id,
+            doc_id=job_id,
+            filename=filename,
+            state="QUEUED",
+            stages=[JobStage(name=name) for name in STAGES],
+            submitted_at=datetime.now()
+        )
+        self._jobs[job_id] = _Job(status, upload, ingest_in_pool)
+        self._inflight[sha256] = job_id
+        self._queued[job_id] = None
+        self._queue.put_nowait(job_id)
+        self._accepted += 1
+        self._evict_history()
+        return self.get(job_id)
+
+    def _reuse_inflight(self, sha256: str) -> JobStatus | None:
+        """Status of a queued or running analysis of the same bytes."""
+        job_id = self._inflight.get(sha256)
+        status = self.get(job_id) if job_id else None
+        if status is not None:
+            status.reused = True
+        return status
+
+    async def _reuse(self, sha256: str) -> JobStatus | None:
+        """Status of an in-flight or finished analysis of the same bytes."""
+        status = self._reuse_inflight(sha256)
+        if status is None:
+            status = await asyncio.to_thread(_status_from_artifacts, sha256)
+            if status is not None:
+                status.reused = True
+        return status
+
+    def get(self, job_id: str) -> JobStatus | None:
+        """Current status of a job held in memory (see status_from_report for unknown/evicted jobs)."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        status = job.status.model_copy(deep=True)
+        if job_id in self._queued:
+            status.queue_position = list(self._queued).index(job_id) + 1
+        return status
+
+    async def wait(self, job_id: str) -> AnalysisReport:
+        """Wait for a job to finish and return its report."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            # Reused (or evicted) job - serve the saved report
+            report = await asyncio.to_thread(reports.load_report, job_id)
+            if report is None:
+                raise RuntimeError("Report not found")
+            return report
+        await job.done.wait()
+        if job.status.state != "DONE":
+            raise RuntimeError(job.status.error or "Analysis failed")
+        report = await asyncio.to_thread(reports.load_report, job_id)
+        if report is None:
+            raise RuntimeError("Report not found")
+        return report
+
+    def stats(self) -> QueueStats:
+        """Queue depth and admission counters."""
+        return QueueStats(
+            workers=self.workers,
+            busy_workers=self._busy,
+            queue_depth=len(self._queued),
+            queue_capacity=self.queue_size,
+            accepted=self._accepted,
+            rejected=self._rejected,
+            completed=self._completed,
+            failed=self._failed
+        )
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            self._queued.pop(job_id, None)
+            async with self._not_full:
+                self._not_full.notify()
+            job = self._jobs.get(job_id)
+            if job is None:
+                continue
+            self._busy += 1
+            try:
+                await self._run(job)
+            finally:
+                self._busy -= 1
+                self._queue.task_done()
+
+    async def _run(self, job: _Job):
+        status = job.status
+        status.state = "RUNNING"
+        status.started_at = datetime.now()
+        try:
+            await run_analysis(
+                job.upload.path, status.filename, status.doc_id, on_stage=job.start_stage,
+                ingest_in_pool=job.ingest_in_pool, sha256=job.sha256
+            )
+            artifacts.register(job.sha256, status.doc_id)
+            job.finish_stage("DONE")
+            status.state = "DONE"
+            status.report_url = f"/api/reports/{status.doc_id}"
+            self._completed += 1
+        except Exception as e:
+            logger.exception("Analysis job %s failed", status.job_id)
+            job.finish_stage("FAILED")
+            status.state = "FAILED"
+            status.error = str(e)
+            self._failed += 1
+        finally:
+            status.finished_at = datetime.now()
+            if self._inflight.get(job.sha256) == status.job_id:
+                del self._inflight[job.sha256]
+            discard(job.upload.path)
+            job.upload = None
+            job.done.set()
+
+    def _evict_history(self):
+        """Drop the oldest finished jobs beyond the history limit."""
+        excess = len(self._jobs) - self.history_size
+        if excess <= 0:
+            return
+        for job_id in [j for j, job in self._jobs.items() if job.done.is_set()][:excess]:
+            del self._jobs[job_id]
+
+
+def _status_from_artifacts(sha256: str) -> JobStatus | None:
+    """DONE status of the last finished analysis of these bytes, if any (blocking)."""
+    doc_id = artifacts.lookup(sha256)
+    return status_from_report(doc_id) if doc_id else None
+
+
+def status_from_report(doc_id: str) -> JobStatus | None:
+    """Build a DONE status from a saved report (e.g. after a restart)."""
+    path = reports.report_path(doc_id)
+    if not path.exists():
+        return None
+    document = json.loads(path.read_text(encoding="utf-8"))["document"]
+    return JobStatus(
+        job_id=doc_id,
+        doc_id=doc_id,
+        filename=document["filename"],
+        state="DONE",
+        stages=[JobStage(name=name, status="DONE") for name in STAGES],
+        submitted_at=document["created_at"],
+        report_url=f"/api/reports/{doc_id}"
+    )
+
+
+job_manager = JobManager()
@@ -1,17 +1,25 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-import json
+from fastapi.responses import FileResponse, JSONResponse, Response
+import asyncio
+from datetime import datetime
 
-from app.config import UPLOAD_DIR
-from app.schemas import AnalysisReport
-from app.pipeline.pdf_processor import process_pdf
-from app.pipeline.gemini_analyzer import extract_facts_from_text, extract_facts_from_images
-from app.pipeline.verification import run_verification
+from app.config import UPLOAD_DIR, METRICS_ENABLED
+from app.schemas import JobStatus, QueueStats, BatchManifest, ReportList, SnippetLocation
+from app.jobs import job_manager, status_from_report, QueueFullError
+from app.batch import batch_runner, save_uploads, BatchError, MAX_BATCH_BYTES
+from app import reports, catalog, uploads, metrics
+from app.pipeline import geocoding, pvgis, gemini_analyzer, render, word_index
+from app.pipeline.pdf_processor import shutdown_process_pool
 
 app = FastAPI(title="GreenLoan Validator", version="1.0.0")
 
+# Oversized uploads get a 413 while the body is received (declared Content-Length or bytes counted)
+# (added before CORS so the 413 still carries CORS headers)
+app.add_middleware(uploads.ContentLengthLimit, paths={"/api/analyze", "/api/jobs"})
+app.add_middleware(uploads.ContentLengthLimit, paths={"/api/analyze/batch"}, max_bytes=MAX_BATCH_BYTES)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -24,66 +32,238 @@ UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
 
 
+@app.on_event("startup")
+async def startup():
+    await asyncio.to_thread(uploads.clear_incoming)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await job_manager.shutdown()
+    await batch_runner.shutdown()
+    await geocoding.aclose_client()
+    await pvgis.aclose_client()
+    await asyncio.to_thread(shutdown_process_pool)
+
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request, exc: QueueFullError):
+    return JSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": "30"})
+
+
 @app.get("/")
 def health():
     return {"status": "ok"}
 
 
+async def _save_upload(file: UploadFile) -> uploads.StoredUpload:
+    """Validate and stream an uploaded PDF to disk."""
+    try:
+        return await uploads.save_upload(file)
+    except uploads.UploadError as e:
+        raise HTTPException(400, str(e))
+
+
 @app.post("/api/analyze")
-async def analyze(file: UploadFile = File(...)):
-    if not file.filename.lower().endswith(".pdf"):
-        raise HTTPException(400, "Only PDF files supported")
+async def analyze(file: UploadFile = File(...), force: bool = False):
+    """
+    Analyze synchronously (still goes through the bounded worker pool).
+    Re-uploads of an already analyzed PDF return the stored report unless `force`.
+    """
+    upload = await _save_upload(file)
+    job = await job_manager.submit(upload, file.filename, force=force)
+    try:
+        return await job_manager.wait(job.job_id)
+    except RuntimeError as e:
+        raise HTTPException(500, str(e))
+
+
+@app.post("/api/analyze/batch", status_code=202, response_model=BatchManifest)
+async def analyze_batch(files: list[UploadFile] = File(...), force: bool = False):
+    """
+    Analyze several PDFs and/or ZIP archives of PDFs. Returns the batch manifest
+    right away; poll GET /api/batches/{batch_id} for per-document status and timings.
+    """
+    job_manager.check_capacity()
+    try:
+        pdfs = await save_uploads(files)
+    except BatchError as e:
+        raise HTTPException(400, str(e))
+    return batch_runner.start(pdfs, force=force)
+
+
+@app.get("/api/batches/{batch_id}", response_model=BatchManifest)
+async def get_batch(batch_id: str):
+    manifest = batch_runner.get(batch_id)
+    if manifest is None:
+        manifest = await asyncio.to_thread(batch_runner.load, batch_id)
+    if manifest is None:
+        raise HTTPException(404, "Batch not found")
+    return manifest
+
+
+@app.post("/api/jobs", status_code=202, response_model=JobStatus)
+async def submit_job(file: UploadFile = File(...), force: bool = False):
+    """Queue an analysis and return immediately; poll GET /api/jobs/{job_id}."""
+    upload = await _save_upload(file)
+    return await job_manager.submit(upload, file.filename, force=force)
 
-    content = await file.read()
-    if len(content) > 50 * 1024 * 1024:
-        raise HTTPException(400, "File too large (max 50MB)")
 
-    # Process PDF
-    doc_meta, page_info, page_texts = process_pdf(content, file.filename)
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    status = job_manager.get(job_id)
+    if status is None:
+        status = await asyncio.to_thread(status_from_report, job_id)
+    if status is None:
+        raise HTTPException(404, "Job not found")
+    return status
 
-    # Check if pages have good text
-    has_good_text = sum(1 for p in page_info if p.has_text) > len(page_info) * 0.5
 
-    # Extract facts
-    if has_good_text:
-        facts = extract_facts_from_text(page_texts)
-    else:
-        facts = extract_facts_from_images(doc_meta.doc_id, page_info)
+@app.get("/api/queue", response_model=QueueStats)
+async def get_queue_stats():
+    return job_manager.stats()
 
-    # If text extraction failed, try images
-    if not facts and has_good_text:
-        facts = extract_facts_from_images(doc_meta.doc_id, page_info)
 
-    # Run verification
-    verifications, flags, scorecard = run_verification(facts)
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters of the external-service and LLM response caches."""
+    return {
+        "geocoding": geocoding.cache_stats(),
+        "pvgis": pvgis.cache_stats(),
+        "llm": gemini_analyzer.cache_stats(),
+    }
 
-    report = AnalysisReport(
-        document=doc_meta,
-        page_info=page_info,
-        facts=facts,
-        verifications=verifications,
-        red_flags=flags,
-        scorecard=scorecard
-    )
 
-    # Save report
-    report_path = UPLOAD_DIR / doc_meta.doc_id / "report.json"
-    report_path.write_text(report.model_dump_json(indent=2), encoding="utf-8")
+def _scrape_time_metrics() -> list[tuple[str, str, dict, float]]:
+    """Cache hit ratios and job queue state, read on the event loop when /metrics is scraped."""
+    values = []
+    caches = {"geocoding": geocoding.cache_stats(), "pvgis": pvgis.cache_stats(), "llm": gemini_analyzer.cache_stats()}
+    for name, stats in caches.items():
+        values += [
+            ("cache_requests_total", "counter", {"cache": name, "result": "hit"}, stats["hits"]),
+            ("cache_requests_total", "counter", {"cache": name, "result": "miss"}, stats["misses"]),
+            ("cache_hit_ratio", "gauge", {"cache": name}, stats["hit_ratio"]),
+        ]
+    queue = job_manager.stats()
+    values += [
+        ("job_queue_depth", "gauge", {}, queue.queue_depth),
+        ("job_busy_workers", "gauge", {}, queue.busy_workers),
+    ]
+    for status in ("accepted", "rejected", "completed", "failed"):
+        values.append(("jobs_total", "counter", {"status": status}, getattr(queue, status)))
+    return values
 
-    return report
+
+metrics.register_collector(_scrape_time_metrics)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text format: span histograms, external call/error/retry counters, cache and queue state."""
+    if not METRICS_ENABLED:
+        raise HTTPException(404, "Metrics are disabled")
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match", "")
+    return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+
+@app.get("/api/reports", response_model=ReportList)
+async def list_reports(
+    traffic_light: str | None = None,
+    country_code: str | None = None,
+    sha256: str | None = None,
+    min_kwp: float | None = None,
+    max_kwp: float | None = None,
+    min_evidence_coverage: int | None = None,
+    min_consistency: int | None = None,
+    min_feasibility: int | None = None,
+    max_feasibility: int | None = None,
+    min_pvgis_delta_pct: float | None = None,
+    max_pvgis_delta_pct: float | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    q: str | None = None,
+    sort: str = "-created_at",
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0)
+):
+    """Page of stored reports from the catalog, filtered and sorted in SQLite."""
+    filters = {
+        "traffic_light": traffic_light,
+        "country_code": country_code,
+        "sha256": sha256,
+        "min_kwp": min_kwp,
+        "max_kwp": max_kwp,
+        "min_evidence_coverage": min_evidence_coverage,
+        "min_consistency": min_consistency,
+        "min_feasibility": min_feasibility,
+        "max_feasibility": max_feasibility,
+        "min_pvgis_delta_pct": min_pvgis_delta_pct,
+        "max_pvgis_delta_pct": max_pvgis_delta_pct,
+        "created_from": created_from,
+        "created_to": created_to,
+    }
+    try:
+        return await asyncio.to_thread(catalog.list_reports, filters, q, sort, limit, offset)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
 
 
 @app.get("/api/reports/{doc_id}")
-async def get_report(doc_id: str):
-    path = UPLOAD_DIR / doc_id / "report.json"
-    if not path.exists():
+async def get_report(doc_id: str, request: Request):
+    """Stored report bytes as-is (pre-compressed when the client accepts it), with ETag revalidation."""
+    variant = await asyncio.to_thread(reports.select_variant, doc_id, request.headers.get("accept-encoding", ""))
+    if variant is None:
         raise HTTPException(404, "Report not found")
-    return json.loads(path.read_text())
+    path, encoding, etag = variant
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    body = await asyncio.to_thread(path.read_bytes)
+    return Response(body, media_type="application/json", headers=headers)
 
 
 @app.get("/api/page/{doc_id}/{page_no}")
-async def get_page(doc_id: str, page_no: int):
-    path = UPLOAD_DIR / doc_id / "pages" / f"{page_no:03d}.png"
-    if not path.exists():
+async def get_page(doc_id: str, page_no: int, request: Request, size: str = render.DEFAULT_PAGE_SIZE):
+    """
+    Page image variant (`size`: thumb, screen or full). Rendered on first request,
+    then served from the page cache; a document's pages never change, so they are
+    cached immutably under an ETag derived from the PDF's sha256.
+    """
+    if size not in render.PAGE_SIZES:
+        raise HTTPException(400, f"Unknown size: {size} (expected one of {', '.join(render.PAGE_SIZES)})")
+    info = await asyncio.to_thread(render.document_info, doc_id)
+    if info is None or not 1 <= page_no <= info[1]:
         raise HTTPException(404, "Page not found")
-    return FileResponse(path, media_type="image/png")
+    sha256 = info[0]
+
+    etag = f'"{sha256[:32]}-{page_no}-{size}-{render.IMAGE_FORMAT}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    path = await asyncio.to_thread(render.render_page, doc_id, page_no, size)
+    if path is None:
+        raise HTTPException(404, "Page not found")
+    return FileResponse(path, media_type=render.MEDIA_TYPE, headers=headers)
+
+
+@app.get("/api/locate/{doc_id}", response_model=SnippetLocation)
+async def locate_snippet(
+    doc_id: str,
+    snippet: str = Query(..., min_length=1, max_length=2000),
+    page_no: int | None = None,
+    limit: int = Query(3, ge=1, le=20)
+):
+    """Resolve an evidence snippet to pages and word boxes (for highlighting in the page viewer)."""
+    matches = await asyncio.to_thread(word_index.locate, doc_id, snippet, page_no, limit)
+    if matches is None:
+        raise HTTPException(404, "Document not found")
+    return SnippetLocation(doc_id=doc_id, snippet=snippet, matches=matches)
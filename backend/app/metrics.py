@@ -0,0 +1,247 @@
+"""
+Timing spans and counters, exported in the Prometheus text format on GET /metrics.
+
+    with metrics.span("pvgis.request"):     # sync or async code
+        ...
+    metrics.count("external_errors_total", service="pvgis", reason="http_503")
+
+Every span feeds the `greenloan_span_seconds` histogram (labelled by span
+name) and, inside `collect_timings()`, the `timings` section of the report
+being built. The collector is a context variable, so spans in
+`asyncio.to_thread` workers and tasks started from the analysis are counted
+too (work inside the PDF process pool is timed by its caller).
+
+Metrics are per process (each gunicorn worker exports its own). With
+METRICS_ENABLED and REPORT_TIMINGS both off, `span()` returns a shared no-op
+span (no clock reads, no locking).
+"""
+import math
+import threading
+from bisect import bisect_left
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator
+
+from app.config import METRICS_ENABLED, REPORT_TIMINGS
+from app.schemas import SpanTiming
+
+PREFIX = "greenloan_"
+
+# Histogram buckets in seconds: from cached lookups (ms) up to slow LLM calls
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    "span_seconds": "Duration of instrumented pipeline spans",
+    "span_errors_total": "Spans that ended with an exception",
+    "external_requests_total": "Requests to external services (Gemini, Nominatim, PVGIS)",
+    "external_errors_total": "Failed requests to external services",
+    "external_retries_total": "Retried or fallback requests to external services",
+    "cache_requests_total": "Cache lookups by result (hit/miss)",
+    "fallbacks_total": "Degraded answers (e.g. offline yield grid instead of PVGIS)",
+    "verification_check_failures_total": "Verification checks skipped after an error or timeout",
+    "llm_chunk_failures_total": "Text chunks whose LLM extraction failed (the rest are still merged)",
+    "analyses_total": "Finished analyses by status",
+    "cache_hit_ratio": "Cache hit ratio since process start",
+    "jobs_total": "Background analysis jobs by outcome",
+    "job_queue_depth": "Jobs waiting for a worker",
+    "job_busy_workers": "Workers running an analysis",
+}
+
+_lock = threading.Lock()
+_counters: dict[tuple[str, tuple], float] = {}
+_histograms: dict[tuple[str, tuple], list] = {}  # key -> [per-bucket counts..., +Inf, sum, count]
+_collectors: list[Callable[[], list[tuple[str, str, dict, float]]]] = []
+_timings: ContextVar["Timings | None"] = ContextVar("timings", default=None)
+
+
+def _key(name: str, labels: dict) -> tuple[str, tuple]:
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def count(name: str, value: float = 1, **labels):
+    """Increment counter `name` (exported as greenloan_<name>)."""
+    if not METRICS_ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, seconds: float, **labels):
+    """Record one observation in histogram `name`."""
+    if METRICS_ENABLED:
+        _observe(_key(name, labels), seconds)
+
+
+def _observe(key: tuple[str, tuple], seconds: float):
+    i = bisect_left(BUCKETS, seconds)  # first bucket with le >= seconds (len(BUCKETS) = +Inf)
+    with _lock:
+        series = _histograms.get(key)
+        if series is None:
+            series = _histograms[key] = [0] * (len(BUCKETS) + 3)
+        series[i] += 1
+        series[-2] += seconds
+        series[-1] += 1
+
+
+class Timings:
+    """Span durations collected for one analysis (the report's `timings`)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: dict[tuple, list[float]] = {}  # span labels -> [calls, total_s, max_s]
+
+    def add(self, labels: tuple, seconds: float):
+        with self._lock:
+            entry = self._spans.get(labels)
+            if entry is None:
+                entry = self._spans[labels] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+    def summary(self) -> list[SpanTiming]:
+        with self._lock:
+            items = list(self._spans.items())
+        summary = []
+        for labels, (calls, total, longest) in items:
+            labels = {k: str(v) for k, v in labels}
+            summary.append(SpanTiming(
+                name=labels.pop("span"), labels=labels, calls=calls,
+                total_ms=round(total * 1000, 1), max_ms=round(longest * 1000, 1)
+            ))
+        return summary
+
+
+class Span:
+    """Timed block; labels may be set inside the block (e.g. cache hit or miss)."""
+    __slots__ = ("name", "labels", "_timings", "_t0")
+
+    def __init__(self, name: str, labels: dict, timings: Timings | None):
+        self.name = name
+        self.labels = labels
+        self._timings = timings
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._t0
+        key = _key("span_seconds", {"span": self.name, **self.labels})
+        if METRICS_ENABLED:
+            _observe(key, seconds)
+            if exc_type is not None:
+                count("span_errors_total", span=self.name)
+        if self._timings is not None:
+            self._timings.add(key[1], seconds)
+        return False
+
+
+class _NoopSpan:
+    """Stand-in returned when nothing would record the span."""
+    labels: dict = {}  # writes are accepted and ignored
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **labels) -> Span | _NoopSpan:
+    """Time a block of code: `with span("pdf.ingest"): ...`."""
+    timings = _timings.get()
+    if not METRICS_ENABLED and timings is None:
+        return _NOOP
+    return Span(name, labels, timings)
+
+
+@contextmanager
+def collect_timings() -> Iterator[Timings | None]:
+    """Collect the spans of the enclosed work (None when REPORT_TIMINGS is off)."""
+    if not REPORT_TIMINGS:
+        yield None
+        return
+    timings = Timings()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def register_collector(fn: Callable[[], list[tuple[str, str, dict, float]]]):
+    """
+    Add values computed at scrape time: `fn` returns (name, type, labels, value)
+    tuples, type being "counter" or "gauge".
+    """
+    _collectors.append(fn)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: tuple | list, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(str(v))}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(series) for key, series in _histograms.items()}
+
+    families: dict[str, tuple[str, list[str]]] = {}
+
+    def family(name: str, kind: str) -> list[str]:
+        return families.setdefault(name, (kind, []))[1]
+
+    for (name, labels), value in sorted(counters.items()):
+        family(name, "counter").append(f"{PREFIX}{name}{_labels(labels)} {_number(value)}")
+
+    for (name, labels), series in sorted(histograms.items()):
+        lines = family(name, "histogram")
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS, series):
+            cumulative += bucket_count
+            le = 'le="%s"' % bound
+            lines.append(f"{PREFIX}{name}_bucket{_labels(labels, le)} {cumulative}")
+        le = 'le="+Inf"'
+        lines.append(f"{PREFIX}{name}_bucket{_labels(labels, le)} {series[-1]}")
+        lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {_number(round(series[-2], 6))}")
+        lines.append(f"{PREFIX}{name}_count{_labels(labels)} {series[-1]}")
+
+    for collector in _collectors:
+        for name, kind, labels, value in collector():
+            family(name, kind).append(f"{PREFIX}{name}{_labels(sorted(labels.items()))} {_number(value)}")
+
+    out = []
+    for name, (kind, lines) in families.items():
+        if name in HELP:
+            out.append(f"# HELP {PREFIX}{name} {HELP[name]}")
+        out.append(f"# TYPE {PREFIX}{name} {kind}")
+        out.extend(lines)
+    return "\n".join(out) + "\n"
+
+
+def reset():
+    """Drop all recorded values (benchmarks)."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
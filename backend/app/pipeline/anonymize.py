@@ -4,6 +4,9 @@ Supports Polish and English patterns.
 """
 import re
 
+from app.config import PDF_WORKERS
+from app.pipeline.pdf_processor import get_process_pool
+
 # Polish patterns
 PESEL_PATTERN = re.compile(r'\b\d{11}\b')  # Polish national ID
 NIP_PATTERN = re.compile(r'\b\d{10}\b')  # Polish tax ID
@@ -44,36 +47,128 @@ POSTAL_CODE_PL = re.compile(r'\b\d{2}-\d{3}\b')  # Polish: 00-000
 POSTAL_CODE_INTL = re.compile(r'\b[A-Z]{1,2}\d{1,2}\s?\d[A-Z]{2}\b')  # UK format
 
 
-def anonymize_text(text: str) -> str:
+# Identification numbers: PESEL (11 digits), NIP (10) and REGON (9) match disjoint,
+# whole digit runs, so one pass labelled by length is equivalent to three.
+ID_NUMBER_PATTERN = re.compile(r'\b\d{9,11}\b')
+ID_NUMBER_LABELS = {11: '[PESEL]', 10: '[NIP]', 9: '[REGON]'}
+
+# Patterns in order of specificity (most specific first). The output equals
+# successive re.sub passes in this order: a later pattern never matches across
+# an earlier replacement, and the placeholder's brackets act as a word boundary.
+# NOTE: Postal codes (POSTAL_CODE_PL / POSTAL_CODE_INTL) are NOT masked - needed for geocoding
+# NOTE: Street addresses are NOT masked because:
+# - Installation location is needed for geocoding/PVGIS validation
+# - Commercial/industrial addresses are not personal data
+# Names - be careful not to replace company names or locations
+# Only replace if it looks like a person name (2 words, both capitalized)
+REPLACEMENTS = [
+    (EMAIL_PATTERN, '[EMAIL]'),
+    (IBAN_PATTERN, '[IBAN]'),
+    (ID_NUMBER_PATTERN, None),  # label from ID_NUMBER_LABELS
+    (PHONE_PATTERN, '[PHONE]'),
+    (NAME_PATTERN, '[NAME]'),
+]
+
+# COMBINED[k]: one named-group alternation of REPLACEMENTS[k:] (group "p<i>" =
+# REPLACEMENTS[i]); at any position the highest-priority pattern wins. Every
+# pattern starts with \b, hoisted out so non-boundary positions fail at once.
+COMBINED = [
+    re.compile(
+        r"\b(?:"
+        + "|".join(f"(?P<p{i}>{pattern.pattern[2:]})" for i, (pattern, _) in enumerate(REPLACEMENTS) if i >= k)
+        + ")"
+    )
+    for k in range(len(REPLACEMENTS))
+]
+
+# Below this much text, pickling pages to the process pool costs more than it saves
+POOL_MIN_CHARS = 1_000_000
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _preempting(text: str, start: int, end: int, level: int, priority: int, limit: int) -> tuple[int, int, int] | None:
     """
-    Replace PII with placeholders.
-    Keeps location names (cities) for geocoding purposes.
+    First (priority, start, end) match of REPLACEMENTS[level:priority] starting
+    in (start, end]: a more specific pattern there is replaced first, so the
+    match at `start` never happens.
     """
-    result = text
+    for x in range(start + 1, min(end, limit - 1) + 1):
+        m = COMBINED[level].match(text, x, limit)
+        if m and int(m.lastgroup[1:]) < priority:
+            return int(m.lastgroup[1:]), m.start(), m.end()
+    return None
 
-    # Replace in order of specificity (most specific first)
-    result = EMAIL_PATTERN.sub('[EMAIL]', result)
-    result = IBAN_PATTERN.sub('[IBAN]', result)
-    result = PESEL_PATTERN.sub('[PESEL]', result)
-    result = NIP_PATTERN.sub('[NIP]', result)
-    result = REGON_PATTERN.sub('[REGON]', result)
-    result = PHONE_PATTERN.sub('[PHONE]', result)
-    # NOTE: Postal codes are NOT masked - needed for geocoding
-    # result = POSTAL_CODE_PL.sub('[POSTAL]', result)
-    # result = POSTAL_CODE_INTL.sub('[POSTAL]', result)
 
-    # Names - be careful not to replace company names or locations
-    # Only replace if it looks like a person name (2 words, both capitalized)
-    result = NAME_PATTERN.sub('[NAME]', result)
+def _scan(text: str, pos: int, limit: int, level: int, spans: list[tuple[int, int, str]]):
+    """
+    Append the replacements of REPLACEMENTS[level:] in text[pos:limit] to `spans`
+    (in order). `limit` behaves like the end of the string: a placeholder follows.
+    """
+    m = COMBINED[level].search(text, pos, limit)
+    while m:
+        i = int(m.lastgroup[1:])
+        start, end = m.span()
+        first = start
+        while (winner := _preempting(text, start, end, level, i, limit)) is not None:
+            i, start, end = winner
+        if start > first:
+            # Text before the winner only ever meets less specific patterns
+            _scan(text, pos, start, i + 1, spans)
+        spans.append((start, end, REPLACEMENTS[i][1] or ID_NUMBER_LABELS[end - start]))
+        pos = end
 
-    # NOTE: Street addresses are NOT masked because:
-    # - Installation location is needed for geocoding/PVGIS validation
-    # - Commercial/industrial addresses are not personal data
-    # result = STREET_NUMBER_PATTERN.sub('[ADDRESS]', result)
+        # Right after a replacement only the same pattern still sees the original
+        # text (its own re.sub pass); less specific patterns see "]", after which
+        # their leading \b needs a word character
+        m = None
+        if end < limit and _is_word(text[end - 1]) and not _is_word(text[end]):
+            m = REPLACEMENTS[i][0].match(text, end, limit)
+            if m is None:
+                pos = end + 1
+            else:
+                m = COMBINED[level].match(text, end, limit)  # same span, as a combined match
+        if m is None:
+            m = COMBINED[level].search(text, pos, limit)
 
-    return result
 
+def _find_spans(text: str) -> list[tuple[int, int, str]]:
+    """Non-overlapping (start, end, placeholder) replacements, sorted, from a single scan."""
+    spans: list[tuple[int, int, str]] = []
+    _scan(text, 0, len(text), 0, spans)
+    return spans
 
-def anonymize_pages(pages: list[str]) -> list[str]:
-    """Anonymize multiple pages of text."""
+
+def anonymize_text(text: str) -> str:
+    """
+    Replace PII with placeholders.
+    Keeps location names (cities) for geocoding purposes.
+    """
+    parts = []
+    pos = 0
+    for start, end, placeholder in _find_spans(text):
+        parts.append(text[pos:start])
+        parts.append(placeholder)
+        pos = end
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def _anonymize_chunk(pages: list[str]) -> list[str]:
+    """Process-pool worker."""
     return [anonymize_text(page) for page in pages]
+
+
+def anonymize_pages(pages: list[str], in_pool: bool = False) -> list[str]:
+    """
+    Anonymize multiple pages of text. With `in_pool`, very large documents
+    (POOL_MIN_CHARS and up) are split across the PDF process pool.
+    """
+    if in_pool and PDF_WORKERS > 1 and sum(len(page) for page in pages) >= POOL_MIN_CHARS:
+        pool = get_process_pool()
+        size = -(-len(pages) // PDF_WORKERS)
+        futures = [pool.submit(_anonymize_chunk, pages[i:i + size]) for i in range(0, len(pages), size)]
+        return [page for future in futures for page in future.result()]
+    return _anonymize_chunk(pages)
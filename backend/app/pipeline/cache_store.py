@@ -0,0 +1,170 @@
+"""
+Persistent key → JSON value cache on SQLite (WAL mode).
+
+- O(1) indexed lookups instead of parsing a whole JSON file per request
+- every write is a single atomic upsert, safe across gunicorn workers
+- optional per-entry TTL (e.g. for negative results)
+- warm in-process LRU in front of the database
+- optional size bound: least recently used rows are evicted
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+MISSING = object()  # get() result for a cache miss (None is a valid cached value)
+
+_EVICT_EVERY = 64  # writes between size checks
+
+
+class SQLiteCache:
+    def __init__(
+        self,
+        path: Path,
+        memory_size: int = 1024,
+        max_entries: int | None = None,
+        max_bytes: int | None = None
+    ):
+        self.path = Path(path)
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, tuple[Any, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn().execute("CREATE INDEX IF NOT EXISTS idx_accessed ON entries(accessed_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, value: Any, expires_at: float | None):
+        with self._lock:
+            self._memory[key] = (value, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Any:
+        """Cached value, or MISSING."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            self.misses += 1
+            return MISSING
+
+        if self.max_entries is not None or self.max_bytes is not None:
+            # Recency only matters for size-bounded caches (avoids a write per read otherwise)
+            self._conn().execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        value = json.loads(row[0])
+        self._remember(key, value, row[1])
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None):
+        """Store a JSON-serializable value (atomic upsert)."""
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        self._conn().execute(
+            "INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value, separators=(",", ":")), expires_at, now)
+        )
+        self._remember(key, value, expires_at)
+
+        self._writes += 1
+        if self._writes % _EVICT_EVERY == 0:
+            self.evict()
+
+    def set_many(self, items: list[tuple[str, Any, float | None]]):
+        """Bulk insert (key, value, ttl) rows in one transaction (migrations)."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            [(k, json.dumps(v, separators=(",", ":")), now + ttl if ttl is not None else None, now)
+             for k, v, ttl in items]
+        )
+        conn.execute("COMMIT")
+
+    def evict(self):
+        """Drop expired rows, then least recently used rows over the size bounds."""
+        conn = self._conn()
+        conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        if self.max_entries is not None:
+            conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                " SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        if self.max_bytes is not None:
+            total = conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                rows = conn.execute("SELECT key, LENGTH(value) FROM entries ORDER BY accessed_at").fetchall()
+                doomed = []
+                for key, size in rows:
+                    if excess <= 0:
+                        break
+                    doomed.append((key,))
+                    excess -= size
+                conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+                with self._lock:
+                    for (key,) in doomed:
+                        self._memory.pop(key, None)
+
+    def clear(self):
+        """Drop every entry (database and in-process LRU)."""
+        self._conn().execute("DELETE FROM entries")
+        with self._lock:
+            self._memory.clear()
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def opened_stats(cache: SQLiteCache | None) -> dict:
+    """Counters of a lazily opened cache; zeros until it is opened (never opens it, so safe on the event loop)."""
+    if cache is None:
+        return {"hits": 0, "misses": 0, "hit_ratio": 0.0}
+    return cache.stats()
@@ -1,11 +1,67 @@
+import asyncio
+import hashlib
+import logging
+import re
+import threading
 import google.generativeai as genai
 import json
-from pathlib import Path
-from PIL import Image
 
-from app.config import GOOGLE_API_KEY, UPLOAD_DIR
+from app.config import (
+    GOOGLE_API_KEY, GEMINI_CONCURRENCY, UPLOAD_DIR, LLM_CACHE_MAX_MB, LLM_CACHE_ENABLED,
+    LLM_TEXT_MODE, LLM_CHUNK_TOKENS,
+)
+from app import metrics
 from app.schemas import ExtractedFact, Evidence, PageInfo
 from app.pipeline.anonymize import anonymize_text, anonymize_pages
+from app.pipeline.cache_store import SQLiteCache, MISSING, opened_stats
+from app.pipeline.render import render_vision_images
+
+MODEL_NAME = "gemini-3-flash-preview"
+
+logger = logging.getLogger(__name__)
+
+# Bump when the extraction semantics change without the prompt text changing
+# (prompt templates and PV_FIELDS are hashed into the cache key anyway)
+PROMPT_VERSION = "1"
+
+# Cap on concurrent Gemini requests per process (shared by all analyses)
+_llm_semaphore = asyncio.Semaphore(GEMINI_CONCURRENCY)
+
+# Rough token estimate for budgeting prompts (Gemini averages ~4 chars/token)
+CHARS_PER_TOKEN = 4
+
+# Long-lived model client
+_model = None
+_model_lock = threading.Lock()
+
+# Response cache: same content + model + prompt version -> same answer
+_cache: SQLiteCache | None = None
+
+
+def _get_model():
+    """Configure the SDK once and reuse the model client."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            genai.configure(api_key=GOOGLE_API_KEY)
+            _model = genai.GenerativeModel(MODEL_NAME)
+        return _model
+
+
+def _get_cache() -> SQLiteCache:
+    global _cache
+    if _cache is None:
+        _cache = SQLiteCache(
+            UPLOAD_DIR / "_llmcache" / "responses.sqlite3",
+            memory_size=64,
+            max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024
+        )
+    return _cache
+
+
+def cache_stats() -> dict:
+    return opened_stats(_cache)
+
 
 PV_FIELDS = """
 - project_location_text: project address/location (city, region, country)
@@ -23,31 +79,29 @@ PV_FIELDS = """
 - supplier_epc: contractor/supplier name
 """
 
+FIELD_NAMES = [line[2:].split(":")[0] for line in PV_FIELDS.strip().splitlines()]
 
-def extract_facts_from_images(doc_id: str, page_info: list[PageInfo]) -> list[ExtractedFact]:
-    """Use Gemini vision to extract facts from page images."""
-    if not GOOGLE_API_KEY:
-        return []
 
-    genai.configure(api_key=GOOGLE_API_KEY)
-    model = genai.GenerativeModel("gemini-3-flash-preview")
+def _fields_block(fields: list[str] | None) -> str:
+    """PV_FIELDS, or only its lines for `fields` (used when local rules found the rest)."""
+    if fields is None:
+        return PV_FIELDS
+    lines = [line for line in PV_FIELDS.strip().splitlines() if line[2:].split(":")[0] in fields]
+    return "\n" + "\n".join(lines) + "\n"
 
-    pages_dir = UPLOAD_DIR / doc_id / "pages"
-    images = []
 
-    # Load all page images
-    for p in page_info:
-        img_path = pages_dir / f"{p.page_no:03d}.png"
-        if img_path.exists():
-            images.append(Image.open(img_path))
+def _kind(kind: str, fields: list[str] | None) -> str:
+    return kind if fields is None else f"{kind}|{','.join(fields)}"
+
+
+def _only(facts: list[ExtractedFact], fields: list[str] | None) -> list[ExtractedFact]:
+    return facts if fields is None else [f for f in facts if f.field in fields]
 
-    if not images:
-        return []
 
-    prompt = f"""Analyze this PV/photovoltaic document and extract facts.
+IMAGE_PROMPT = """Analyze this PV/photovoltaic document and extract facts.
 
 FIELDS TO EXTRACT:
-{PV_FIELDS}
+{fields}
 
 For each field found, return JSON:
 - field: field name from the list above
@@ -64,55 +118,13 @@ RULES:
 
 Return ONLY valid JSON array, no explanations."""
 
-    response = model.generate_content([prompt] + images)
-
-    try:
-        text = response.text
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0]
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0]
-
-        data = json.loads(text.strip())
-        facts = []
-        for f in data:
-            evidence = [Evidence(**e) for e in f.get("evidence", [])]
-            value = f.get("value")
-            # Normalize array values (e.g., [20, 25] -> "20-25")
-            if isinstance(value, list):
-                value = "-".join(str(v) for v in value) if value else None
-            facts.append(ExtractedFact(
-                field=f["field"],
-                value=value,
-                unit=f.get("unit"),
-                confidence=f.get("confidence", 0.5),
-                evidence=evidence
-            ))
-        return facts
-    except Exception as e:
-        print(f"Gemini extraction error: {e}")
-        return []
-
-
-def extract_facts_from_text(page_texts: list[str]) -> list[ExtractedFact]:
-    """Use Gemini to extract facts from text."""
-    if not GOOGLE_API_KEY:
-        return []
-
-    genai.configure(api_key=GOOGLE_API_KEY)
-    model = genai.GenerativeModel("gemini-3-flash-preview")
-
-    # Anonymize before sending to external API
-    anonymized_pages = anonymize_pages(page_texts)
-    full_text = "\n\n".join(anonymized_pages)[:30000]  # Limit
-
-    prompt = f"""Analyze this PV/photovoltaic document and extract facts.
+TEXT_PROMPT = """Analyze this PV/photovoltaic document and extract facts.
 
 DOCUMENT:
-{full_text}
+{document}
 
 FIELDS TO EXTRACT:
-{PV_FIELDS}
+{fields}
 
 For each field found, return JSON:
 - field: field name from the list above
@@ -130,31 +142,275 @@ RULES:
 
 Return ONLY valid JSON array."""
 
-    response = model.generate_content(prompt)
+
+def _cache_key(kind: str, *parts: bytes) -> str:
+    """Hash of model, prompt version/templates and the exact content sent."""
+    h = hashlib.sha256()
+    for part in (MODEL_NAME, PROMPT_VERSION, kind, IMAGE_PROMPT, TEXT_PROMPT, PV_FIELDS):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    for part in parts:
+        h.update(hashlib.sha256(part).digest())
+    return h.hexdigest()
+
+
+def parse_facts(text: str) -> list[ExtractedFact]:
+    """Parse a Gemini JSON answer (optionally fenced) into facts. Raises on bad JSON."""
+    if "```json" in text:
+        text = text.split("```json")[1].split("```")[0]
+    elif "```" in text:
+        text = text.split("```")[1].split("```")[0]
+
+    data = json.loads(text.strip())
+    facts = []
+    for f in data:
+        evidence = [Evidence(**e) for e in f.get("evidence", [])]
+        value = f.get("value")
+        # Normalize array values (e.g., [20, 25] -> "20-25")
+        if isinstance(value, list):
+            value = "-".join(str(v) for v in value) if value else None
+        facts.append(ExtractedFact(
+            field=f["field"],
+            value=value,
+            unit=f.get("unit"),
+            confidence=f.get("confidence", 0.5),
+            evidence=evidence
+        ))
+    return facts
+
+
+async def _generate_facts(cache_key: str, contents, error_label: str) -> list[ExtractedFact]:
+    """
+    Answer from the response cache, or call Gemini (in a worker thread, within the
+    concurrency cap) and cache answers that parse.
+    """
+    cache = _get_cache() if LLM_CACHE_ENABLED else None
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not MISSING:
+            return parse_facts(cached)
+
+    model = _get_model()
+    async with _llm_semaphore:
+        metrics.count("external_requests_total", service="gemini")
+        try:
+            with metrics.span("llm.request"):
+                response = await asyncio.to_thread(model.generate_content, contents)
+        except Exception as e:
+            metrics.count("external_errors_total", service="gemini", reason=type(e).__name__)
+            logger.warning("%s: %s: %s", error_label, type(e).__name__, e)
+            raise
 
     try:
         text = response.text
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0]
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0]
-
-        data = json.loads(text.strip())
-        facts = []
-        for f in data:
-            evidence = [Evidence(**e) for e in f.get("evidence", [])]
-            value = f.get("value")
-            # Normalize array values (e.g., [20, 25] -> "20-25")
-            if isinstance(value, list):
-                value = "-".join(str(v) for v in value) if value else None
-            facts.append(ExtractedFact(
-                field=f["field"],
-                value=value,
-                unit=f.get("unit"),
-                confidence=f.get("confidence", 0.5),
-                evidence=evidence
-            ))
-        return facts
+        facts = parse_facts(text)
     except Exception as e:
-        print(f"Gemini text extraction error: {e}")
+        metrics.count("external_errors_total", service="gemini", reason="unparseable_response")
+        logger.warning("%s: %s", error_label, e)
+        return []
+
+    if cache is not None:
+        await asyncio.to_thread(cache.set, cache_key, text)
+    return facts
+
+
+def _fix_image_evidence_pages(facts: list[ExtractedFact], page_nos: list[int]) -> None:
+    """Map evidence to the pages actually sent (the model may count images from 1)."""
+    for fact in facts:
+        for ev in fact.evidence:
+            if ev.page_no in page_nos:
+                continue
+            if 1 <= ev.page_no <= len(page_nos):
+                ev.page_no = page_nos[ev.page_no - 1]
+            else:
+                ev.page_no = page_nos[0]
+
+
+async def extract_facts_from_images(
+    doc_id: str,
+    page_info: list[PageInfo],
+    fields: list[str] | None = None
+) -> list[ExtractedFact]:
+    """Use Gemini vision to extract facts (all PV_FIELDS, or only `fields`) from the given pages' images."""
+    if not GOOGLE_API_KEY:
+        return []
+
+    # Render compressed page images in memory, off the event loop
+    with metrics.span("render.vision"):
+        images = await asyncio.to_thread(render_vision_images, doc_id, [p.page_no for p in page_info])
+
+    if not images:
+        return []
+
+    # Label each image with its page number so evidence can cite it
+    contents = [IMAGE_PROMPT.format(fields=_fields_block(fields))]
+    for page_no, jpeg in images:
+        contents += [f"--- STRONA {page_no} ---", {"mime_type": "image/jpeg", "data": jpeg}]
+
+    parts = [str(page_no).encode() + b"\0" + jpeg for page_no, jpeg in images]
+    with metrics.span("llm.extract", input="images"):
+        facts = await _generate_facts(_cache_key(_kind("images", fields), *parts), contents, "Gemini extraction error")
+    _fix_image_evidence_pages(facts, [page_no for page_no, _ in images])
+    return _only(facts, fields)
+
+
+def chunk_pages(
+    pages: list[str],
+    max_tokens: int = LLM_CHUNK_TOKENS,
+    page_nos: list[int] | None = None
+) -> list[list[tuple[int, str]]]:
+    """
+    Group pages into chunks of at most `max_tokens` (estimated), splitting only at
+    page boundaries. A page larger than the budget is split at line breaks into
+    pieces that keep its page_no. `page_nos` defaults to 1..len(pages).
+    Returns chunks of (page_no, text).
+    """
+    budget = max(1, max_tokens * CHARS_PER_TOKEN)
+    pieces: list[tuple[int, str]] = []
+    for page_no, text in zip(page_nos or range(1, len(pages) + 1), pages):
+        if len(text) <= budget:
+            pieces.append((page_no, text))
+            continue
+        part = ""
+        for line in text.splitlines(keepends=True):
+            while len(line) > budget:
+                if part:
+                    pieces.append((page_no, part))
+                    part = ""
+                pieces.append((page_no, line[:budget]))
+                line = line[budget:]
+            if len(part) + len(line) > budget:
+                pieces.append((page_no, part))
+                part = ""
+            part += line
+        if part:
+            pieces.append((page_no, part))
+
+    chunks: list[list[tuple[int, str]]] = []
+    size = 0
+    for page_no, text in pieces:
+        # +2 for the "\n\n" separator between pages
+        if chunks and size + len(text) + 2 <= budget:
+            chunks[-1].append((page_no, text))
+            size += len(text) + 2
+        else:
+            chunks.append([(page_no, text)])
+            size = len(text)
+    return chunks
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def _fix_evidence_pages(facts: list[ExtractedFact], chunk: list[tuple[int, str]]) -> None:
+    """
+    Point each evidence item at the page of the chunk that contains its snippet;
+    otherwise keep the model's page_no if it is in the chunk, else the chunk's first page.
+    """
+    page_nos = [page_no for page_no, _ in chunk]
+    normalized = [(page_no, _normalize(text)) for page_no, text in chunk]
+    for fact in facts:
+        for ev in fact.evidence:
+            snippet = _normalize(ev.snippet)
+            found = next((p for p, text in normalized if snippet and snippet in text), None)
+            if found is not None:
+                ev.page_no = found
+            elif ev.page_no not in page_nos:
+                ev.page_no = page_nos[0]
+
+
+def merge_facts(chunk_facts: list[list[ExtractedFact]]) -> list[ExtractedFact]:
+    """
+    Deterministically combine per-chunk facts into one fact per field: the highest
+    confidence wins (earlier chunk on ties), and evidence from chunks that agree on
+    the same value is kept alongside the winner's. Fields keep first-seen order.
+    Also applied to a single chunk, so a field the model repeats is deduplicated.
+    """
+    candidates: dict[str, list[ExtractedFact]] = {}
+    for facts in chunk_facts:
+        for fact in facts:
+            candidates.setdefault(fact.field, []).append(fact)
+
+    merged = []
+    for field, facts in candidates.items():
+        best = max(facts, key=lambda f: f.confidence)  # max() keeps the first on ties
+        value = _normalize(str(best.value))
+        evidence, seen = [], set()
+        for fact in [best] + [f for f in facts if f is not best]:
+            if fact is not best and _normalize(str(fact.value)) != value:
+                continue
+            for ev in fact.evidence:
+                if (ev.page_no, ev.snippet) not in seen:
+                    seen.add((ev.page_no, ev.snippet))
+                    evidence.append(ev)
+        merged.append(best.model_copy(update={"evidence": evidence}))
+    return merged
+
+
+async def _extract_single(anonymized_pages: list[str], fields: list[str] | None) -> list[ExtractedFact]:
+    """One prompt over the whole document, truncated at the token budget."""
+    full_text = "\n\n".join(anonymized_pages)[:LLM_CHUNK_TOKENS * CHARS_PER_TOKEN]
+    prompt = TEXT_PROMPT.format(document=full_text, fields=_fields_block(fields))
+    facts = await _generate_facts(
+        _cache_key(_kind("text", fields), full_text.encode("utf-8")), prompt, "Gemini text extraction error"
+    )
+    return _only(facts, fields)
+
+
+async def _extract_chunk(chunk: list[tuple[int, str]], fields: list[str] | None) -> list[ExtractedFact]:
+    text = "\n\n".join(t for _, t in chunk)
+    prompt = TEXT_PROMPT.format(document=text, fields=_fields_block(fields))
+    facts = await _generate_facts(
+        _cache_key(_kind("text", fields), text.encode("utf-8")), prompt, "Gemini text extraction error"
+    )
+    _fix_evidence_pages(facts, chunk)
+    return _only(facts, fields)
+
+
+async def _extract_chunked(
+    anonymized_pages: list[str],
+    page_nos: list[int] | None,
+    fields: list[str] | None
+) -> list[ExtractedFact]:
+    """
+    Page-aligned chunks sent concurrently (within the Gemini cap), merged per field.
+    Failed chunks are logged and skipped; raises only when every chunk failed.
+    """
+    chunks = chunk_pages(anonymized_pages, page_nos=page_nos)
+    results = await asyncio.gather(*(_extract_chunk(chunk, fields) for chunk in chunks), return_exceptions=True)
+
+    succeeded = []
+    for chunk, result in zip(chunks, results):
+        if isinstance(result, BaseException):
+            metrics.count("llm_chunk_failures_total")
+            logger.warning("Chunk (pages %d-%d) failed: %s: %s", chunk[0][0], chunk[-1][0], type(result).__name__, result)
+        else:
+            succeeded.append(result)
+    if chunks and not succeeded:
+        raise results[0]
+    return merge_facts(succeeded)
+
+
+async def extract_facts_from_text(
+    page_texts: list[str],
+    mode: str | None = None,
+    page_nos: list[int] | None = None,
+    fields: list[str] | None = None
+) -> list[ExtractedFact]:
+    """
+    Use Gemini to extract facts from text (`mode`: "chunked" or "single", default
+    LLM_TEXT_MODE). `page_nos` gives the page number of each text (default 1..n);
+    `fields` limits the prompt to those PV_FIELDS.
+    """
+    if not GOOGLE_API_KEY:
         return []
+
+    # Anonymize before sending to external API
+    with metrics.span("anonymize"):
+        anonymized_pages = await asyncio.to_thread(anonymize_pages, page_texts, True)
+
+    with metrics.span("llm.extract", input="text"):
+        if (mode or LLM_TEXT_MODE) == "single":
+            return await _extract_single(anonymized_pages, fields)
+        return await _extract_chunked(anonymized_pages, page_nos, fields)
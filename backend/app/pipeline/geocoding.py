@@ -1,19 +1,52 @@
+import asyncio
 import httpx
 import json
-import time
+import logging
+import threading
 import hashlib
 from pathlib import Path
 from urllib.parse import quote
 
-from app.config import UPLOAD_DIR
+from app.config import UPLOAD_DIR, GEOCODE_NEGATIVE_TTL_DAYS, NOMINATIM_RATE_PER_S, NOMINATIM_URL
+from app import metrics
 from app.schemas import GeocodingResult
+from app.pipeline.cache_store import SQLiteCache, MISSING, opened_stats
+from app.pipeline.ratelimit import SharedTokenBucket
 
-NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
 USER_AGENT = "GreenLoanValidator/1.0 (LMA Hackathon)"
 CACHE_DIR = UPLOAD_DIR / "_geocache"
+LEGACY_CACHE_FILE = CACHE_DIR / "nominatim_cache.json"
+NEGATIVE_TTL = GEOCODE_NEGATIVE_TTL_DAYS * 86400
 
-# Rate limiting
-_last_request_time = 0.0
+logger = logging.getLogger(__name__)
+
+_cache: SQLiteCache | None = None
+_cache_lock = threading.Lock()
+
+# Shared HTTP client (created lazily on the running event loop)
+_client: httpx.AsyncClient | None = None
+
+# Rate limiting (one budget shared by every worker process and fallback query)
+_rate_limiter = SharedTokenBucket(CACHE_DIR / "nominatim_ratelimit.state", rate=NOMINATIM_RATE_PER_S)
+
+# Single-flight: concurrent lookups of the same address share one task
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Get the shared Nominatim client."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(headers={"User-Agent": USER_AGENT}, timeout=10)
+    return _client
+
+
+async def aclose_client():
+    """Close the shared Nominatim client (app shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
 
 
 def _get_cache_key(address: str) -> str:
@@ -22,71 +55,97 @@ def _get_cache_key(address: str) -> str:
     return hashlib.md5(normalized.encode()).hexdigest()
 
 
-def _load_cache() -> dict:
-    """Load geocoding cache from disk."""
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    cache_file = CACHE_DIR / "nominatim_cache.json"
-    if cache_file.exists():
-        try:
-            return json.loads(cache_file.read_text(encoding="utf-8"))
-        except Exception:
-            return {}
-    return {}
+def _migrate_legacy_cache(cache: SQLiteCache):
+    """Import the old whole-file JSON cache once, then set it aside."""
+    if not LEGACY_CACHE_FILE.exists():
+        return
+    try:
+        legacy = json.loads(LEGACY_CACHE_FILE.read_text(encoding="utf-8"))
+    except Exception as e:
+        logger.warning("Geocoding cache migration skipped: %s", e)
+        return
+    cache.set_many([
+        (key, value, NEGATIVE_TTL if value is None else None)
+        for key, value in legacy.items()
+    ])
+    LEGACY_CACHE_FILE.replace(LEGACY_CACHE_FILE.with_suffix(".json.migrated"))
 
 
-def _save_cache(cache: dict):
-    """Save geocoding cache to disk."""
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    cache_file = CACHE_DIR / "nominatim_cache.json"
-    cache_file.write_text(json.dumps(cache, indent=2), encoding="utf-8")
+def _get_cache() -> SQLiteCache:
+    """Geocoding cache (SQLite, shared by all worker processes)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:  # first use may come from several threads
+            if _cache is None:
+                cache = SQLiteCache(CACHE_DIR / "nominatim_cache.sqlite3")
+                _migrate_legacy_cache(cache)
+                _cache = cache
+    return _cache
 
 
-def _throttle():
-    """Enforce 1 request per second rate limit."""
-    global _last_request_time
-    elapsed = time.time() - _last_request_time
-    if elapsed < 1.0:
-        time.sleep(1.0 - elapsed)
-    _last_request_time = time.time()
+def cache_stats() -> dict:
+    return opened_stats(_cache)
 
 
-def _try_geocode(address: str) -> dict | None:
+async def _try_geocode(address: str) -> dict | None:
     """Single geocoding attempt."""
-    _throttle()
+    with metrics.span("nominatim.ratelimit_wait"):
+        await _rate_limiter.acquire()
+    metrics.count("external_requests_total", service="nominatim")
     try:
         params = {"q": address, "format": "json", "limit": 1, "addressdetails": 1}
-        headers = {"User-Agent": USER_AGENT}
-        response = httpx.get(NOMINATIM_URL, params=params, headers=headers, timeout=10)
+        with metrics.span("nominatim.request"):
+            response = await _get_client().get(NOMINATIM_URL, params=params)
         response.raise_for_status()
         data = response.json()
         return data[0] if data else None
+    except httpx.HTTPStatusError as e:
+        metrics.count("external_errors_total", service="nominatim", reason=f"http_{e.response.status_code}")
+        logger.warning("Geocoding HTTP error %s for %r", e.response.status_code, address)
+        return None
     except Exception as e:
-        print(f"Geocoding error for '{address}': {e}")
+        metrics.count("external_errors_total", service="nominatim", reason=type(e).__name__)
+        logger.warning("Geocoding error for %r: %s: %s", address, type(e).__name__, e)
         return None
 
 
-def geocode(address: str) -> GeocodingResult | None:
+async def geocode(address: str) -> GeocodingResult | None:
     """
     Geocode an address using Nominatim (international).
     Returns lat/lon coordinates or None if not found.
-    Uses file-based cache and respects 1 req/sec rate limit.
-    Falls back to city name if full address fails.
+    Uses the SQLite cache (negative results expire) and a rate limit shared across
+    worker processes. Falls back to city name if full address fails.
     """
     if not address or len(address.strip()) < 5:
         return None
 
-    # Check cache first
-    cache = _load_cache()
-    cache_key = _get_cache_key(address)
+    with metrics.span("geocode", cache="hit") as span:
+        # Check cache first (first use opens the database / migrates the legacy JSON file)
+        cache = await asyncio.to_thread(_get_cache)
+        cache_key = _get_cache_key(address)
+
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not MISSING:
+            if cached is None:
+                return None
+            return GeocodingResult(**cached)
+
+        # Join an in-flight lookup of the same normalized address
+        span.labels["cache"] = "miss"
+        task = _inflight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(_geocode_uncached(address, cache_key))
+            _inflight[cache_key] = task
+            task.add_done_callback(lambda _: _inflight.pop(cache_key, None))
+        return await asyncio.shield(task)
+
 
-    if cache_key in cache:
-        cached = cache[cache_key]
-        if cached is None:
-            return None
-        return GeocodingResult(**cached)
+async def _geocode_uncached(address: str, cache_key: str) -> GeocodingResult | None:
+    """Query Nominatim (with fallbacks) and cache the answer."""
+    cache = await asyncio.to_thread(_get_cache)
 
     # Try full address first
-    result = _try_geocode(address)
+    result = await _try_geocode(address)
 
     # Fallback: extract city/country and try again
     if not result:
@@ -95,15 +154,16 @@ def geocode(address: str) -> GeocodingResult | None:
         if len(parts) >= 2:
             # Try city + country
             fallback = ', '.join(parts[-2:])
-            result = _try_geocode(fallback)
+            metrics.count("external_retries_total", service="nominatim", reason="fallback_query")
+            result = await _try_geocode(fallback)
         if not result and len(parts) >= 1:
             # Try just last part (city or country)
-            result = _try_geocode(parts[-1])
+            metrics.count("external_retries_total", service="nominatim", reason="fallback_query")
+            result = await _try_geocode(parts[-1])
 
     if not result:
-        # Cache negative result
-        cache[cache_key] = None
-        _save_cache(cache)
+        # Cache negative result (expires, so typos/outages are retried later)
+        await asyncio.to_thread(cache.set, cache_key, None, NEGATIVE_TTL)
         return None
 
     address_details = result.get("address", {})
@@ -119,18 +179,17 @@ def geocode(address: str) -> GeocodingResult | None:
     )
 
     # Cache result
-    cache[cache_key] = geocoding_result.model_dump()
-    _save_cache(cache)
+    await asyncio.to_thread(cache.set, cache_key, geocoding_result.model_dump())
 
     return geocoding_result
 
 
-def extract_coordinates_from_address(address: str) -> tuple[float, float, float] | None:
+async def extract_coordinates_from_address(address: str) -> tuple[float, float, float] | None:
     """
     Extract lat, lon, confidence from address.
     Returns (lat, lon, confidence) or None.
     """
-    result = geocode(address)
+    result = await geocode(address)
     if result:
         return (result.lat, result.lon, result.confidence)
     return None
@@ -1,49 +1,163 @@
 import hashlib
+import multiprocessing
+import os
+import threading
 import fitz
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
-from app.config import UPLOAD_DIR
+from app.config import UPLOAD_DIR, PDF_WORKERS, PDF_PARALLEL_MIN_PAGES
 from app.schemas import DocumentMeta, PageInfo
+from app.pipeline.relevance import score_page
+from app.pipeline.word_index import PageWords, page_words, save_index
 
+SOURCE_PDF_NAME = "source.pdf"
 
-def process_pdf(file_bytes: bytes, filename: str) -> tuple[DocumentMeta, list[PageInfo], list[str]]:
-    """Process PDF: extract text, render pages."""
-    sha256 = hashlib.sha256(file_bytes).hexdigest()
-    doc_id = f"DOC-{datetime.now().strftime('%Y%m%d%H%M%S')}-{sha256[:6]}"
+# MuPDF is not thread-safe; serialize fitz work done from worker threads
+FITZ_LOCK = threading.Lock()
+
+# Process pool for large documents (each worker opens the saved PDF itself)
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Shared process pool for page-parallel PDF work (spawned lazily)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def use_process_pool(page_count: int) -> bool:
+    """Parallel mode pays off only for large documents."""
+    return PDF_WORKERS > 1 and page_count >= PDF_PARALLEL_MIN_PAGES
+
+
+def split_pages(page_nos: list[int], parts: int) -> list[list[int]]:
+    """Split pages into at most `parts` contiguous, ordered chunks."""
+    size = -(-len(page_nos) // max(1, parts))
+    return [page_nos[i:i + size] for i in range(0, len(page_nos), size)]
+
+
+def _extract_texts_and_words(pdf_path: str, page_nos: list[int]) -> list[tuple[str, PageWords]]:
+    """Process-pool worker: plain text and word geometry of the given pages, from one text parse each."""
+    results = []
+    with fitz.open(pdf_path) as pdf:
+        for page_no in page_nos:
+            page = pdf[page_no - 1]
+            textpage = page.get_textpage()
+            results.append((page.get_text(textpage=textpage), page_words(page, textpage)))
+    return results
+
+
+def _map_pages(pdf_path: Path, in_pool: bool, worker) -> list:
+    """
+    Run `worker(pdf_path, page_nos)` over every page, in order; split across
+    processes for large PDFs. `in_pool` sends small documents to the pool as
+    one task, so several documents (batch analysis) are extracted in parallel.
+    """
+    with FITZ_LOCK:
+        with fitz.open(pdf_path) as pdf:
+            page_count = pdf.page_count
+        split = use_process_pool(page_count)
+        if not split and not (in_pool and PDF_WORKERS > 1):
+            return worker(str(pdf_path), list(range(1, page_count + 1)))
+
+    pool = get_process_pool()
+    chunks = split_pages(list(range(1, page_count + 1)), PDF_WORKERS if split else 1)
+    futures = [pool.submit(worker, str(pdf_path), chunk) for chunk in chunks]
+    return [result for future in futures for result in future.result()]
+
+
+def extract_texts_and_words(pdf_path: Path, in_pool: bool = False) -> list[tuple[str, PageWords]]:
+    """Plain text and word geometry (see word_index.py) of every page, in order."""
+    return _map_pages(pdf_path, in_pool, _extract_texts_and_words)
+
+
+def make_doc_id(sha256: str) -> str:
+    """Build a document id from the upload time and content hash."""
+    return f"DOC-{datetime.now().strftime('%Y%m%d%H%M%S')}-{sha256[:6]}"
+
+
+def source_pdf_path(doc_id: str) -> Path | None:
+    """Stored PDF of a document (older documents kept the upload filename)."""
+    doc_dir = UPLOAD_DIR / doc_id
+    path = doc_dir / SOURCE_PDF_NAME
+    if path.exists():
+        return path
+    return next(doc_dir.glob("*.pdf"), None)
+
+
+def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def process_pdf(
+    source: bytes | Path,
+    filename: str,
+    doc_id: str | None = None,
+    in_pool: bool = False,
+    sha256: str | None = None
+) -> tuple[DocumentMeta, list[PageInfo], list[str]]:
+    """
+    Process PDF: save it and extract text. Pages are rendered on demand (see render.py).
+    `source` is the PDF bytes or a file on the same filesystem (a streamed upload),
+    which is moved into the document directory; `sha256` skips re-hashing it.
+    """
+    if isinstance(source, Path):
+        sha256 = sha256 or sha256_file(source)
+    else:
+        sha256 = sha256 or hashlib.sha256(source).hexdigest()
+    doc_id = doc_id or make_doc_id(sha256)
 
     doc_dir = UPLOAD_DIR / doc_id
     doc_dir.mkdir(parents=True, exist_ok=True)
-    (doc_dir / "pages").mkdir(exist_ok=True)
 
-    # Save PDF
-    (doc_dir / filename).write_bytes(file_bytes)
+    # Save PDF (text extraction and rendering open it from disk)
+    pdf_path = doc_dir / SOURCE_PDF_NAME
+    if isinstance(source, Path):
+        os.replace(source, pdf_path)
+    else:
+        pdf_path.write_bytes(source)
 
-    pdf = fitz.open(stream=file_bytes, filetype="pdf")
     page_texts = []
     page_info = []
+    words = []
 
-    for i, page in enumerate(pdf):
+    # Extract text (plus word boxes for evidence highlighting)
+    for i, (text, page_word_boxes) in enumerate(extract_texts_and_words(pdf_path, in_pool)):
+        words.append(page_word_boxes)
         page_no = i + 1
-
-        # Render to PNG
-        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-        pix.save(str(doc_dir / "pages" / f"{page_no:03d}.png"))
-
-        # Extract text
-        text = page.get_text()
         page_texts.append(f"--- STRONA {page_no} ---\n{text}")
 
         page_info.append(PageInfo(
             page_no=page_no,
             has_text=len(text.strip()) > 20,
-            char_count=len(text)
+            char_count=len(text),
+            relevance=score_page(text)
         ))
 
-    pdf.close()
-
-    # Save combined text
+    # Save combined text and the word index
     (doc_dir / "full_text.txt").write_text("\n\n".join(page_texts), encoding="utf-8")
+    save_index(doc_dir, words)
 
     meta = DocumentMeta(
         doc_id=doc_id,
@@ -1,38 +1,98 @@
+import asyncio
 import httpx
+import logging
+import threading
+from app.config import (
+    UPLOAD_DIR, PVGIS_API_URL, PVGIS_GRID_DEG, PVGIS_CACHE_TTL_DAYS, PVGIS_CACHE_MAX_ENTRIES, PVGIS_CONCURRENCY,
+)
+from app import metrics
 from app.schemas import PVGISResult
+from app.pipeline.cache_store import SQLiteCache, MISSING, opened_stats
 from app.pipeline.solar_constants import estimate_angle_from_latitude
 
-PVGIS_API_URL = "https://re.jrc.ec.europa.eu/api/v5_2/PVcalc"
+CACHE_DIR = UPLOAD_DIR / "_pvgiscache"
 
+logger = logging.getLogger(__name__)
 
-def get_pvgis_estimate(
-    lat: float,
-    lon: float,
-    peak_power_kwp: float,
-    loss: float = 14.0,
-    angle: float | None = None,
-    aspect: float | None = None
-) -> PVGISResult | None:
-    """
-    Get PV yield estimate from EU JRC PVGIS API.
+# Shared HTTP client and API concurrency limit (created lazily on the running event loop)
+_client: httpx.AsyncClient | None = None
+_semaphore: asyncio.Semaphore | None = None  # concurrent API calls per process
 
-    Args:
-        lat: Latitude
-        lon: Longitude
-        peak_power_kwp: System size in kWp
-        loss: System losses in % (default 14%)
-        angle: Panel tilt angle in degrees (None = let PVGIS optimize)
-        aspect: Azimuth, 0=South, -90=East, 90=West (None = let PVGIS optimize)
+# Per-kWp yield profiles: output scales linearly with peakpower, so one
+# PVGIS call per grid cell + parameters serves every system size
+_cache: SQLiteCache | None = None
+_cache_lock = threading.Lock()
+_inflight: dict[str, asyncio.Task] = {}
+_api_calls = 0
+_api_errors = 0
 
-    Returns:
-        PVGISResult with annual_kwh, kwh_per_kwp, monthly_kwh
-        or None if API call fails
-    """
+
+def _get_client() -> httpx.AsyncClient:
+    """Get the shared PVGIS client."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(timeout=15)
+    return _client
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Get the limit on concurrent PVGIS calls."""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(PVGIS_CONCURRENCY)
+    return _semaphore
+
+
+async def aclose_client():
+    """Close the shared PVGIS client (app shutdown)."""
+    global _client, _semaphore
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _semaphore = None
+
+
+def _get_cache() -> SQLiteCache:
+    """PVGIS profile cache (SQLite, shared by all worker processes)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:  # first use may come from several threads
+            if _cache is None:
+                _cache = SQLiteCache(CACHE_DIR / "pvgis_cache.sqlite3", max_entries=PVGIS_CACHE_MAX_ENTRIES)
+    return _cache
+
+
+def cache_stats() -> dict:
+    return {**opened_stats(_cache), "api_calls": _api_calls, "api_errors": _api_errors}
+
+
+def snap_to_grid(lat: float, lon: float) -> tuple[float, float]:
+    """Center of the PVGIS_GRID_DEG cell containing (lat, lon)."""
+    return (
+        round(round(lat / PVGIS_GRID_DEG) * PVGIS_GRID_DEG, 4),
+        round(round(lon / PVGIS_GRID_DEG) * PVGIS_GRID_DEG, 4),
+    )
+
+
+def _cache_key(lat: float, lon: float, loss: float, angle: float | None, aspect: float | None) -> str:
+    orientation = "opt" if angle is None or aspect is None else f"{angle:g}/{aspect:g}"
+    return f"{lat:.4f}:{lon:.4f}:{loss:g}:{orientation}"
+
+
+async def _fetch_per_kwp(
+    lat: float,
+    lon: float,
+    loss: float,
+    angle: float | None,
+    aspect: float | None
+) -> dict | None:
+    """Call PVGIS for a 1 kWp reference system. Returns {kwh_per_kwp, monthly_kwh_per_kwp[, optimal_angle]}."""
+    global _api_calls, _api_errors
     try:
         params = {
             "lat": lat,
             "lon": lon,
-            "peakpower": peak_power_kwp,
+            "peakpower": 1,
             "loss": loss,
             "outputformat": "json",
             "pvtechchoice": "crystSi"  # Crystalline silicon
@@ -45,7 +105,11 @@ def get_pvgis_estimate(
             params["angle"] = angle
             params["aspect"] = aspect
 
-        response = httpx.get(PVGIS_API_URL, params=params, timeout=15)
+        async with _get_semaphore():
+            _api_calls += 1
+            metrics.count("external_requests_total", service="pvgis")
+            with metrics.span("pvgis.request"):
+                response = await _get_client().get(PVGIS_API_URL, params=params)
         response.raise_for_status()
 
         data = response.json()
@@ -58,29 +122,106 @@ def get_pvgis_estimate(
         monthly_data = data.get("outputs", {}).get("monthly", {}).get("fixed", [])
         monthly_kwh = [m.get("E_m", 0) for m in monthly_data] if monthly_data else []
 
-        # Calculate kWh per kWp
-        kwh_per_kwp = annual_kwh / peak_power_kwp if peak_power_kwp > 0 else 0
+        profile = {"kwh_per_kwp": annual_kwh, "monthly_kwh_per_kwp": monthly_kwh}
 
-        return PVGISResult(
-            annual_kwh=round(annual_kwh, 1),
-            kwh_per_kwp=round(kwh_per_kwp, 1),
-            monthly_kwh=[round(m, 1) for m in monthly_kwh]
-        )
+        # Optimal tilt chosen by PVGIS (feeds the offline yield grid)
+        slope = data.get("inputs", {}).get("mounting_system", {}).get("fixed", {}).get("slope", {})
+        if slope.get("optimal") and slope.get("value") is not None:
+            profile["optimal_angle"] = slope["value"]
+
+        return profile
 
     except httpx.HTTPStatusError as e:
-        print(f"PVGIS HTTP error: {e.response.status_code}")
+        _api_errors += 1
+        metrics.count("external_errors_total", service="pvgis", reason=f"http_{e.response.status_code}")
+        logger.warning("PVGIS HTTP error %s at (%.4f, %.4f)", e.response.status_code, lat, lon)
         return None
     except Exception as e:
-        print(f"PVGIS error: {e}")
+        _api_errors += 1
+        metrics.count("external_errors_total", service="pvgis", reason=type(e).__name__)
+        logger.warning("PVGIS error at (%.4f, %.4f): %s: %s", lat, lon, type(e).__name__, e)
+        return None
+
+
+async def _get_per_kwp(
+    lat: float,
+    lon: float,
+    loss: float,
+    angle: float | None,
+    aspect: float | None
+) -> dict | None:
+    """Per-kWp profile from the cache, or one (coalesced) PVGIS call per grid cell."""
+    lat, lon = snap_to_grid(lat, lon)
+    key = _cache_key(lat, lon, loss, angle, aspect)
+    cache = await asyncio.to_thread(_get_cache)
+
+    with metrics.span("pvgis", cache="hit") as span:
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not MISSING:
+            return cached
+
+        span.labels["cache"] = "miss"
+        task = _inflight.get(key)
+        if task is None:
+            async def fetch():
+                profile = await _fetch_per_kwp(lat, lon, loss, angle, aspect)
+                if profile is not None:
+                    await asyncio.to_thread(cache.set, key, profile, PVGIS_CACHE_TTL_DAYS * 86400)
+                return profile
+
+            task = asyncio.create_task(fetch())
+            _inflight[key] = task
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+
+async def get_pvgis_estimate(
+    lat: float,
+    lon: float,
+    peak_power_kwp: float,
+    loss: float = 14.0,
+    angle: float | None = None,
+    aspect: float | None = None
+) -> PVGISResult | None:
+    """
+    Get PV yield estimate from EU JRC PVGIS API.
+
+    Results are cached per PVGIS_GRID_DEG cell for a 1 kWp system and scaled
+    to peak_power_kwp locally.
+
+    Args:
+        lat: Latitude
+        lon: Longitude
+        peak_power_kwp: System size in kWp
+        loss: System losses in % (default 14%)
+        angle: Panel tilt angle in degrees (None = let PVGIS optimize)
+        aspect: Azimuth, 0=South, -90=East, 90=West (None = let PVGIS optimize)
+
+    Returns:
+        PVGISResult with annual_kwh, kwh_per_kwp, monthly_kwh
+        or None if API call fails
+    """
+    profile = await _get_per_kwp(lat, lon, loss, angle, aspect)
+    if profile is None:
         return None
 
+    kwh_per_kwp = profile["kwh_per_kwp"] if peak_power_kwp > 0 else 0
+    annual_kwh = profile["kwh_per_kwp"] * peak_power_kwp
+    monthly_kwh = [m * peak_power_kwp for m in profile["monthly_kwh_per_kwp"]]
+
+    return PVGISResult(
+        annual_kwh=round(annual_kwh, 1),
+        kwh_per_kwp=round(kwh_per_kwp, 1),
+        monthly_kwh=[round(m, 1) for m in monthly_kwh]
+    )
+
 
-def estimate_yield_for_location(lat: float, lon: float) -> float | None:
+async def estimate_yield_for_location(lat: float, lon: float) -> float | None:
     """
     Get expected kWh/kWp/year for a location using 1 kWp reference system.
     Returns the specific yield or None if API fails.
     """
-    result = get_pvgis_estimate(lat, lon, peak_power_kwp=1.0)
+    result = await get_pvgis_estimate(lat, lon, peak_power_kwp=1.0)
     if result:
         return result.kwh_per_kwp
     return None
@@ -0,0 +1,68 @@
+"""
+Token-bucket rate limiter shared by all worker processes.
+
+The bucket state (tokens, last refill time) lives in a tiny file guarded by
+an exclusive flock, so N gunicorn workers together stay within one budget.
+Callers reserve a token under the lock (microseconds) and then wait for it
+with asyncio.sleep, so the event loop is never blocked.
+
+On platforms without fcntl (Windows dev setups) the bucket is per-process.
+"""
+import asyncio
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+_STATE = struct.Struct("<dd")  # tokens, updated_at
+
+
+class SharedTokenBucket:
+    def __init__(self, path: Path, rate: float, burst: int = 1):
+        self.path = Path(path)
+        self.rate = rate
+        self.burst = burst
+        self._local_lock = threading.Lock()
+        self._local_state = (float(burst), time.time())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _refill_and_take(self, tokens: float, updated_at: float, now: float) -> tuple[float, float]:
+        """Take one token; returns (new token count, seconds to wait for it)."""
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate) - 1
+        wait = -tokens / self.rate if tokens < 0 else 0.0
+        return tokens, wait
+
+    def reserve(self) -> float:
+        """Reserve the next token and return how long to wait before using it."""
+        # The clock is read under the lock: a timestamp taken before waiting for
+        # it could be older than the state another process just wrote
+        if fcntl is None:
+            with self._local_lock:
+                now = time.time()
+                tokens, wait = self._refill_and_take(*self._local_state, now)
+                self._local_state = (tokens, now)
+                return wait
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            now = time.time()
+            raw = os.pread(fd, _STATE.size, 0)
+            state = _STATE.unpack(raw) if len(raw) == _STATE.size else (float(self.burst), now)
+            tokens, wait = self._refill_and_take(*state, now)
+            os.pwrite(fd, _STATE.pack(tokens, now), 0)
+            return wait
+        finally:
+            os.close(fd)  # releases the lock
+
+    async def acquire(self):
+        """Wait (asynchronously) until a request may be sent."""
+        wait = await asyncio.to_thread(self.reserve)
+        if wait > 0:
+            await asyncio.sleep(wait)
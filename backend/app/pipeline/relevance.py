@@ -0,0 +1,77 @@
+"""
+Local page-relevance scoring: ranks pages by density of PV signals so only
+pertinent pages are sent to Gemini.
+
+Signals: unit tokens (kWp, kWh, MWh, Wp, kW, m²), currencies, numbers
+followed by a unit, and multilingual keywords for the PV_FIELDS list.
+Scores are weighted hits per 1000 characters (pages shorter than
+MIN_PAGE_CHARS count as that long, so a single hit on a near-empty page
+does not dominate).
+"""
+import re
+
+from app.config import RELEVANCE_TOP_N, RELEVANCE_MIN_SCORE
+from app.schemas import PageInfo
+
+MIN_PAGE_CHARS = 500
+
+_UNIT = r"(?:kWp|MWp|Wp|kWh|MWh|GWh|kW|MW|m²|m2)"
+_CURRENCY = r"(?:PLN|EUR|USD|GBP|CHF|CZK|zł|€|\$|£)"
+
+UNIT_PATTERN = re.compile(rf"(?<![A-Za-z]){_UNIT}(?![A-Za-z0-9])")
+CURRENCY_PATTERN = re.compile(rf"(?<![A-Za-z]){_CURRENCY}(?![A-Za-z])")
+NUMBER_WITH_UNIT_PATTERN = re.compile(
+    rf"\d[\d\s.,]*\s?(?:{_UNIT}|{_CURRENCY})(?:\s?/\s?(?:kWp|rok|year|Jahr|a))?"
+)
+
+# Stems matched case-insensitively at word start (PL / EN / DE)
+KEYWORDS = [
+    # power, system type, panels, modules
+    "moc", "power", "leistung", "fotowolt", "photovolt", "instalac", "installation", "anlage",
+    "panel", "moduł", "modul", "module", "dach", "roof", "gruntow", "ground",
+    # inverter, grid
+    "falownik", "inwerter", "inverter", "wechselrichter", "przyłącz", "grid", "netz", "osd",
+    # yield, energy
+    "uzysk", "produkc", "yield", "ertrag", "energi", "energy", "roczn", "annual", "jährlich",
+    # cost, supplier
+    "cena", "koszt", "price", "cost", "preis", "kosten", "netto", "brutto", "capex",
+    "wykonawc", "contractor", "epc", "lokalizac", "location", "standort", "adres", "address",
+]
+KEYWORD_PATTERN = re.compile(r"\b(?:" + "|".join(re.escape(k) for k in KEYWORDS) + r")", re.IGNORECASE)
+
+WEIGHTS = {
+    "number_with_unit": 4.0,
+    "unit": 2.0,
+    "currency": 1.0,
+    "keyword": 0.3,
+}
+
+
+def score_page(text: str) -> float:
+    """PV relevance of one page's text (weighted signal hits per 1000 chars)."""
+    if not text.strip():
+        return 0.0
+    hits = (
+        WEIGHTS["number_with_unit"] * len(NUMBER_WITH_UNIT_PATTERN.findall(text))
+        + WEIGHTS["unit"] * len(UNIT_PATTERN.findall(text))
+        + WEIGHTS["currency"] * len(CURRENCY_PATTERN.findall(text))
+        + WEIGHTS["keyword"] * len(KEYWORD_PATTERN.findall(text))
+    )
+    return round(hits * 1000 / max(len(text), MIN_PAGE_CHARS), 2)
+
+
+def select_pages(
+    pages: list[PageInfo],
+    top_n: int = RELEVANCE_TOP_N,
+    min_score: float = RELEVANCE_MIN_SCORE
+) -> list[PageInfo]:
+    """
+    Pages worth sending to the LLM: the `top_n` highest-ranked plus any scoring at
+    least `min_score` (top_n <= 0 disables filtering). Keeps document order.
+    """
+    if top_n <= 0 or len(pages) <= top_n:
+        return list(pages)
+    ranked = sorted(pages, key=lambda p: (-p.relevance, p.page_no))
+    keep = {p.page_no for p in ranked[:top_n]}
+    keep.update(p.page_no for p in pages if p.relevance >= min_score)
+    return [p for p in pages if p.page_no in keep]
@@ -0,0 +1,197 @@
+"""
+On-demand page rendering with a size-bounded disk cache.
+
+Pages are rendered from the stored PDF the first time they are needed by the
+page viewer, one image per size variant (PAGE_SIZES: thumb, screen, full), and
+cached as UPLOAD_DIR/<doc_id>/pages/NNN-<size>.webp (or .jpg).
+When the cache grows past RENDER_CACHE_MAX_MB the least recently used
+images are deleted; they are simply re-rendered on the next request. Images
+served in the last EVICT_GRACE_S seconds are kept, so a response that is
+about to stream a file never loses it.
+
+Images for vision extraction are rendered separately, in memory, at a lower
+DPI and JPEG-encoded; they never touch the disk cache.
+"""
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import fitz
+from pathlib import Path
+
+from app.config import (
+    UPLOAD_DIR, RENDER_CACHE_MAX_MB, PAGE_IMAGE_FORMAT, PDF_WORKERS, VISION_DPI, VISION_JPEG_QUALITY,
+)
+from app import metrics
+from app.pipeline.pdf_processor import (
+    FITZ_LOCK, source_pdf_path, sha256_file, get_process_pool, use_process_pool, split_pages,
+)
+
+try:
+    from PIL import Image, features
+    _WEBP = features.check("webp")
+except ImportError:  # optional dependency
+    _WEBP = False
+
+RENDER_MATRIX = fitz.Matrix(2, 2)
+
+# Size variant -> (target width in px, None = 2x zoom; encoder quality).
+# WebP uses encoder method 2: ~2% larger than the default 4 at half the encode time
+PAGE_SIZES = {
+    "thumb": (160, 60),
+    "screen": (900, 80),
+    "full": (None, 85),
+}
+DEFAULT_PAGE_SIZE = "full"
+
+IMAGE_FORMAT = "webp" if PAGE_IMAGE_FORMAT == "webp" and _WEBP else "jpeg"
+MEDIA_TYPE = f"image/{IMAGE_FORMAT}"
+IMAGE_SUFFIX = ".webp" if IMAGE_FORMAT == "webp" else ".jpg"
+CACHED_SUFFIXES = {".png", ".jpg", ".webp"}
+
+# Recently rendered/served images are never evicted (a FileResponse may be about to open them)
+EVICT_GRACE_S = 10.0
+
+_budget_lock = threading.Lock()
+_cache_bytes: int | None = None  # running total, synced from disk on first use/eviction
+
+
+def page_image_path(doc_id: str, page_no: int, size: str = DEFAULT_PAGE_SIZE) -> Path:
+    return UPLOAD_DIR / doc_id / "pages" / f"{page_no:03d}-{size}{IMAGE_SUFFIX}"
+
+
+def _encode_page(page: fitz.Page, size: str) -> bytes:
+    """Render one size variant of a page and encode it as WebP/JPEG."""
+    width, quality = PAGE_SIZES[size]
+    matrix = RENDER_MATRIX if width is None else fitz.Matrix(width / page.rect.width, width / page.rect.width)
+    pix = page.get_pixmap(matrix=matrix, alpha=False)
+    if IMAGE_FORMAT == "webp":
+        buf = io.BytesIO()
+        Image.frombytes("RGB", (pix.width, pix.height), pix.samples).save(buf, "WEBP", quality=quality, method=2)
+        return buf.getvalue()
+    return pix.tobytes("jpg", jpg_quality=quality)
+
+
+DOC_INFO_CACHE_SIZE = 1024
+_info_lock = threading.Lock()
+_doc_info: OrderedDict[str, tuple[str, int]] = OrderedDict()  # LRU
+
+
+def document_info(doc_id: str) -> tuple[str, int] | None:
+    """(sha256, page count) of the stored PDF (LRU-cached per process), or None if there is none."""
+    with _info_lock:
+        info = _doc_info.get(doc_id)
+        if info is not None:
+            _doc_info.move_to_end(doc_id)
+    if info is None:
+        pdf_path = source_pdf_path(doc_id)
+        if pdf_path is None:
+            return None
+        sha = sha256_file(pdf_path)
+        with FITZ_LOCK, fitz.open(pdf_path) as pdf:
+            info = (sha, pdf.page_count)
+        with _info_lock:
+            _doc_info[doc_id] = info
+            while len(_doc_info) > DOC_INFO_CACHE_SIZE:
+                _doc_info.popitem(last=False)
+    return info
+
+
+def _write_image(path: Path, data: bytes):
+    """Atomic write so concurrent readers never see a partial image."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _cached_images() -> list[tuple[float, int, Path]]:
+    """(mtime, size, path) of every cached page image."""
+    entries = []
+    for path in UPLOAD_DIR.glob("*/pages/*"):
+        if path.suffix not in CACHED_SUFFIXES:
+            continue
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    return entries
+
+
+def _account(added_bytes: int):
+    """Track cache size and evict least recently used images over budget (sparing recently used ones)."""
+    global _cache_bytes
+    budget = RENDER_CACHE_MAX_MB * 1024 * 1024
+    with _budget_lock:
+        if _cache_bytes is None:
+            _cache_bytes = sum(size for _, size, _ in _cached_images())
+        else:
+            _cache_bytes += added_bytes
+        if _cache_bytes <= budget:
+            return
+
+        entries = sorted(_cached_images())
+        total = sum(size for _, size, _ in entries)
+        target = int(budget * 0.9)
+        cutoff = time.time() - EVICT_GRACE_S
+        for mtime, size, path in entries:
+            if total <= target or mtime >= cutoff:  # sorted: the rest is recent too
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        _cache_bytes = total
+
+
+def render_page(doc_id: str, page_no: int, size: str = DEFAULT_PAGE_SIZE) -> Path | None:
+    """Return the cached page image variant, rendering it from the PDF if needed."""
+    path = page_image_path(doc_id, page_no, size)
+    if path.exists():
+        os.utime(path)  # LRU bookkeeping
+        return path
+
+    pdf_path = source_pdf_path(doc_id)
+    if pdf_path is None:
+        return None
+
+    with metrics.span("render.page", size=size), FITZ_LOCK:
+        with fitz.open(pdf_path) as pdf:
+            if not 1 <= page_no <= pdf.page_count:
+                return None
+            data = _encode_page(pdf[page_no - 1], size)
+
+    _write_image(path, data)
+    _account(len(data))
+    return path
+
+
+def _render_jpegs(pdf_path: str, page_nos: list[int], dpi: int, quality: int) -> list[tuple[int, bytes]]:
+    """Render pages straight from the pixmap to JPEG bytes (also a process-pool worker)."""
+    images = []
+    with fitz.open(pdf_path) as pdf:
+        for page_no in page_nos:
+            if not 1 <= page_no <= pdf.page_count:
+                continue
+            pix = pdf[page_no - 1].get_pixmap(dpi=dpi)
+            images.append((page_no, pix.tobytes("jpg", jpg_quality=quality)))
+    return images
+
+
+def render_vision_images(doc_id: str, page_nos: list[int]) -> list[tuple[int, bytes]]:
+    """In-memory (page_no, JPEG) pairs for vision extraction; missing pages are skipped."""
+    pdf_path = source_pdf_path(doc_id)
+    if pdf_path is None or not page_nos:
+        return []
+
+    if use_process_pool(len(page_nos)):
+        pool = get_process_pool()
+        futures = [
+            pool.submit(_render_jpegs, str(pdf_path), chunk, VISION_DPI, VISION_JPEG_QUALITY)
+            for chunk in split_pages(page_nos, PDF_WORKERS)
+        ]
+        return [image for future in futures for image in future.result()]
+
+    with FITZ_LOCK:
+        return _render_jpegs(str(pdf_path), page_nos, VISION_DPI, VISION_JPEG_QUALITY)
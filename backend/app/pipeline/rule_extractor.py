@@ -0,0 +1,300 @@
+"""
+Deterministic rule-based fact extraction (no LLM).
+
+Finds the standard phrasing of PV offers ("49,5 kWp", "1050 kWh/kWp",
+"Liczba paneli: 110 szt.", ...) with multilingual (PL/EN/DE) keywords, a
+small unit grammar and PL/EN/DE number formats. Each candidate gets a
+confidence from its context; candidates are combined per field and
+conflicting values lower the confidence. Facts are marked source="rules".
+
+`can_skip_llm` / `missing_fields` decide what is left for Gemini: nothing
+when the required fields were found confidently, otherwise only the fields
+still missing.
+"""
+import re
+from dataclasses import dataclass
+
+from app.config import RULES_MIN_CONFIDENCE, RULES_REQUIRED_FIELDS
+from app.schemas import ExtractedFact, Evidence
+
+# "49,5" / "49.5" / "1 050" / "1.050" / "195 000,00" / "1,234.5" (never starting mid-number)
+NUMBER = r"(?<!\d)(\d{1,3}(?:[ \u00a0.,]\d{3})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?)"
+_SPACE_GROUPED = re.compile(r"\d{1,3}(?: \d{3})+(?:[.,]\d+)?")
+
+CURRENCIES = {
+    "pln": "PLN", "zł": "PLN", "zl": "PLN", "eur": "EUR", "€": "EUR", "usd": "USD", "$": "USD",
+    "gbp": "GBP", "£": "GBP", "chf": "CHF", "czk": "CZK",
+}
+_CURRENCY = r"(PLN|zł|zl|EUR|€|USD|\$|GBP|£|CHF|CZK)"
+
+KEYWORDS = {
+    "power": r"moc|power|leistung|instalac|installation|system|anlage|elektrowni",
+    "yield": r"uzysk|yield|ertrag|produkc|production|spezifisch|specific",
+    "energy": r"roczn|rocznie|annual|year|/rok|jährlich|jahr|produkc|production|ertrag|energi|energy",
+    "capex": r"koszt|cena|warto|price|cost|total|preis|kosten|investition|inwestycj|capex|netto|brutto",
+    "capex_total": r"całkowit|calkowit|łączn|laczn|ogółem|ogolem|razem|total|gesamt|summe",
+    "area": r"dach|roof|powierzchn|area|fläche|flaeche",
+    "module": r"moduł|modul|module|panel",
+    "inverter": r"falownik|inwerter|inverter|wechselrichter",
+}
+
+RANGES = {
+    "declared_power_kwp": (0.5, 500_000),
+    "declared_yield_kwh_per_kwp": (400, 2500),
+    "declared_annual_energy_mwh": (0.1, 1_000_000),
+    "capex_total": (1000, 1e10),
+    "roof_area_m2": (5, 1_000_000),
+    "panels_count": (1, 1_000_000),
+    "module_watt_peak": (100, 1000),
+    "inverter_power_kw": (1, 100_000),
+}
+
+POWER_PATTERN = re.compile(NUMBER + r"\s*(kWp|MWp)(?![a-z/])", re.IGNORECASE)
+YIELD_PATTERN = re.compile(NUMBER + r"\s*kWh\s*/\s*kWp", re.IGNORECASE)
+ENERGY_PATTERN = re.compile(NUMBER + r"\s*(GWh|MWh|kWh)(?!\s*/\s*kWp)(?![a-z])", re.IGNORECASE)
+CAPEX_PATTERN = re.compile(
+    NUMBER + r"\s*" + _CURRENCY + r"(?![a-z/])|" + _CURRENCY + r"\s*" + NUMBER + r"(?![\d/])", re.IGNORECASE
+)
+AREA_PATTERN = re.compile(NUMBER + r"\s*(m²|m2|m\^2|qm)(?![a-z\d])", re.IGNORECASE)
+MODULE_WP_PATTERN = re.compile(NUMBER + r"\s*(Wp|W)(?![a-z])", re.IGNORECASE)
+INVERTER_KW_PATTERN = re.compile(NUMBER + r"\s*kW(?![a-z])", re.IGNORECASE)
+PANELS_PATTERNS = [
+    re.compile(
+        r"(?:liczba|ilo[śs][ćc]|number of|anzahl(?: der)?)\s+(?:paneli|modułów|modulow|moduł[óo]w|panels|modules|module|pv-module)"
+        r"[^\d\n]{0,15}(\d[\d \u00a0.]*)", re.IGNORECASE
+    ),
+    re.compile(
+        r"(\d[\d \u00a0]*)\s*(?:szt\.?|pcs\.?|stk\.?|stück|x)\s*(?:paneli|modułów|modulow|panels|modules|module)",
+        re.IGNORECASE
+    ),
+    re.compile(
+        r"(?:panel|moduł|modul|module)[^\n]{0,60}?[-–:]\s*(\d[\d \u00a0]*)\s*(?:szt|pcs|stk|stück)",
+        re.IGNORECASE
+    ),
+]
+SYSTEM_TYPES = [
+    ("rooftop", re.compile(r"dachow|rooftop|roof-mounted|on the roof|aufdach|dachanlage|na dachu", re.IGNORECASE)),
+    ("ground-mounted", re.compile(
+        r"naziemn|gruntow|na gruncie|ground-mounted|ground mounted|freifläche|freiflaeche", re.IGNORECASE
+    )),
+]
+LOCATION_LABEL = re.compile(
+    r"^\s*(?:lokalizacja(?: projektu| inwestycji)?|adres inwestycji|miejsce instalacji|(?:project |site )?location"
+    r"|site address|installation address|standort|anlagenstandort)\s*:?\s*(.*)$",
+    re.IGNORECASE
+)
+ADDRESS_HINT = re.compile(r"\bul\.|\bal\.|\d{2}-\d{3}|\d+\s*,|,\s*\w+|street|straße|str\.", re.IGNORECASE)
+UNIT_IN_TEXT = re.compile(r"\d\s*(?:kWp|kWh|MWh|kW|Wp|PLN|EUR|m2|m²)", re.IGNORECASE)
+
+# Quantities never written with three decimals: "1.050" / "1,050" is a thousands group
+INTEGRAL_FIELDS = {"declared_yield_kwh_per_kwp", "capex_total", "roof_area_m2", "panels_count", "module_watt_peak"}
+
+BASE_CONFIDENCE = 0.9  # keyword on the line (or the label line above it)
+NO_KEYWORD_CONFIDENCE = 0.7
+
+
+@dataclass
+class _Candidate:
+    field: str
+    value: str | float | int
+    unit: str | None
+    confidence: float
+    page_no: int
+    snippet: str
+
+
+def parse_number(text: str, unit_context: bool = False, integral: bool = False) -> float | None:
+    """
+    Parse PL/EN/DE formatted numbers ("1 050,5", "1.050,5", "1,050.5", "49.5").
+
+    Two or more three-digit groups are always thousands groups. A single one
+    needs context: a space only when the number is attached to a unit or currency
+    (`unit_context`; otherwise it ends the number, "2024 100" -> 2024), a dot or
+    comma only for quantities never given to three decimals (`integral`, e.g.
+    money or kWh/kWp; otherwise "12.500" -> 12.5).
+    """
+    s = text.strip().replace("\u00a0", " ")
+    if " " in s:
+        if _SPACE_GROUPED.fullmatch(s) and (s.count(" ") > 1 or unit_context):
+            s = s.replace(" ", "")
+        else:
+            s = s.split(" ", 1)[0]
+    if "," in s and "." in s:
+        decimal = "," if s.rfind(",") > s.rfind(".") else "."
+        s = s.replace("." if decimal == "," else ",", "").replace(decimal, ".")
+    elif "," in s or "." in s:
+        sep = "," if "," in s else "."
+        head, _, tail = s.rpartition(sep)
+        if s.count(sep) > 1 or (integral and len(tail) == 3 and len(head) <= 3 and head != "0"):
+            s = s.replace(sep, "")
+        else:
+            s = s.replace(sep, ".")
+    try:
+        return float(s)
+    except ValueError:
+        return None
+
+
+def _clean(value: float) -> float | int:
+    return int(value) if value == int(value) else round(value, 3)
+
+
+def _has(keyword: str, context: str) -> bool:
+    return re.search(KEYWORDS[keyword], context, re.IGNORECASE) is not None
+
+
+def _in_range(field: str, value: float | None) -> bool:
+    low, high = RANGES[field]
+    return value is not None and low <= value <= high
+
+
+def _line_candidates(line: str, context: str, page_no: int) -> list[_Candidate]:
+    """Candidates from one line; `context` is the line plus the line above it."""
+    found = []
+    snippet = line.strip()[:200]
+
+    def add(field, value, unit, confidence):
+        found.append(_Candidate(field, value, unit, confidence, page_no, snippet))
+
+    for m in YIELD_PATTERN.finditer(line):
+        value = parse_number(m.group(1), unit_context=True, integral=True)
+        if _in_range("declared_yield_kwh_per_kwp", value):
+            conf = BASE_CONFIDENCE if _has("yield", context) else NO_KEYWORD_CONFIDENCE
+            add("declared_yield_kwh_per_kwp", _clean(value), "kWh/kWp", conf)
+
+    for m in POWER_PATTERN.finditer(line):
+        value = parse_number(m.group(1), unit_context=True)
+        if value is not None and m.group(2).lower() == "mwp":
+            value *= 1000
+        if _in_range("declared_power_kwp", value):
+            conf = BASE_CONFIDENCE if _has("power", context) else NO_KEYWORD_CONFIDENCE
+            add("declared_power_kwp", _clean(value), "kWp", conf)
+
+    if _has("energy", context):
+        for m in ENERGY_PATTERN.finditer(line):
+            value = parse_number(m.group(1), unit_context=True)
+            if value is None:
+                continue
+            value *= {"gwh": 1000, "mwh": 1, "kwh": 0.001}[m.group(2).lower()]
+            if _in_range("declared_annual_energy_mwh", value):
+                add("declared_annual_energy_mwh", _clean(value), "MWh", BASE_CONFIDENCE)
+
+    if _has("capex", context):
+        for m in CAPEX_PATTERN.finditer(line):
+            number, currency = (m.group(1), m.group(2)) if m.group(1) else (m.group(4), m.group(3))
+            value = parse_number(number, unit_context=True, integral=True)
+            if _in_range("capex_total", value):
+                # Totals are the figure we want; other cost lines are only a weak hint
+                conf = BASE_CONFIDENCE if _has("capex_total", context) else NO_KEYWORD_CONFIDENCE
+                code = CURRENCIES[currency.lower()]
+                add("capex_total", _clean(value), code, conf)
+                add("capex_currency", code, None, conf)
+
+    if _has("area", context):
+        for m in AREA_PATTERN.finditer(line):
+            value = parse_number(m.group(1), unit_context=True, integral=True)
+            if _in_range("roof_area_m2", value):
+                add("roof_area_m2", _clean(value), "m²", BASE_CONFIDENCE)
+
+    if _has("module", context):
+        for m in MODULE_WP_PATTERN.finditer(line):
+            value = parse_number(m.group(1), unit_context=True, integral=True)
+            if _in_range("module_watt_peak", value):
+                add("module_watt_peak", _clean(value), "Wp", BASE_CONFIDENCE)
+        for pattern in PANELS_PATTERNS:
+            for m in pattern.finditer(line):
+                value = parse_number(m.group(1).strip(), unit_context=True, integral=True)
+                if _in_range("panels_count", value) and value == int(value):
+                    add("panels_count", int(value), None, BASE_CONFIDENCE)
+
+    if _has("inverter", context):
+        for m in INVERTER_KW_PATTERN.finditer(line):
+            value = parse_number(m.group(1), unit_context=True)
+            if _in_range("inverter_power_kw", value):
+                add("inverter_power_kw", _clean(value), "kW", BASE_CONFIDENCE)
+
+    for system_type, pattern in SYSTEM_TYPES:
+        if pattern.search(line):
+            add("system_type", system_type, None, 0.8)
+
+    return found
+
+
+def _location_candidates(lines: list[str], page_no: int) -> list[_Candidate]:
+    """Value after a location label, on the same line or the next non-empty one."""
+    found = []
+    for i, line in enumerate(lines):
+        m = LOCATION_LABEL.match(line)
+        if not m:
+            continue
+        value = m.group(1).strip()
+        if not value:
+            value = next((l.strip() for l in lines[i + 1:i + 3] if l.strip()), "")
+        value = value.strip(" ,;:-")
+        if len(value) < 3 or UNIT_IN_TEXT.search(value) or LOCATION_LABEL.match(value):
+            continue
+        confidence = BASE_CONFIDENCE if ADDRESS_HINT.search(value) else 0.5
+        found.append(_Candidate("project_location_text", value[:200], None, confidence, page_no, value[:200]))
+    return found
+
+
+def _combine(candidates: list[_Candidate]) -> ExtractedFact:
+    """One fact per field: the best-supported value; disagreement lowers confidence."""
+    groups: dict[str, list[_Candidate]] = {}
+    for c in candidates:
+        groups.setdefault(str(c.value).lower(), []).append(c)
+
+    ranked = sorted(
+        groups.values(),
+        key=lambda g: (max(c.confidence for c in g), len(g)),
+        reverse=True
+    )  # stable: earlier value wins ties
+    best = ranked[0]
+    top = max(c.confidence for c in best)
+    confidence = min(0.95, top + 0.02 * (len(best) - 1))
+    if len(ranked) > 1 and max(c.confidence for c in ranked[1]) >= top - 0.1:
+        confidence -= 0.2
+
+    evidence, seen = [], set()
+    for c in best:
+        if (c.page_no, c.snippet) not in seen and len(evidence) < 3:
+            seen.add((c.page_no, c.snippet))
+            evidence.append(Evidence(page_no=c.page_no, snippet=c.snippet))
+
+    return ExtractedFact(
+        field=best[0].field,
+        value=best[0].value,
+        unit=best[0].unit,
+        confidence=round(confidence, 2),
+        evidence=evidence,
+        source="rules"
+    )
+
+
+def extract_facts(page_texts: list[str], page_nos: list[int] | None = None) -> list[ExtractedFact]:
+    """Rule-based facts from page texts (`page_nos` defaults to 1..n)."""
+    candidates: dict[str, list[_Candidate]] = {}
+    for page_no, text in zip(page_nos or range(1, len(page_texts) + 1), page_texts):
+        lines = text.splitlines()
+        previous = ""
+        for line in lines:
+            for c in _line_candidates(line, previous + "\n" + line, page_no):
+                candidates.setdefault(c.field, []).append(c)
+            if line.strip():
+                previous = line
+        for c in _location_candidates(lines, page_no):
+            candidates.setdefault(c.field, []).append(c)
+
+    return [_combine(cs) for cs in candidates.values()]
+
+
+def missing_fields(facts: list[ExtractedFact], all_fields: list[str]) -> list[str]:
+    """Fields not found with at least RULES_MIN_CONFIDENCE (what Gemini is asked for)."""
+    confident = {f.field for f in facts if f.confidence >= RULES_MIN_CONFIDENCE}
+    return [field for field in all_fields if field not in confident]
+
+
+def can_skip_llm(facts: list[ExtractedFact]) -> bool:
+    """True when every required field was found with at least RULES_MIN_CONFIDENCE."""
+    confident = {f.field for f in facts if f.confidence >= RULES_MIN_CONFIDENCE}
+    return all(field in confident for field in RULES_REQUIRED_FIELDS)
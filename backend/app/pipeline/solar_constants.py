@@ -94,6 +94,12 @@ def get_typical_yield_range(country_code: str) -> tuple[int, int]:
     return TYPICAL_YIELD.get(country_code.upper(), TYPICAL_YIELD["DEFAULT"])
 
 
+def get_typical_yield(country_code: str) -> float:
+    """Middle of the typical yield range (kWh/kWp/year) for a country."""
+    low, high = get_typical_yield_range(country_code)
+    return (low + high) / 2
+
+
 def estimate_angle_from_latitude(lat: float) -> float:
     """
     Estimate optimal tilt angle from latitude.
@@ -1,61 +1,147 @@
+"""
+Verification checks over extracted facts, red flags and the scorecard.
+
+Checks register themselves with `@check(...)`, declaring the fields they need
+(a check is skipped when one is missing) and whether they do I/O. CPU checks
+run immediately; I/O checks run concurrently as tasks, each with a timeout.
+All checks read facts through a shared FactIndex (field -> fact, built once).
+"""
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, field as dataclass_field
+from typing import Awaitable, Callable
+
+from app.config import VERIFY_CHECK_TIMEOUT_S
+from app import metrics
 from app.schemas import ExtractedFact, VerificationResult, RedFlag, ScoreCard, Evidence
 from app.pipeline.geocoding import geocode
 from app.pipeline.pvgis import get_pvgis_estimate
+from app.pipeline.rule_extractor import INTEGRAL_FIELDS, NUMBER, parse_number
+from app.pipeline import yield_grid
+
+logger = logging.getLogger(__name__)
 
 REQUIRED_FIELDS = ["project_location_text", "declared_power_kwp", "system_type"]
 IMPORTANT_FIELDS = ["declared_yield_kwh_per_kwp", "capex_total", "roof_area_m2"]
 
+_NUMBER = re.compile(NUMBER)
+
+
+class FactIndex:
+    """field -> first fact with a value (same pick as a linear scan), built once per run."""
+
+    def __init__(self, facts: list[ExtractedFact]):
+        self.facts = facts
+        self._by_field: dict[str, ExtractedFact] = {}
+        for f in facts:
+            if f.value is not None:
+                self._by_field.setdefault(f.field, f)
+
+    def get(self, field: str) -> ExtractedFact | None:
+        return self._by_field.get(field)
+
+    def value(self, field: str):
+        """Fact value and evidence."""
+        fact = self._by_field.get(field)
+        if fact:
+            return fact.value, fact.evidence
+        return None, []
+
+    def number(self, field: str) -> float | None:
+        """First number in the value ("49,5", "1 050", "1 234,5 kWp", "195 000 PLN"), or None."""
+        fact = self._by_field.get(field)
+        if fact is None:
+            return None
+        if isinstance(fact.value, (int, float)):
+            return float(fact.value)
+        match = _NUMBER.search(str(fact.value))
+        # The value is one quantity of this field, so a grouped number belongs together
+        return parse_number(match.group(1), unit_context=True, integral=field in INTEGRAL_FIELDS) if match else None
+
+    def has(self, field: str) -> bool:
+        return field in self._by_field
+
+    def fields(self) -> set[str]:
+        return set(self._by_field)
+
+
+CheckFn = Callable[[FactIndex], VerificationResult | None | Awaitable[VerificationResult | None]]
 
-def get_fact(facts: list[ExtractedFact], field: str) -> ExtractedFact | None:
-    """Get fact by field name."""
-    for f in facts:
-        if f.field == field and f.value is not None:
-            return f
-    return None
 
+@dataclass
+class Check:
+    check_id: str
+    fn: CheckFn
+    requires: list[str] = dataclass_field(default_factory=list)
+    io: bool = False
+    timeout_s: float | None = None
 
-def get_fact_value(facts: list[ExtractedFact], field: str):
-    """Get fact value and evidence."""
-    fact = get_fact(facts, field)
-    if fact:
-        return fact.value, fact.evidence
-    return None, []
 
+CHECKS: list[Check] = []
 
-def verify_pvgis_yield(facts: list[ExtractedFact]) -> VerificationResult | None:
+
+def check(check_id: str, requires: list[str] | None = None, io: bool = False, timeout_s: float | None = None):
+    """
+    Register a verification check. `requires`: fields that must be present (else
+    the check is skipped). `io`: async check run concurrently with a timeout
+    (`timeout_s`, default VERIFY_CHECK_TIMEOUT_S).
+    """
+    def register(fn: CheckFn) -> CheckFn:
+        CHECKS.append(Check(check_id, fn, list(requires or []), io, timeout_s))
+        return fn
+    return register
+
+
+def _result(ratio_ok: bool, ratio_marginal: bool) -> tuple[str, str]:
+    if ratio_ok:
+        return "OK", "OK"
+    if ratio_marginal:
+        return "MARGINAL", "MEDIUM"
+    return "OUTLIER", "HIGH"
+
+
+def _pages(evidence: list[Evidence]) -> list[int]:
+    return sorted(set(e.page_no for e in evidence))
+
+
+@check("CHK-YIELD-001", requires=["declared_power_kwp", "project_location_text"], io=True)
+async def verify_pvgis_yield(facts: FactIndex) -> VerificationResult | None:
     """
     PVGIS Yield Sanity Check (PRD Delta compliant).
 
     1. Get declared_power_kwp (required)
     2. Get declared_yield_kwh_per_kwp OR compute implied from annual_energy
     3. Geocode location to get lat/lon
-    4. Call PVGIS API for expected yield
+    4. Call PVGIS API for expected yield (offline yield grid if PVGIS is unavailable)
     5. Compare and generate verification result
     """
     # Get power (required)
-    power_fact = get_fact(facts, "declared_power_kwp")
-    if not power_fact or not power_fact.value:
+    power_fact = facts.get("declared_power_kwp")
+    power_kwp = facts.number("declared_power_kwp")
+    if not power_kwp:
         return None
 
-    power_kwp = float(power_fact.value)
     power_evidence = power_fact.evidence
 
     # Get declared yield OR compute implied
-    yield_fact = get_fact(facts, "declared_yield_kwh_per_kwp")
-    annual_fact = get_fact(facts, "declared_annual_energy_mwh")
+    yield_fact = facts.get("declared_yield_kwh_per_kwp")
+    annual_fact = facts.get("declared_annual_energy_mwh")
+    yield_value = facts.number("declared_yield_kwh_per_kwp")
+    annual_value = facts.number("declared_annual_energy_mwh")
 
     declared_kwh_per_kwp = None
     yield_evidence = []
     declared_source = None
 
-    if yield_fact and yield_fact.value:
-        declared_kwh_per_kwp = float(yield_fact.value)
+    if yield_value:
+        declared_kwh_per_kwp = yield_value
         yield_evidence = yield_fact.evidence
         declared_source = "DECLARED_YIELD"
-    elif annual_fact and annual_fact.value:
+    elif annual_value:
         # Implied: annual_mwh * 1000 / kWp
-        annual_mwh = float(annual_fact.value)
-        declared_kwh_per_kwp = (annual_mwh * 1000) / power_kwp
+        declared_kwh_per_kwp = (annual_value * 1000) / power_kwp
         yield_evidence = annual_fact.evidence
         declared_source = "IMPLIED_FROM_ANNUAL"
 
@@ -63,20 +149,25 @@ def verify_pvgis_yield(facts: list[ExtractedFact]) -> VerificationResult | None:
         return None
 
     # Get location and geocode
-    location_fact = get_fact(facts, "project_location_text")
-    if not location_fact or not location_fact.value:
-        return None
+    location_fact = facts.get("project_location_text")
 
-    geo_result = geocode(str(location_fact.value))
+    geo_result = await geocode(str(location_fact.value))
     if not geo_result:
         return None
 
     lat, lon = geo_result.lat, geo_result.lon
 
-    # Call PVGIS
-    pvgis_result = get_pvgis_estimate(lat, lon, power_kwp)
+    # Call PVGIS, fall back to the offline grid, then to the country's typical yield
+    pvgis_result = await get_pvgis_estimate(lat, lon, power_kwp)
+    yield_source = "PVGIS_API"
     if not pvgis_result:
-        return None
+        metrics.count("fallbacks_total", kind="offline_yield_grid")
+        pvgis_result = yield_grid.estimate(lat, lon, power_kwp)
+        yield_source = "OFFLINE_GRID"
+    if not pvgis_result:
+        metrics.count("fallbacks_total", kind="typical_yield")
+        pvgis_result = yield_grid.typical_estimate(geo_result.country_code, power_kwp)
+        yield_source = "COUNTRY_TYPICAL"
 
     pvgis_kwh_per_kwp = pvgis_result.kwh_per_kwp
 
@@ -102,6 +193,16 @@ def verify_pvgis_yield(facts: list[ExtractedFact]) -> VerificationResult | None:
     # Build why message
     direction = "above" if delta_pct > 0 else "below"
     why = f"Declared yield {declared_kwh_per_kwp:.0f} kWh/kWp is {abs_delta:.1f}% {direction} PVGIS estimate ({pvgis_kwh_per_kwp:.0f} kWh/kWp) for this location."
+    if yield_source == "OFFLINE_GRID":
+        why += " PVGIS was unavailable; estimate interpolated from the offline PVGIS grid."
+    elif yield_source == "COUNTRY_TYPICAL":
+        why += " PVGIS was unavailable; estimate is the typical yield for the country."
+
+    confidence = 0.9 if declared_source == "DECLARED_YIELD" else 0.75
+    if yield_source == "OFFLINE_GRID":
+        confidence -= 0.1
+    elif yield_source == "COUNTRY_TYPICAL":
+        confidence -= 0.2
 
     return VerificationResult(
         check_id="CHK-YIELD-001",
@@ -112,31 +213,36 @@ def verify_pvgis_yield(facts: list[ExtractedFact]) -> VerificationResult | None:
             "peakpower_kwp": power_kwp,
             "declared_kwh_per_kwp": round(declared_kwh_per_kwp, 1),
             "declared_source": declared_source,
-            "location": str(location_fact.value)
+            "location": str(location_fact.value),
+            "country_code": geo_result.country_code
         },
         outputs={
             "pvgis_kwh_per_kwp_estimate": pvgis_kwh_per_kwp,
-            "pvgis_annual_kwh": pvgis_result.annual_kwh
+            "pvgis_annual_kwh": pvgis_result.annual_kwh,
+            "yield_source": yield_source
         },
         result=result,
         severity=severity,
         delta_pct=round(delta_pct, 1),
-        confidence=0.9 if declared_source == "DECLARED_YIELD" else 0.75,
+        confidence=round(confidence, 2),
         why=why,
         pages_to_verify=pages_to_verify,
         evidence=all_evidence
     )
 
 
-def verify_area_power(facts: list[ExtractedFact]) -> VerificationResult | None:
+@check("CHK-AREA-001", requires=["roof_area_m2", "declared_power_kwp"])
+def verify_area_power(facts: FactIndex) -> VerificationResult | None:
     """Check if roof area vs declared power makes sense."""
-    area, area_ev = get_fact_value(facts, "roof_area_m2")
-    power, power_ev = get_fact_value(facts, "declared_power_kwp")
+    _, area_ev = facts.value("roof_area_m2")
+    _, power_ev = facts.value("declared_power_kwp")
+    area = facts.number("roof_area_m2")
+    power = facts.number("declared_power_kwp")
 
     if not area or not power:
         return None
 
-    ratio = float(area) / float(power)
+    ratio = area / power
 
     if 4 <= ratio <= 10:
         result, severity = "OK", "OK"
@@ -163,6 +269,104 @@ def verify_area_power(facts: list[ExtractedFact]) -> VerificationResult | None:
     )
 
 
+@check("CHK-PANEL-001", requires=["panels_count", "module_watt_peak", "declared_power_kwp"])
+def verify_panels_power(facts: FactIndex) -> VerificationResult | None:
+    """Panel count x module Wp should add up to the declared kWp."""
+    panels = facts.number("panels_count")
+    module_wp = facts.number("module_watt_peak")
+    power = facts.number("declared_power_kwp")
+    if not panels or not module_wp or not power:
+        return None
+
+    computed_kwp = panels * module_wp / 1000
+    delta_pct = (power - computed_kwp) / computed_kwp * 100
+    result, severity = _result(abs(delta_pct) < 3, abs(delta_pct) < 10)
+
+    evidence = [e for f in ("panels_count", "module_watt_peak", "declared_power_kwp") for e in facts.value(f)[1]]
+    return VerificationResult(
+        check_id="CHK-PANEL-001",
+        check_type="PANELS_POWER_CONSISTENCY",
+        inputs={"panels_count": panels, "module_watt_peak": module_wp, "power_kwp": power},
+        outputs={"computed_kwp": round(computed_kwp, 2)},
+        result=result,
+        severity=severity,
+        delta_pct=round(delta_pct, 1),
+        confidence=0.85,
+        why=f"{panels:.0f} panels × {module_wp:.0f} Wp = {computed_kwp:.2f} kWp vs declared {power:g} kWp ({delta_pct:+.1f}%)",
+        pages_to_verify=_pages(evidence),
+        evidence=evidence
+    )
+
+
+@check("CHK-INV-001", requires=["inverter_power_kw", "declared_power_kwp"])
+def verify_inverter_ratio(facts: FactIndex) -> VerificationResult | None:
+    """DC/AC ratio (kWp / inverter kW) should be in the usual sizing range."""
+    inverter_kw = facts.number("inverter_power_kw")
+    power = facts.number("declared_power_kwp")
+    if not inverter_kw or not power:
+        return None
+
+    ratio = power / inverter_kw
+    result, severity = _result(0.9 <= ratio <= 1.35, 0.8 <= ratio <= 1.5)
+    # A low-confidence inverter figure is often one of several inverters
+    if severity == "HIGH" and facts.get("inverter_power_kw").confidence < 0.8:
+        severity = "MEDIUM"
+
+    evidence = list(facts.value("inverter_power_kw")[1]) + list(facts.value("declared_power_kwp")[1])
+    return VerificationResult(
+        check_id="CHK-INV-001",
+        check_type="INVERTER_SIZING_RATIO",
+        inputs={"power_kwp": power, "inverter_power_kw": inverter_kw, "ratio": round(ratio, 2)},
+        outputs={"typical_range": "0.9-1.35 kWp/kW"},
+        result=result,
+        severity=severity,
+        delta_pct=None,
+        confidence=0.75,
+        why=f"DC/AC ratio {ratio:.2f} kWp/kW (typical: 0.9-1.35)",
+        pages_to_verify=_pages(evidence),
+        evidence=evidence
+    )
+
+
+# Typical turnkey cost per kWp by currency (small/medium commercial PV)
+CAPEX_PER_KWP_RANGES = {
+    "PLN": (2500, 6500),
+    "EUR": (550, 1600),
+    "USD": (600, 1800),
+    "GBP": (500, 1400),
+}
+
+
+@check("CHK-CAPEX-001", requires=["capex_total", "declared_power_kwp"])
+def verify_capex_per_kwp(facts: FactIndex) -> VerificationResult | None:
+    """Investment cost per kWp against typical market ranges for the currency."""
+    capex = facts.number("capex_total")
+    power = facts.number("declared_power_kwp")
+    currency_fact = facts.get("capex_currency")
+    currency = str(currency_fact.value if currency_fact else facts.get("capex_total").unit or "").upper()
+    if not capex or not power or currency not in CAPEX_PER_KWP_RANGES:
+        return None
+
+    low, high = CAPEX_PER_KWP_RANGES[currency]
+    per_kwp = capex / power
+    result, severity = _result(low <= per_kwp <= high, low * 0.75 <= per_kwp <= high * 1.25)
+
+    evidence = list(facts.value("capex_total")[1]) + list(facts.value("declared_power_kwp")[1])
+    return VerificationResult(
+        check_id="CHK-CAPEX-001",
+        check_type="CAPEX_PER_KWP",
+        inputs={"capex_total": capex, "currency": currency, "power_kwp": power},
+        outputs={"capex_per_kwp": round(per_kwp), "typical_range": f"{low}-{high} {currency}/kWp"},
+        result=result,
+        severity=severity,
+        delta_pct=None,
+        confidence=0.7,
+        why=f"Investment cost {per_kwp:,.0f} {currency}/kWp (typical: {low:,}-{high:,} {currency}/kWp)",
+        pages_to_verify=_pages(evidence),
+        evidence=evidence
+    )
+
+
 def generate_flags(facts: list[ExtractedFact], verifications: list[VerificationResult]) -> list[RedFlag]:
     """Generate red flags based on facts and verifications."""
     flags = []
@@ -227,6 +431,45 @@ def generate_flags(facts: list[ExtractedFact], verifications: list[VerificationR
                 recommended_action="Verify roof dimensions and panel layout."
             ))
 
+        elif v.check_type == "PANELS_POWER_CONSISTENCY" and v.severity in ["MEDIUM", "HIGH"]:
+            flags.append(RedFlag(
+                flag_id="RF-FS-003",
+                severity=v.severity,
+                category="CONSISTENCY",
+                title="Panel count does not match declared power",
+                description=v.why,
+                why_it_matters="Inconsistent sizing data undermines the yield and cost figures.",
+                pages_to_verify=v.pages_to_verify,
+                evidence=v.evidence,
+                recommended_action="Confirm module datasheet and panel count."
+            ))
+
+        elif v.check_type == "INVERTER_SIZING_RATIO" and v.severity in ["MEDIUM", "HIGH"]:
+            flags.append(RedFlag(
+                flag_id="RF-FS-004",
+                severity=v.severity,
+                category="FEASIBILITY",
+                title="Inverter sizing unusual",
+                description=v.why,
+                why_it_matters="Undersized inverters clip production; oversized ones add cost.",
+                pages_to_verify=v.pages_to_verify,
+                evidence=v.evidence,
+                recommended_action="Verify inverter count and rated power."
+            ))
+
+        elif v.check_type == "CAPEX_PER_KWP" and v.severity in ["MEDIUM", "HIGH"]:
+            flags.append(RedFlag(
+                flag_id="RF-FS-005",
+                severity=v.severity,
+                category="FEASIBILITY",
+                title="Investment cost per kWp unusual",
+                description=v.why,
+                why_it_matters="Cost far from market levels may indicate scope gaps or inflated pricing.",
+                pages_to_verify=v.pages_to_verify,
+                evidence=v.evidence,
+                recommended_action="Request an itemized cost breakdown."
+            ))
+
     return flags
 
 
@@ -288,19 +531,42 @@ def calculate_scorecard(
     )
 
 
-def run_verification(facts: list[ExtractedFact]) -> tuple[list[VerificationResult], list[RedFlag], ScoreCard]:
-    """Run all verification checks."""
-    verifications = []
+async def _run_check(c: Check, facts: FactIndex) -> VerificationResult | None:
+    """Run one check, recording its duration; errors and timeouts skip the check."""
+    t0 = time.perf_counter()
+    try:
+        with metrics.span("verify.check", check=c.check_id):
+            if c.io:
+                result = await asyncio.wait_for(c.fn(facts), c.timeout_s or VERIFY_CHECK_TIMEOUT_S)
+            else:
+                result = c.fn(facts)
+    except asyncio.TimeoutError:
+        metrics.count("verification_check_failures_total", check=c.check_id, reason="timeout")
+        logger.warning("Verification check %s timed out", c.check_id)
+        return None
+    except Exception as e:
+        metrics.count("verification_check_failures_total", check=c.check_id, reason=type(e).__name__)
+        logger.exception("Verification check %s failed", c.check_id)
+        return None
+    if result is not None:
+        result.duration_ms = round((time.perf_counter() - t0) * 1000, 1)
+    return result
+
+
+async def run_verification(facts: list[ExtractedFact]) -> tuple[list[VerificationResult], list[RedFlag], ScoreCard]:
+    """Run all registered verification checks (I/O checks concurrently)."""
+    index = FactIndex(facts)
+    runnable = [c for c in CHECKS if all(index.has(f) for f in c.requires)]
 
-    # PVGIS Yield Sanity Check
-    v = verify_pvgis_yield(facts)
-    if v:
-        verifications.append(v)
+    # I/O checks run concurrently with each other. The CPU checks are quick and
+    # never yield, so they finish before the I/O tasks get to run at all.
+    tasks = {c.check_id: asyncio.create_task(_run_check(c, index)) for c in runnable if c.io}
+    results = {c.check_id: await _run_check(c, index) for c in runnable if not c.io}
+    for check_id, task in tasks.items():
+        results[check_id] = await task
 
-    # Area/Power Ratio Check
-    v = verify_area_power(facts)
-    if v:
-        verifications.append(v)
+    # Report in registry order
+    verifications = [results[c.check_id] for c in runnable if results[c.check_id] is not None]
 
     flags = generate_flags(facts, verifications)
     scorecard = calculate_scorecard(facts, verifications, flags)
@@ -0,0 +1,316 @@
+"""
+Word geometry and snippet index for evidence highlighting.
+
+Ingest stores every page's words with their bounding boxes (PDF points, in
+the orientation the page is rendered) in UPLOAD_DIR/<doc_id>/words.npz,
+together with hashed unigram and trigram indexes over normalized tokens
+(sorted 64-bit hashes -> word positions). `locate` resolves an evidence snippet
+to pages and line-merged boxes with a few binary searches, without reopening
+the PDF. Documents ingested before this existed are indexed from the stored
+PDF on first use.
+"""
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple
+
+import fitz
+import numpy as np
+
+from app.config import UPLOAD_DIR
+from app.schemas import SnippetMatch
+
+WORDS_NAME = "words.npz"
+
+# Placeholders left in snippets by anonymization match any single word
+PLACEHOLDER_PATTERN = re.compile(r"^\[(?:EMAIL|IBAN|PESEL|NIP|REGON|PHONE|NAME)\][.,;:]?$")
+_NON_WORD = re.compile(r"[\W_]+")
+_FOLD = str.maketrans({"ł": "l", "đ": "d", "ø": "o", "ß": "ss"})
+
+# Candidates need at least this share of the snippet's n-grams in place; they
+# are then scored by token alignment (similarity = 1 - edit distance / length)
+MIN_MATCH_SCORE = 0.4
+MIN_SIMILARITY = 0.5
+MAX_QUERY_TOKENS = 64
+CACHE_SIZE = 8
+
+_DIGITS = re.compile(r"^\d+$")
+_DIGIT_GROUP = re.compile(r"^\d{3}$")
+
+
+class PageWords(NamedTuple):
+    boxes: np.ndarray   # (n, 4) float32 x0, y0, x1, y1
+    lines: np.ndarray   # (n,) int32 line id within the page
+    tokens: list[str]
+    size: tuple[float, float]  # rendered page width, height
+
+
+def normalize_word(word: str) -> str:
+    """Lowercase, strip diacritics and punctuation ("Moc:" -> "moc", "49,5" -> "495")."""
+    folded = unicodedata.normalize("NFKD", word.lower().translate(_FOLD))
+    return _NON_WORD.sub("", "".join(c for c in folded if not unicodedata.combining(c)))
+
+
+def _joins_number(previous: str | None, token: str) -> bool:
+    """Thousands written with spaces ("195 000") are one token ("195000")."""
+    return previous is not None and bool(_DIGIT_GROUP.match(token)) and bool(_DIGITS.match(previous))
+
+
+def snippet_tokens(snippet: str) -> list[str | None]:
+    """Normalized snippet words; None for anonymization placeholders (wildcards)."""
+    tokens = []
+    for word in snippet.split():
+        if PLACEHOLDER_PATTERN.match(word):
+            tokens.append(None)
+        elif token := normalize_word(word):
+            if tokens and _joins_number(tokens[-1], token):
+                tokens[-1] += token
+            else:
+                tokens.append(token)
+    return tokens
+
+
+def page_words(page: fitz.Page, textpage: fitz.TextPage | None = None) -> PageWords:
+    """Words of a page that have a normalized form, with boxes as the page is rendered."""
+    boxes, lines, tokens = [], [], []
+    for x0, y0, x1, y1, word, block_no, line_no, _ in page.get_text("words", textpage=textpage):
+        token = normalize_word(word)
+        if not token:
+            continue
+        line = block_no * 10000 + line_no
+        if tokens and lines[-1] == line and _joins_number(tokens[-1], token):
+            tokens[-1] += token
+            px0, py0, px1, py1 = boxes[-1]
+            boxes[-1] = (min(px0, x0), min(py0, y0), max(px1, x1), max(py1, y1))
+            continue
+        boxes.append((x0, y0, x1, y1))
+        lines.append(line)
+        tokens.append(token)
+
+    boxes = np.array(boxes, dtype=np.float32).reshape(-1, 4)
+    if page.rotation and len(boxes):
+        rotated = [fitz.Rect(b) * page.rotation_matrix for b in boxes]
+        boxes = np.array([(r.x0, r.y0, r.x1, r.y1) for r in rotated], dtype=np.float32)
+    return PageWords(boxes, np.array(lines, dtype=np.int32), tokens, (page.rect.width, page.rect.height))
+
+
+def _key(tokens) -> int:
+    """64-bit n-gram hash (collisions are negligible at document scale, so hits are not re-checked)."""
+    return int.from_bytes(hashlib.blake2b(" ".join(tokens).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _postings(keys: list[int]) -> tuple[np.ndarray, np.ndarray]:
+    """Sorted keys and the word positions they occur at."""
+    keys = np.array(keys, dtype=np.uint64)
+    order = np.argsort(keys, kind="stable")
+    return keys[order], order.astype(np.int32)
+
+
+def _align(query: list[int | None], words: list[int]) -> tuple[int, int, int]:
+    """
+    Token edit distance between `query` and its best-matching stretch of `words`
+    (free start and end; None matches any word). Returns (distance, start, end).
+    """
+    n = len(words)
+    prev, prev_start = [0] * (n + 1), list(range(n + 1))
+    for i, q in enumerate(query, 1):
+        cur, cur_start = [i] + [0] * n, [0] * (n + 1)
+        for j in range(1, n + 1):
+            best, start = prev[j - 1] + (q is not None and q != words[j - 1]), prev_start[j - 1]
+            if prev[j] + 1 < best:
+                best, start = prev[j] + 1, prev_start[j]
+            if cur[j - 1] + 1 < best:
+                best, start = cur[j - 1] + 1, cur_start[j - 1]
+            cur[j], cur_start[j] = best, start
+        prev, prev_start = cur, cur_start
+    if n == 0:
+        return len(query), 0, 0
+    end = min(range(1, n + 1), key=prev.__getitem__)
+    return prev[end], prev_start[end], end
+
+
+class WordIndex:
+    """Words of a whole document (flat arrays) plus their n-gram postings."""
+
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        self.boxes = arrays["boxes"]
+        self.pages = arrays["pages"]
+        self.lines = arrays["lines"]
+        self.page_sizes = arrays["page_sizes"]
+        self._postings = {
+            1: (arrays["uni_keys"], arrays["uni_pos"]),
+            3: (arrays["tri_keys"], arrays["tri_pos"]),
+        }
+        # Unigram hash of every word position, for alignment
+        self.word_keys = np.empty(len(self.pages), dtype=np.uint64)
+        self.word_keys[arrays["uni_pos"]] = arrays["uni_keys"]
+        self.page_word_counts = np.bincount(self.pages, minlength=len(self.page_sizes) + 1)
+
+    @staticmethod
+    def build(pages: list[PageWords]) -> dict[str, np.ndarray]:
+        """Arrays to save for a document, pages in order."""
+        tokens = [t for page in pages for t in page.tokens]
+        uni_keys, uni_pos = _postings([_key((t,)) for t in tokens])
+        tri_keys, tri_pos = _postings([_key(tokens[i:i + 3]) for i in range(len(tokens) - 2)])
+        return {
+            "boxes": np.concatenate([p.boxes for p in pages]) if pages else np.zeros((0, 4), np.float32),
+            "pages": np.repeat(np.arange(1, len(pages) + 1, dtype=np.int32), [len(p.tokens) for p in pages]),
+            "lines": np.concatenate([p.lines for p in pages]) if pages else np.zeros(0, np.int32),
+            "page_sizes": np.array([p.size for p in pages], dtype=np.float32).reshape(-1, 2),
+            "uni_keys": uni_keys, "uni_pos": uni_pos,
+            "tri_keys": tri_keys, "tri_pos": tri_pos,
+        }
+
+    def _votes(self, grams: list[tuple[int, tuple[str, ...]]]) -> tuple[np.ndarray, np.ndarray]:
+        """Implied start positions and how many grams vote for each."""
+        starts = []
+        for offset, gram in grams:
+            keys, positions = self._postings[len(gram)]
+            key = np.uint64(_key(gram))
+            starts.append(positions[np.searchsorted(keys, key, "left"):np.searchsorted(keys, key, "right")] - offset)
+        return np.unique(np.concatenate(starts), return_counts=True)
+
+    def locate(self, snippet: str, page_no: int | None = None, limit: int = 3) -> list[SnippetMatch]:
+        """
+        Best places where `snippet` occurs. Every snippet trigram votes for the
+        start position it implies (single words vote when trigrams find
+        nothing: short snippets, placeholders or edits in every trigram). The
+        best-voted candidates are then aligned word by word within a bounded
+        window, so the cost depends on the snippet and the number of
+        candidates, not on the document length. `page_no` breaks ties in
+        favour of the page the evidence cites.
+        """
+        query = snippet_tokens(snippet)[:MAX_QUERY_TOKENS]
+        for n in (3, 1):
+            grams = [(i, tuple(query[i:i + n])) for i in range(len(query) - n + 1) if all(query[i:i + n])]
+            if not grams:
+                continue
+            starts, counts = self._votes(grams)
+            scores = counts / len(grams)
+            keep = scores >= MIN_MATCH_SCORE
+            if keep.any():
+                starts, scores = starts[keep], scores[keep]
+                break
+        else:
+            return []
+
+        on_page = self.pages[np.clip(starts, 0, len(self.pages) - 1)] == (page_no or 0)
+        query_keys = [None if t is None else _key((t,)) for t in query]
+        slack = max(2, len(query) // 4)
+        aligned = []
+        for i in np.lexsort((starts, ~on_page, -scores))[:max(4 * limit, 8)]:
+            lo = max(int(starts[i]) - slack, 0)
+            hi = min(int(starts[i]) + len(query) + slack, len(self.pages))
+            distance, a, b = _align(query_keys, self.word_keys[lo:hi].tolist())
+            aligned.append((1 - distance / len(query), lo + a, lo + b))
+
+        matches, taken = [], []
+        for similarity, lo, hi in sorted(aligned, key=lambda m: (-m[0], self._page_at(m[1]) != page_no, m[1])):
+            if similarity < MIN_SIMILARITY or len(matches) >= limit:
+                break
+            if hi <= lo or any(lo < t_hi and t_lo < hi for t_lo, t_hi in taken):
+                continue  # the same occurrence, reached from another candidate
+            taken.append((lo, hi))
+            matches.append(self._match(lo, hi, round(similarity, 3)))
+        return matches
+
+    def words_on_page(self, page_no: int) -> int:
+        return int(self.page_word_counts[page_no]) if 0 < page_no < len(self.page_word_counts) else 0
+
+    def _page_at(self, position: int) -> int:
+        return int(self.pages[min(max(position, 0), len(self.pages) - 1)])
+
+    def _match(self, lo: int, hi: int, score: float) -> SnippetMatch:
+        page_no = self._page_at(lo)
+        boxes: dict[int, list[float]] = {}
+        for i in range(lo, hi):
+            if self.pages[i] != page_no:
+                continue
+            x0, y0, x1, y1 = (float(v) for v in self.boxes[i])
+            line = int(self.lines[i])
+            if line in boxes:
+                b = boxes[line]
+                boxes[line] = [min(b[0], x0), min(b[1], y0), max(b[2], x1), max(b[3], y1)]
+            else:
+                boxes[line] = [x0, y0, x1, y1]
+        width, height = (round(float(v), 1) for v in self.page_sizes[page_no - 1])
+        return SnippetMatch(
+            page_no=page_no,
+            score=score,
+            page_width=width,
+            page_height=height,
+            boxes=[[round(v, 1) for v in b] for b in boxes.values()]
+        )
+
+
+def index_path(doc_id: str) -> Path:
+    return UPLOAD_DIR / doc_id / WORDS_NAME
+
+
+def save_index(doc_dir: Path, pages: list[PageWords]):
+    """
+    Write words.npz for a document (atomic, so readers never load a partial
+    file) and keep the index cached for the analysis that follows.
+    """
+    arrays = WordIndex.build(pages)
+    tmp = doc_dir / f".{WORDS_NAME}.tmp.npz"
+    np.savez_compressed(tmp, **arrays)
+    path = doc_dir / WORDS_NAME
+    tmp.replace(path)
+    _remember(doc_dir.name, path.stat().st_mtime_ns, WordIndex(arrays))
+
+
+_cache_lock = threading.Lock()
+_cache: OrderedDict[str, tuple[int, WordIndex]] = OrderedDict()  # doc_id -> (mtime_ns, index)
+
+
+def load_index(doc_id: str) -> WordIndex | None:
+    """Word index of a document (LRU-cached); built from the stored PDF if missing."""
+    path = index_path(doc_id)
+    if not path.exists():
+        if not _index_from_pdf(doc_id):
+            return None
+    mtime = path.stat().st_mtime_ns
+    with _cache_lock:
+        cached = _cache.get(doc_id)
+        if cached and cached[0] == mtime:
+            _cache.move_to_end(doc_id)
+            return cached[1]
+
+    with np.load(path) as arrays:
+        index = WordIndex(dict(arrays))
+    _remember(doc_id, mtime, index)
+    return index
+
+
+def _remember(doc_id: str, mtime: int, index: WordIndex):
+    with _cache_lock:
+        _cache[doc_id] = (mtime, index)
+        _cache.move_to_end(doc_id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _index_from_pdf(doc_id: str) -> bool:
+    """Index a document ingested before word geometry was stored."""
+    from app.pipeline.pdf_processor import FITZ_LOCK, source_pdf_path  # pdf_processor imports this module
+
+    pdf_path = source_pdf_path(doc_id)
+    if pdf_path is None:
+        return False
+    with FITZ_LOCK:
+        with fitz.open(pdf_path) as pdf:
+            pages = [page_words(page) for page in pdf]
+    save_index(pdf_path.parent, pages)
+    return True
+
+
+def locate(doc_id: str, snippet: str, page_no: int | None = None, limit: int = 3) -> list[SnippetMatch] | None:
+    """Matches of `snippet` in a document, or None if the document does not exist."""
+    index = load_index(doc_id)
+    if index is None:
+        return None
+    return index.locate(snippet, page_no, limit)
@@ -0,0 +1,207 @@
+"""
+Offline PVGIS yield grid: local fallback when the PVGIS API is slow or down.
+
+The grid is a float32 array of shape (n_lat, n_lon, 14) stored as .npy and
+memory-mapped on first use. Channels per node (1 kWp, 14% loss, optimal angles):
+    0      annual kWh/kWp
+    1..12  monthly kWh/kWp
+    13     optimal tilt angle (degrees)
+Nodes without data are NaN. Lookups use bilinear interpolation over the four
+surrounding nodes (missing nodes are dropped and the weights renormalized).
+Without a grid, or outside its coverage, `typical_estimate` gives the typical
+yield for the country instead.
+The geometry is kept in a JSON sidecar next to the .npy file.
+
+Build it from cached PVGIS responses:
+    python -m app.pipeline.yield_grid build [--step 0.25] [--radius 1.5]
+"""
+import argparse
+import json
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from app.config import YIELD_GRID_PATH
+from app.schemas import PVGISResult
+from app.pipeline.solar_constants import estimate_angle_from_latitude, get_typical_yield
+
+# Europe
+LAT_MIN, LAT_MAX = 34.0, 72.0
+LON_MIN, LON_MAX = -25.0, 45.0
+CHANNELS = 14
+ANGLE_CHANNEL = 13
+
+_grid: np.ndarray | None = None
+_meta: dict | None = None
+_load_lock = threading.Lock()
+
+
+def _meta_path():
+    return YIELD_GRID_PATH.with_suffix(".json")
+
+
+def _load() -> bool:
+    """Memory-map the grid once. Returns False if no grid has been built."""
+    global _grid, _meta
+    if _grid is not None:
+        return True
+    with _load_lock:
+        if _grid is None:
+            if not YIELD_GRID_PATH.exists() or not _meta_path().exists():
+                return False
+            _meta = json.loads(_meta_path().read_text(encoding="utf-8"))
+            _grid = np.load(YIELD_GRID_PATH, mmap_mode="r")
+    return True
+
+
+def reload():
+    """Forget the mapped grid (after a rebuild)."""
+    global _grid, _meta
+    with _load_lock:
+        _grid, _meta = None, None
+
+
+def interpolate(lat: float, lon: float) -> np.ndarray | None:
+    """Bilinear interpolation of all channels at (lat, lon); None outside coverage."""
+    if not _load():
+        return None
+    step, lat0, lon0 = _meta["step"], _meta["lat0"], _meta["lon0"]
+    n_lat, n_lon = _grid.shape[:2]
+
+    y = (lat - lat0) / step
+    x = (lon - lon0) / step
+    if not (0 <= y <= n_lat - 1 and 0 <= x <= n_lon - 1):
+        return None
+
+    i0, j0 = min(int(y), n_lat - 2), min(int(x), n_lon - 2)
+    fy, fx = y - i0, x - j0
+    cell = np.asarray(_grid[i0:i0 + 2, j0:j0 + 2], dtype=np.float64)  # (2, 2, C)
+    weights = np.array([[(1 - fy) * (1 - fx), (1 - fy) * fx], [fy * (1 - fx), fy * fx]])
+
+    present = ~np.isnan(cell[:, :, 0])
+    total = weights[present].sum()
+    if total <= 0:
+        return None
+    return np.nansum(cell * (weights * present)[:, :, None], axis=(0, 1)) / total
+
+
+def estimate(lat: float, lon: float, peak_power_kwp: float) -> PVGISResult | None:
+    """PVGIS-shaped estimate from the offline grid, scaled to peak_power_kwp."""
+    values = interpolate(lat, lon)
+    if values is None:
+        return None
+    kwh_per_kwp = float(values[0])
+    return PVGISResult(
+        annual_kwh=round(kwh_per_kwp * peak_power_kwp, 1),
+        kwh_per_kwp=round(kwh_per_kwp, 1),
+        monthly_kwh=[round(float(m) * peak_power_kwp, 1) for m in values[1:13]]
+    )
+
+
+def typical_estimate(country_code: str, peak_power_kwp: float) -> PVGISResult:
+    """Estimate from the typical yield for the country (last resort, no monthly profile)."""
+    kwh_per_kwp = get_typical_yield(country_code or "")
+    return PVGISResult(
+        annual_kwh=round(kwh_per_kwp * peak_power_kwp, 1),
+        kwh_per_kwp=round(kwh_per_kwp, 1)
+    )
+
+
+def optimal_angle(lat: float, lon: float) -> float:
+    """Optimal tilt from the grid, or the latitude rule of thumb."""
+    values = interpolate(lat, lon)
+    if values is None or np.isnan(values[ANGLE_CHANNEL]):
+        return estimate_angle_from_latitude(lat)
+    return float(values[ANGLE_CHANNEL])
+
+
+def build_grid(samples: list[tuple[float, float, dict]], step: float = 0.25, radius: float = 1.5) -> np.ndarray:
+    """
+    Build the grid from (lat, lon, per-kWp profile) samples.
+    Each node gets the inverse-distance weighted mean of samples within `radius`
+    degrees, per channel over the samples that have that channel; nodes (or
+    channels) with no sample in range stay NaN.
+    """
+    lats = np.arange(LAT_MIN, LAT_MAX + step / 2, step)
+    lons = np.arange(LON_MIN, LON_MAX + step / 2, step)
+    grid = np.full((len(lats), len(lons), CHANNELS), np.nan, dtype=np.float32)
+    if not samples:
+        return grid
+
+    s_lat = np.array([s[0] for s in samples])
+    s_lon = np.array([s[1] for s in samples])
+    values = np.full((len(samples), CHANNELS), np.nan)
+    for k, (lat, _, profile) in enumerate(samples):
+        monthly = profile.get("monthly_kwh_per_kwp") or [np.nan] * 12
+        values[k, 0] = profile["kwh_per_kwp"]
+        values[k, 1:13] = monthly[:12] + [np.nan] * (12 - len(monthly[:12]))
+        values[k, ANGLE_CHANNEL] = profile.get("optimal_angle", estimate_angle_from_latitude(lat))
+
+    node_lon = lons[None, :]
+    for i, lat in enumerate(lats):  # one latitude row at a time keeps memory flat
+        near = np.abs(s_lat - lat) <= radius
+        if not near.any():
+            continue
+        # Degrees of longitude shrink with latitude
+        d = np.hypot(s_lat[near][:, None] - lat,
+                     (s_lon[near][:, None] - node_lon) * np.cos(np.radians(lat)))  # (S, n_lon)
+        w = np.where(d <= radius, 1.0 / np.maximum(d, 1e-3) ** 2, 0.0)
+        covered = w.sum(axis=0) > 0
+        v = values[near]
+        present = ~np.isnan(v)
+        w_sum = np.einsum("sn,sc->nc", w, present)  # per channel: missing values carry no weight
+        total = np.einsum("sn,sc->nc", w, np.where(present, v, 0.0))
+        row = np.where(w_sum > 0, total / np.where(w_sum > 0, w_sum, 1), np.nan)
+        grid[i, covered] = row[covered]
+    return grid
+
+
+def _samples_from_pvgis_cache() -> list[tuple[float, float, dict]]:
+    """(lat, lon, profile) of cached PVGIS responses for the default system (14% loss, optimal angles)."""
+    from app.pipeline import pvgis
+
+    cache = pvgis._get_cache()
+    rows = cache._conn().execute("SELECT key, value FROM entries").fetchall()
+    samples = []
+    for key, value in rows:
+        lat, lon, loss, orientation = key.split(":")
+        if float(loss) == 14.0 and orientation == "opt":
+            samples.append((float(lat), float(lon), json.loads(value)))
+    return samples
+
+
+def save_grid(grid: np.ndarray, step: float, source: str, n_samples: int):
+    YIELD_GRID_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = YIELD_GRID_PATH.with_name(YIELD_GRID_PATH.stem + ".tmp.npy")
+    np.save(tmp, grid)
+    tmp.replace(YIELD_GRID_PATH)
+    _meta_path().write_text(json.dumps({
+        "lat0": LAT_MIN,
+        "lon0": LON_MIN,
+        "step": step,
+        "source": source,
+        "samples": n_samples,
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+    }), encoding="utf-8")
+    reload()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline PVGIS yield grid")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build the grid from cached PVGIS responses")
+    build.add_argument("--step", type=float, default=0.25, help="grid step in degrees")
+    build.add_argument("--radius", type=float, default=1.5, help="interpolation radius in degrees")
+    args = parser.parse_args()
+
+    samples = _samples_from_pvgis_cache()
+    grid = build_grid(samples, step=args.step, radius=args.radius)
+    save_grid(grid, args.step, source="pvgis_cache", n_samples=len(samples))
+    covered = int((~np.isnan(grid[:, :, 0])).sum())
+    print(f"Built {YIELD_GRID_PATH} from {len(samples)} PVGIS samples: "
+          f"{grid.shape[0]}x{grid.shape[1]} nodes, {covered} covered")
+
+
+if __name__ == "__main__":
+    main()
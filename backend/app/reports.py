@@ -0,0 +1,117 @@
+"""
+Stored analysis reports: compact JSON on disk plus pre-compressed siblings.
+
+UPLOAD_DIR/<doc_id>/report.json is written without indentation; with
+REPORT_PRECOMPRESS, report.json.gz (and report.json.br when the optional
+`brotli` package is installed) are written next to it, so the API can send
+stored bytes as-is. Strong ETags are content hashes, cached per file stat so
+revalidation (If-None-Match -> 304) does not read the report.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+from app.config import UPLOAD_DIR, REPORT_PRECOMPRESS
+from app.schemas import AnalysisReport
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+REPORT_NAME = "report.json"
+
+# Content-Encoding -> file suffix, in server preference order
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+_etag_lock = threading.Lock()
+_etags: dict[Path, tuple[int, int, str]] = {}  # path -> (mtime_ns, size, etag)
+
+
+def report_path(doc_id: str) -> Path:
+    return UPLOAD_DIR / doc_id / REPORT_NAME
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _compress(data: bytes, encoding: str) -> bytes | None:
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(data, quality=5)
+    return None
+
+
+def save_report(report: AnalysisReport) -> Path:
+    """Write the compact report, then its compressed siblings (so they are never older than a stale JSON)."""
+    path = report_path(report.document.doc_id)
+    data = report.model_dump_json().encode("utf-8")
+    _write_atomic(path, data)
+    for encoding in REPORT_PRECOMPRESS:
+        compressed = _compress(data, encoding)
+        if compressed is not None:
+            _write_atomic(path.with_name(REPORT_NAME + ENCODINGS[encoding]), compressed)
+    return path
+
+
+def load_report(doc_id: str) -> AnalysisReport | None:
+    path = report_path(doc_id)
+    if not path.exists():
+        return None
+    return AnalysisReport.model_validate_json(path.read_bytes())
+
+
+def _etag(path: Path, st: os.stat_result) -> str:
+    """Content hash of a file, cached until its mtime/size change."""
+    with _etag_lock:
+        cached = _etags.get(path)
+    if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    etag = '"' + hashlib.sha256(path.read_bytes()).hexdigest()[:32] + '"'
+    with _etag_lock:
+        _etags[path] = (st.st_mtime_ns, st.st_size, etag)
+    return etag
+
+
+def _accepted(accept_encoding: str) -> set[str]:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def select_variant(doc_id: str, accept_encoding: str = "") -> tuple[Path, str | None, str] | None:
+    """
+    (path, content_encoding, etag) of the best stored representation for the
+    client, or None if there is no report. Compressed siblings older than the
+    JSON are ignored.
+    """
+    path = report_path(doc_id)
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+
+    accepted = _accepted(accept_encoding)
+    for encoding, suffix in ENCODINGS.items():
+        if encoding not in accepted:
+            continue
+        sibling = path.with_name(REPORT_NAME + suffix)
+        try:
+            sibling_st = sibling.stat()
+        except FileNotFoundError:
+            continue
+        if sibling_st.st_mtime_ns >= st.st_mtime_ns:
+            # Strong ETags differ per encoding
+            return sibling, encoding, _etag(path, st)[:-1] + f'-{encoding}"'
+
+    return path, None, _etag(path, st)
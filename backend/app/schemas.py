@@ -5,6 +5,9 @@ from datetime import datetime
 class Evidence(BaseModel):
     page_no: int
     snippet: str
+    grounding: str | None = None  # VERIFIED, RELOCATED, NOT_FOUND (None: not checked)
+    grounding_score: float | None = None
+    cited_page_no: int | None = None  # page the extractor cited, when RELOCATED
 
 
 class ExtractedFact(BaseModel):
@@ -13,6 +16,7 @@ class ExtractedFact(BaseModel):
     unit: str | None = None
     confidence: float
     evidence: list[Evidence] = []
+    source: str = "llm"  # extraction engine: "llm" or "rules"
 
 
 class VerificationResult(BaseModel):
@@ -27,6 +31,7 @@ class VerificationResult(BaseModel):
     why: str
     pages_to_verify: list[int] = []
     evidence: list[Evidence] = []
+    duration_ms: float | None = None
 
 
 class RedFlag(BaseModel):
@@ -54,6 +59,8 @@ class PageInfo(BaseModel):
     page_no: int
     has_text: bool
     char_count: int
+    relevance: float = 0.0  # PV signal density (see pipeline/relevance.py)
+    sent_to_llm: bool = False
 
 
 class DocumentMeta(BaseModel):
@@ -78,6 +85,14 @@ class PVGISResult(BaseModel):
     monthly_kwh: list[float] = []
 
 
+class SpanTiming(BaseModel):
+    name: str  # e.g. "pdf.ingest", "llm.request", "geocode"
+    labels: dict[str, str] = {}  # e.g. {"cache": "hit"}
+    calls: int
+    total_ms: float
+    max_ms: float
+
+
 class AnalysisReport(BaseModel):
     document: DocumentMeta
     page_info: list[PageInfo]
@@ -85,3 +100,96 @@ class AnalysisReport(BaseModel):
     verifications: list[VerificationResult]
     red_flags: list[RedFlag]
     scorecard: ScoreCard
+    timings: list[SpanTiming] | None = None  # per-span wall time of this analysis (REPORT_TIMINGS)
+
+
+class JobStage(BaseModel):
+    name: str
+    status: str = "PENDING"  # PENDING, RUNNING, DONE, FAILED
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    duration_ms: float | None = None
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    doc_id: str
+    filename: str
+    state: str  # QUEUED, RUNNING, DONE, FAILED
+    stages: list[JobStage] = []
+    queue_position: int | None = None
+    submitted_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    error: str | None = None
+    report_url: str | None = None
+    reused: bool = False  # identical PDF already analyzed / in flight
+
+
+class QueueStats(BaseModel):
+    workers: int
+    busy_workers: int
+    queue_depth: int
+    queue_capacity: int
+    accepted: int
+    rejected: int
+    completed: int
+    failed: int
+
+
+class BatchDocument(BaseModel):
+    filename: str
+    doc_id: str | None = None
+    status: str = "PENDING"  # PENDING, RUNNING, DONE, REUSED, FAILED
+    error: str | None = None
+    report_url: str | None = None
+    traffic_light: str | None = None
+    timings_ms: dict[str, float] = {}
+    total_ms: float | None = None
+
+
+class BatchManifest(BaseModel):
+    batch_id: str
+    status: str  # RUNNING, DONE, FAILED
+    created_at: datetime
+    finished_at: datetime | None = None
+    documents: list[BatchDocument] = []
+    wall_ms: float | None = None
+    stage_totals_ms: dict[str, float] = {}
+    counts: dict[str, int] = {}
+
+
+class ReportSummary(BaseModel):
+    doc_id: str
+    sha256: str
+    filename: str
+    created_at: datetime
+    traffic_light: str
+    evidence_coverage: int
+    consistency: int
+    feasibility: int
+    country_code: str | None = None
+    power_kwp: float | None = None
+    pvgis_delta_pct: float | None = None
+    report_url: str
+
+
+class ReportList(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    items: list[ReportSummary]
+
+
+class SnippetMatch(BaseModel):
+    page_no: int
+    score: float  # 1 - word edit distance / snippet length (placeholders match any word)
+    page_width: float  # PDF points; boxes use the same units
+    page_height: float
+    boxes: list[list[float]]  # [x0, y0, x1, y1] per text line
+
+
+class SnippetLocation(BaseModel):
+    doc_id: str
+    snippet: str
+    matches: list[SnippetMatch]
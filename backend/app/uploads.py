@@ -0,0 +1,173 @@
+"""
+Streamed PDF uploads.
+
+The multipart body is parsed (and spooled to a temporary file) by Starlette
+before a handler runs, so the size cap is enforced while the body is received:
+ContentLengthLimit refuses a declared Content-Length over the limit up front
+and counts the bytes actually received (chunked requests included), answering
+413 once they exceed it.
+
+Handlers then copy the spooled file in chunks to UPLOAD_DIR/_incoming (same
+filesystem as the document directories, so process_pdf can move them in place
+with a rename), hashing as they go and checking the PDF signature and the
+per-file limit. Nothing holds the whole file in memory.
+"""
+import asyncio
+import hashlib
+import time
+import uuid
+from pathlib import Path
+from typing import NamedTuple
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from app.config import UPLOAD_DIR, MAX_UPLOAD_MB, UPLOAD_CHUNK_KB
+
+INCOMING_DIR = UPLOAD_DIR / "_incoming"
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+CHUNK_BYTES = UPLOAD_CHUNK_KB * 1024
+
+# Multipart framing on top of the file itself
+UPLOAD_OVERHEAD_BYTES = 64 * 1024
+
+# The PDF header must appear within the first 1024 bytes
+PDF_MAGIC = b"%PDF-"
+MAGIC_WINDOW = 1024
+
+
+class UploadError(ValueError):
+    """Raised for uploads that are not PDFs or are too large."""
+
+
+class StoredUpload(NamedTuple):
+    path: Path
+    sha256: str
+    size: int
+
+
+def incoming_path(suffix: str = ".pdf") -> Path:
+    INCOMING_DIR.mkdir(parents=True, exist_ok=True)
+    return INCOMING_DIR / f"{uuid.uuid4().hex}{suffix}"
+
+
+def discard(path: Path | None):
+    """Remove an incoming file that will not be analyzed (no-op once it was moved)."""
+    if path is not None:
+        path.unlink(missing_ok=True)
+
+
+def clear_incoming(max_age_s: float = 3600):
+    """Drop leftovers of uploads interrupted by a restart (other workers may be mid-upload)."""
+    cutoff = time.time() - max_age_s
+    for path in INCOMING_DIR.glob("*"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                discard(path)
+        except FileNotFoundError:
+            pass
+
+
+def _consume(out, sha, chunk: bytes):
+    sha.update(chunk)
+    out.write(chunk)
+
+
+async def save_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> StoredUpload:
+    """Stream an uploaded PDF to INCOMING_DIR. Raises UploadError (partial files are removed)."""
+    if not (file.filename or "").lower().endswith(".pdf"):
+        raise UploadError("Only PDF files supported")
+    return await _stream(file, incoming_path(), max_bytes, PDF_MAGIC)
+
+
+async def save_archive(file: UploadFile, max_bytes: int) -> StoredUpload:
+    """Stream an uploaded ZIP archive to INCOMING_DIR (batch uploads; contents are checked on extraction)."""
+    if not (file.filename or "").lower().endswith(".zip"):
+        raise UploadError("Only ZIP archives supported")
+    return await _stream(file, incoming_path(".zip"), max_bytes, None)
+
+
+async def _stream(file: UploadFile, path: Path, max_bytes: int, magic: bytes | None) -> StoredUpload:
+    """Copy the spooled upload to `path`, hashing it and checking its size and signature."""
+    sha = hashlib.sha256()
+    size = 0
+    head = b""
+    try:
+        with open(path, "wb") as out:
+            while chunk := await file.read(CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError(f"File too large (max {max_bytes // (1024 * 1024)}MB)")
+                if magic and len(head) < MAGIC_WINDOW:
+                    head += chunk[:MAGIC_WINDOW - len(head)]
+                    if len(head) >= MAGIC_WINDOW and magic not in head:
+                        raise UploadError("Not a PDF file")
+                await asyncio.to_thread(_consume, out, sha, chunk)
+        if magic and magic not in head:
+            raise UploadError("Not a PDF file")
+    except BaseException:
+        discard(path)
+        raise
+    return StoredUpload(path, sha.hexdigest(), size)
+
+
+class BodyTooLarge(HTTPException):
+    """Raised from the wrapped `receive` once a request body exceeds the limit."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(413, f"File too large (max {max_bytes // (1024 * 1024)}MB)")
+
+
+class ContentLengthLimit:
+    """
+    ASGI middleware: 413 for POSTs to `paths` whose body exceeds the upload limit
+    (plus multipart framing). A declared Content-Length is checked before anything
+    is read; otherwise, and for chunked requests, the received bytes are counted.
+    """
+
+    def __init__(self, app, paths: set[str], max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.paths = paths
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if not (scope["type"] == "http" and scope["method"] == "POST" and scope["path"] in self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.max_bytes + UPLOAD_OVERHEAD_BYTES
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise BodyTooLarge(self.max_bytes)
+            return message
+
+        async def tracked_send(message):
+            nonlocal started
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except BodyTooLarge:
+            # Normally answered by FastAPI's HTTPException handler already
+            if started:
+                raise
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse(
+            {"detail": f"File too large (max {self.max_bytes // (1024 * 1024)}MB)"}, status_code=413
+        )
+        await response(scope, receive, send)
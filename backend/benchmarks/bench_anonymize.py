@@ -0,0 +1,74 @@
+"""
+Anonymization throughput: single pass (and process pool) vs the legacy sequential re.sub passes.
+
+Measured on the test_docs text replicated to the requested sizes. Equivalence
+with the legacy output is covered by tests/test_anonymize.py.
+
+Usage (from backend/):
+    python -m benchmarks.bench_anonymize [--pages 50 500] [--workers 4]
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks.common import TEST_DOCS_DIR, page_texts
+
+from app.pipeline import anonymize, pdf_processor  # noqa: E402
+from app.pipeline.anonymize import (  # noqa: E402
+    EMAIL_PATTERN, IBAN_PATTERN, PESEL_PATTERN, NIP_PATTERN, REGON_PATTERN, PHONE_PATTERN, NAME_PATTERN,
+)
+
+
+def legacy_anonymize_text(text: str) -> str:
+    """The original implementation: one full re.sub pass per pattern (timing baseline)."""
+    result = EMAIL_PATTERN.sub('[EMAIL]', text)
+    result = IBAN_PATTERN.sub('[IBAN]', result)
+    result = PESEL_PATTERN.sub('[PESEL]', result)
+    result = NIP_PATTERN.sub('[NIP]', result)
+    result = REGON_PATTERN.sub('[REGON]', result)
+    result = PHONE_PATTERN.sub('[PHONE]', result)
+    return NAME_PATTERN.sub('[NAME]', result)
+
+
+def _time(fn, *args) -> float:
+    t0 = time.perf_counter()
+    fn(*args)
+    return round(time.perf_counter() - t0, 3)
+
+
+def main(page_counts: list[int], workers: int):
+    pdf_processor.PDF_WORKERS = workers
+    anonymize.PDF_WORKERS = workers
+    anonymize.POOL_MIN_CHARS = 0
+    source = [p for path in sorted(TEST_DOCS_DIR.glob("*.pdf")) for p in page_texts(path)]
+    if workers > 1:
+        anonymize.anonymize_pages(source, in_pool=True)  # exclude worker spawn from the timing
+
+    results = []
+    for count in page_counts:
+        pages = [source[i % len(source)] for i in range(count)]
+        chars = sum(len(p) for p in pages)
+        legacy_s = _time(lambda: [legacy_anonymize_text(p) for p in pages])
+        single_pass_s = _time(anonymize.anonymize_pages, pages)
+        pool_s = _time(anonymize.anonymize_pages, pages, True) if workers > 1 else None
+        results.append({
+            "pages": count,
+            "chars": chars,
+            "legacy_s": legacy_s,
+            "single_pass_s": single_pass_s,
+            "pool_s": pool_s,
+            "legacy_mb_per_s": round(chars / 1e6 / max(legacy_s, 1e-9), 2),
+            "single_pass_mb_per_s": round(chars / 1e6 / max(single_pass_s, 1e-9), 2),
+        })
+    pdf_processor.shutdown_process_pool()
+
+    print(json.dumps({"workers": workers, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    main(args.pages, args.workers)
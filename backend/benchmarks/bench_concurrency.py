@@ -0,0 +1,91 @@
+"""
+Read-endpoint latency while analyses are running.
+
+Starts N concurrent /api/analyze requests against slow fake externals
+(blocking LLM, slow Nominatim/PVGIS) and keeps polling /api/reports and
+/api/page in the meantime. With the async pipeline the read latencies under
+load should stay close to the idle baseline.
+
+Usage (from backend/):
+    python -m benchmarks.bench_concurrency [--analyses 8] [--llm-latency 2.0]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import (
+    TEST_DOCS_DIR, install_fake_http, install_fake_llm, summarize_ms,
+)
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+PDF_PATH = TEST_DOCS_DIR / "pv_offer_demo_yellow.pdf"
+
+
+async def _analyze(client: httpx.AsyncClient) -> dict:
+    files = {"file": (PDF_PATH.name, PDF_PATH.read_bytes(), "application/pdf")}
+    response = await client.post("/api/analyze", params={"force": True}, files=files)
+    response.raise_for_status()
+    return response.json()
+
+
+async def _poll_reads(client: httpx.AsyncClient, doc_id: str, stop: asyncio.Event, samples: list[float]):
+    while not stop.is_set():
+        for url in (f"/api/reports/{doc_id}", f"/api/page/{doc_id}/1"):
+            t0 = time.perf_counter()
+            response = await client.get(url)
+            samples.append(time.perf_counter() - t0)
+            response.raise_for_status()
+        await asyncio.sleep(0.01)
+
+
+async def main(analyses: int, llm_latency: float, pvgis_latency: float):
+    install_fake_llm(latency_s=0.0)
+    install_fake_http(nominatim_latency_s=0.05, pvgis_latency_s=0.0)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        seed = await _analyze(client)
+        doc_id = seed["document"]["doc_id"]
+
+        # Idle baseline
+        idle: list[float] = []
+        stop = asyncio.Event()
+        poller = asyncio.create_task(_poll_reads(client, doc_id, stop, idle))
+        await asyncio.sleep(1.0)
+        stop.set()
+        await poller
+
+        # Under load
+        install_fake_llm(latency_s=llm_latency)
+        install_fake_http(nominatim_latency_s=0.2, pvgis_latency_s=pvgis_latency)
+        loaded: list[float] = []
+        stop = asyncio.Event()
+        poller = asyncio.create_task(_poll_reads(client, doc_id, stop, loaded))
+        t0 = time.perf_counter()
+        await asyncio.gather(*(_analyze(client) for _ in range(analyses)))
+        wall = time.perf_counter() - t0
+        stop.set()
+        await poller
+
+    results = {
+        "analyses": analyses,
+        "llm_latency_s": llm_latency,
+        "pvgis_latency_s": pvgis_latency,
+        "analyses_wall_s": round(wall, 2),
+        "reads_idle": summarize_ms(idle),
+        "reads_under_load": summarize_ms(loaded),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--analyses", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=2.0)
+    parser.add_argument("--pvgis-latency", type=float, default=1.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.analyses, args.llm_latency, args.pvgis_latency))
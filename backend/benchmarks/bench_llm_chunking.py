@@ -0,0 +1,120 @@
+"""
+Single-prompt vs page-chunked text extraction: latency and field coverage.
+
+Builds a synthetic long offer with PV figures planted on early, middle and
+late pages, and answers prompts with a fake model whose latency grows with
+prompt size and which only "finds" figures present in the prompt. Reports
+wall time, fields found and whether evidence points at the right page.
+
+Usage (from backend/):
+    python -m benchmarks.bench_llm_chunking [--pages 20 80] [--chunk-tokens 7500]
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+
+from benchmarks.common import FakeResponse, install_fake_llm
+
+from app.pipeline import gemini_analyzer  # noqa: E402
+
+FILLER = (
+    "Warunki gwarancji obejmują moduły fotowoltaiczne oraz falowniki. "
+    "Wykonawca zapewnia serwis i przeglądy okresowe instalacji. "
+) * 28
+
+# field -> (line planted in the document, regex the fake model "reads", unit)
+PLANTED = {
+    "declared_power_kwp": ("Moc instalacji: 49,5 kWp", r"Moc instalacji: ([\d,]+) kWp", "kWp"),
+    "system_type": ("Typ: instalacja dachowa", r"Typ: instalacja (dachowa)", None),
+    "panels_count": ("Liczba paneli: 110 szt.", r"Liczba paneli: (\d+) szt", None),
+    "declared_yield_kwh_per_kwp": ("Uzysk: 1050 kWh/kWp", r"Uzysk: (\d+) kWh/kWp", "kWh/kWp"),
+    "inverter_power_kw": ("Falownik: 50 kW", r"Falownik: (\d+) kW", "kW"),
+    "capex_total": ("Cena całkowita: 180000 PLN", r"Cena całkowita: (\d+) PLN", "PLN"),
+}
+
+
+class SizedFakeModel:
+    """Latency = base + per-1k-token cost; facts only for figures in the prompt."""
+    base_s = 0.4
+    per_1k_tokens_s = 0.15
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def generate_content(self, contents, **kwargs):
+        prompt = contents if isinstance(contents, str) else contents[0]
+        time.sleep(self.base_s + self.per_1k_tokens_s * len(prompt) / gemini_analyzer.CHARS_PER_TOKEN / 1000)
+        facts = []
+        for field, (_, pattern, unit) in PLANTED.items():
+            match = re.search(pattern, prompt)
+            if not match:
+                continue
+            markers = re.findall(r"--- STRONA (\d+) ---", prompt[:match.start()])
+            facts.append({
+                "field": field, "value": match.group(1), "unit": unit, "confidence": 0.9,
+                "evidence": [{"page_no": int(markers[-1]) if markers else 1, "snippet": match.group(0)}],
+            })
+        return FakeResponse(json.dumps(facts))
+
+
+def make_pages(page_count: int) -> tuple[list[str], dict[str, int]]:
+    """Synthetic page texts plus the page each figure was planted on."""
+    fields = list(PLANTED)
+    positions = {
+        field: 1 + round(i * (page_count - 1) / (len(fields) - 1))
+        for i, field in enumerate(fields)
+    }
+    pages = []
+    for page_no in range(1, page_count + 1):
+        lines = [PLANTED[f][0] for f, p in positions.items() if p == page_no]
+        pages.append(f"--- STRONA {page_no} ---\n" + "\n".join(lines + [FILLER]))
+    return pages, positions
+
+
+async def _run(pages: list[str], positions: dict[str, int], mode: str) -> dict:
+    t0 = time.perf_counter()
+    facts = await gemini_analyzer.extract_facts_from_text(pages, mode=mode)
+    wall_s = time.perf_counter() - t0
+    found = {f.field: f for f in facts if f.field in positions}
+    correct_pages = sum(
+        1 for field, fact in found.items()
+        if fact.evidence and fact.evidence[0].page_no == positions[field]
+    )
+    return {
+        "wall_s": round(wall_s, 3),
+        "fields_found": len(found),
+        "fields_planted": len(positions),
+        "evidence_page_correct": correct_pages,
+    }
+
+
+async def main(page_counts: list[int], chunk_tokens: int):
+    install_fake_llm(model_cls=SizedFakeModel)
+    gemini_analyzer.LLM_CHUNK_TOKENS = chunk_tokens
+
+    results = []
+    for page_count in page_counts:
+        pages, positions = make_pages(page_count)
+        results.append({
+            "pages": page_count,
+            "chars": sum(len(p) for p in pages),
+            "chunks": len(gemini_analyzer.chunk_pages(pages, chunk_tokens)),
+            "single": await _run(pages, positions, "single"),
+            "chunked": await _run(pages, positions, "chunked"),
+        })
+
+    print(json.dumps({
+        "chunk_tokens": chunk_tokens,
+        "gemini_concurrency": gemini_analyzer.GEMINI_CONCURRENCY,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[20, 80])
+    parser.add_argument("--chunk-tokens", type=int, default=7500)
+    args = parser.parse_args()
+    asyncio.run(main(args.pages, args.chunk_tokens))
@@ -0,0 +1,118 @@
+"""
+Evidence snippet -> page boxes: stored word index vs reopening the PDF.
+
+Ingest cost: text-only extraction vs text + word geometry + index, and the
+size of words.npz. Lookup: snippets are sampled from the document's own words
+(exact, with one word anonymized to [NAME], with one word dropped) and
+resolved with `word_index.locate` (cold = first call, loads words.npz) and with
+the legacy approach of opening the PDF and running `page.search_for` on the
+cited page, or on every page when no page is given.
+
+Usage (from backend/):
+    python -m benchmarks.bench_locate [--pages 1000] [--queries 300]
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks.common import BENCH_UPLOAD_DIR, make_large_pdf, page_texts, summarize_ms
+
+import fitz  # noqa: E402
+
+from app.pipeline import pdf_processor, word_index  # noqa: E402
+
+DOC_ID = "BENCH-LOCATE"
+
+
+def sample_queries(pdf_path, count: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    queries = []
+    with fitz.open(pdf_path) as pdf:
+        while len(queries) < count:
+            page_no = rng.randint(1, pdf.page_count)
+            words = [w[4] for w in pdf[page_no - 1].get_text("words")]
+            if len(words) < 12:
+                continue
+            length = rng.randint(4, 12)
+            start = rng.randint(0, len(words) - length)
+            window = words[start:start + length]
+            kind = ("exact", "anonymized", "dropped")[len(queries) % 3]
+            if kind == "anonymized":
+                window[rng.randrange(length)] = "[NAME]"
+            elif kind == "dropped":
+                del window[rng.randrange(1, length - 1)]
+            queries.append({"page_no": page_no, "snippet": " ".join(window), "kind": kind})
+    return queries
+
+
+def legacy_locate(pdf_path, snippet: str, page_no: int | None) -> int | None:
+    """Reopen the PDF and search the cited page (or all pages); first page with a hit."""
+    with fitz.open(pdf_path) as pdf:
+        pages = [page_no] if page_no else range(1, pdf.page_count + 1)
+        for n in pages:
+            if pdf[n - 1].search_for(snippet):
+                return n
+    return None
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+def main(pages: int, queries: int):
+    data = make_large_pdf(pages)
+    doc_dir = BENCH_UPLOAD_DIR / DOC_ID
+    doc_dir.mkdir(parents=True, exist_ok=True)
+    pdf_path = doc_dir / pdf_processor.SOURCE_PDF_NAME
+    pdf_path.write_bytes(data)
+
+    _, text_only_s = _timed(page_texts, pdf_path)
+    page_words, words_s = _timed(pdf_processor.extract_texts_and_words, pdf_path)
+    _, save_s = _timed(word_index.save_index, doc_dir, [w for _, w in page_words])
+
+    sample = sample_queries(pdf_path, queries)
+    _, cold_s = _timed(word_index.locate, DOC_ID, sample[0]["snippet"], sample[0]["page_no"])
+
+    results = {"index": [], "legacy_page": [], "legacy_no_page": []}
+    hits = {"index": {}, "legacy_page": {}, "legacy_no_page": {}}
+    for i, q in enumerate(sample):
+        matches, s = _timed(word_index.locate, DOC_ID, q["snippet"], q["page_no"])
+        results["index"].append(s)
+        hits["index"].setdefault(q["kind"], []).append(bool(matches) and matches[0].page_no == q["page_no"])
+
+        found, s = _timed(legacy_locate, pdf_path, q["snippet"], q["page_no"])
+        results["legacy_page"].append(s)
+        hits["legacy_page"].setdefault(q["kind"], []).append(found == q["page_no"])
+
+        if i < 20:  # a full-document scan per query is slow
+            found, s = _timed(legacy_locate, pdf_path, q["snippet"], None)
+            results["legacy_no_page"].append(s)
+            hits["legacy_no_page"].setdefault(q["kind"], []).append(found is not None)
+
+    print(json.dumps({
+        "pages": pages,
+        "words": sum(len(w.tokens) for _, w in page_words),
+        "ingest_s": {
+            "text_only": round(text_only_s, 2),
+            "text_and_words": round(words_s, 2),
+            "save_index": round(save_s, 2),
+        },
+        "bytes": {"pdf": pdf_path.stat().st_size, "words_npz": word_index.index_path(DOC_ID).stat().st_size},
+        "cold_first_locate_ms": round(cold_s * 1000, 1),
+        "latency": {name: summarize_ms(values) for name, values in results.items()},
+        "hit_rate": {
+            name: {kind: round(sum(v) / len(v), 3) for kind, v in by_kind.items()}
+            for name, by_kind in hits.items()
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+    main(args.pages, args.queries)
@@ -0,0 +1,94 @@
+"""
+Instrumentation overhead: timing spans with metrics off / on / on + report timings.
+
+Micro: cost of one `with metrics.span(...)` block per mode, against an empty
+loop. Macro: analyses of test_docs/*.pdf (fake Gemini, in-process fake
+Nominatim/PVGIS with zero latency, so the pipeline's own CPU time dominates)
+with instrumentation fully off and fully on, plus spans recorded per analysis
+and the cost of rendering /metrics afterwards.
+
+Usage (from backend/):
+    python -m benchmarks.bench_metrics [--spans 200000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from benchmarks.common import TEST_DOCS_DIR, install_fake_http, install_fake_llm
+
+from app import analysis, metrics  # noqa: E402
+
+
+def configure(enabled: bool, report_timings: bool):
+    metrics.METRICS_ENABLED = enabled
+    metrics.REPORT_TIMINGS = report_timings
+
+
+def span_cost_ns(count: int, mode: str) -> float:
+    configure(enabled=mode != "off", report_timings=mode == "on+timings")
+    with metrics.collect_timings():
+        t0 = time.perf_counter()
+        if mode == "baseline":
+            for _ in range(count):
+                pass
+        else:
+            for _ in range(count):
+                with metrics.span("bench", size="screen"):
+                    pass
+        return (time.perf_counter() - t0) / count * 1e9
+
+
+async def analysis_ms(docs: list[tuple[str, bytes]], repeat: int) -> tuple[dict[str, list[float]], int]:
+    """Analysis wall times with instrumentation off and on (interleaved, so drift hits both)."""
+    durations, spans = {"off": [], "on": []}, 0
+    for _ in range(repeat):
+        for name, data in docs:
+            for mode in ("off", "on"):
+                configure(enabled=mode == "on", report_timings=mode == "on")
+                t0 = time.perf_counter()
+                report = await analysis.run_analysis(data, name)
+                durations[mode].append((time.perf_counter() - t0) * 1000)
+                if report.timings:
+                    spans = sum(t.calls for t in report.timings)
+    return durations, spans
+
+
+async def main(span_count: int, repeat: int):
+    modes = ["baseline", "off", "on", "on+timings"]
+    micro = {mode: round(span_cost_ns(span_count, mode), 1) for mode in modes}
+
+    install_fake_llm(latency_s=0.0)
+    install_fake_http(nominatim_latency_s=0.0, pvgis_latency_s=0.0)
+    docs = [(p.name, p.read_bytes()) for p in sorted(TEST_DOCS_DIR.glob("*.pdf"))]
+    await analysis_ms(docs, 1)  # warm-up (imports, caches)
+    durations, spans = await analysis_ms(docs, repeat)
+    configure(enabled=True, report_timings=True)
+    t0 = time.perf_counter()
+    exposition = metrics.render()
+    render_ms = (time.perf_counter() - t0) * 1000
+
+    print(json.dumps({
+        "span_cost_ns": micro,
+        "analyses_per_mode": len(durations["off"]),
+        "spans_per_analysis": spans,
+        "estimated_overhead_per_analysis_us": round(spans * (micro["on+timings"] - micro["baseline"]) / 1000, 1),
+        "analysis_median_ms": {
+            "instrumentation_off": round(statistics.median(durations["off"]), 2),
+            "instrumentation_on": round(statistics.median(durations["on"]), 2),
+        },
+        "metrics_render": {
+            "series": sum(1 for line in exposition.splitlines() if not line.startswith("#")),
+            "bytes": len(exposition),
+            "ms": round(render_ms, 2),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--spans", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.spans, args.repeat))
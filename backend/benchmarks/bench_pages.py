@@ -0,0 +1,129 @@
+"""
+Page images: legacy 2x PNG for everything vs size variants with immutable caching.
+
+Simulates opening the page viewer on a document: the main page image plus a
+thumbnail strip of every page. Legacy serves the 2x PNG for both (and has no
+validators, so a revisit downloads everything again); the new endpoint serves
+`size=screen` for the page, `size=thumb` for the strip, and answers revisits
+with 304. Time to first render = fetch of the main page image (cold: rendered
+on request; warm: already in the page cache) + its transfer over a
+`--mbps` link + decode.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pages [--pages 30] [--mbps 20]
+"""
+import argparse
+import asyncio
+import io
+import json
+import time
+
+from benchmarks.common import make_large_pdf, render_pages
+
+import fitz  # noqa: E402
+import httpx  # noqa: E402
+from fastapi import FastAPI, HTTPException  # noqa: E402
+from fastapi.responses import FileResponse  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.config import UPLOAD_DIR  # noqa: E402
+from app.pipeline import render  # noqa: E402
+from app.pipeline.pdf_processor import process_pdf, source_pdf_path  # noqa: E402
+
+DOC_ID = "BENCH-PAGES"
+
+legacy_app = FastAPI()
+
+
+@legacy_app.get("/api/page/{doc_id}/{page_no}")
+def legacy_get_page(doc_id: str, page_no: int):
+    """The original handler: 2x PNG, cached on disk, no caching headers."""
+    path = UPLOAD_DIR / doc_id / "pages_legacy" / f"{page_no:03d}.png"
+    if not path.exists():
+        with fitz.open(source_pdf_path(doc_id)) as pdf:
+            if not 1 <= page_no <= pdf.page_count:
+                raise HTTPException(404, "Page not found")
+            png = pdf[page_no - 1].get_pixmap(matrix=fitz.Matrix(2, 2)).tobytes("png")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(png)
+    return FileResponse(path, media_type="image/png")
+
+
+async def _fetch(client: httpx.AsyncClient, url: str, etags: dict | None = None) -> tuple[int, float, bytes]:
+    headers = {"if-none-match": etags[url]} if etags is not None and url in etags else {}
+    t0 = time.perf_counter()
+    response = await client.get(url, headers=headers)
+    elapsed = time.perf_counter() - t0
+    if etags is not None and "etag" in response.headers:
+        etags[url] = response.headers["etag"]
+    return response.status_code, elapsed, response.content
+
+
+def _decode_ms(data: bytes) -> float:
+    t0 = time.perf_counter()
+    Image.open(io.BytesIO(data)).load()
+    return round((time.perf_counter() - t0) * 1000, 1)
+
+
+async def scenario(asgi_app, pages: int, main_url: str, strip_url: str, revalidate: bool, mbps: float) -> dict:
+    etags = {} if revalidate else None
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url="http://bench") as client:
+        # First visit: main page first (time to first render), then the strip
+        _, main_s, main_bytes = await _fetch(client, main_url.format(page=1), etags)
+        decode_ms = _decode_ms(main_bytes)
+        transfer_ms = len(main_bytes) * 8 / (mbps * 1e6) * 1000
+        strip = [await _fetch(client, strip_url.format(page=n), etags) for n in range(1, pages + 1)]
+        _, warm_s, _ = await _fetch(client, main_url.format(page=1))
+
+        # Revisit: same images again (browser cache validators, if any)
+        revisit = [await _fetch(client, main_url.format(page=1), etags)]
+        revisit += [await _fetch(client, strip_url.format(page=n), etags) for n in range(1, pages + 1)]
+
+    return {
+        "time_to_first_render_ms": {
+            "cold": round(main_s * 1000 + transfer_ms + decode_ms, 1),
+            "warm": round(warm_s * 1000 + transfer_ms + decode_ms, 1),
+        },
+        "main_image_bytes": len(main_bytes),
+        "main_transfer_ms": round(transfer_ms, 1),
+        "main_decode_ms": decode_ms,
+        "strip_bytes": sum(len(body) for _, _, body in strip),
+        "strip_transfer_ms": round(sum(len(body) for _, _, body in strip) * 8 / (mbps * 1e6) * 1000, 1),
+        "strip_fetch_ms": round(sum(s for _, s, _ in strip) * 1000, 1),
+        "first_visit_bytes": len(main_bytes) + sum(len(body) for _, _, body in strip),
+        "revisit_bytes": sum(len(body) for _, _, body in revisit),
+        "revisit_statuses": sorted({status for status, _, _ in revisit}),
+    }
+
+
+async def main(pages: int, mbps: float):
+    process_pdf(make_large_pdf(pages), "bench.pdf", doc_id=DOC_ID)
+    base = f"/api/page/{DOC_ID}/{{page}}"
+    results = {
+        "legacy_png": await scenario(legacy_app, pages, base, base, revalidate=False, mbps=mbps),
+        "variants": await scenario(app, pages, base + "?size=screen", base + "?size=thumb", revalidate=True, mbps=mbps),
+    }
+
+    sizes = {}
+    for size in render.PAGE_SIZES:
+        paths = render_pages(DOC_ID, list(range(1, pages + 1)), size)
+        sizes[size] = round(sum(p.stat().st_size for p in paths) / len(paths))
+    legacy_dir = UPLOAD_DIR / DOC_ID / "pages_legacy"
+    sizes["legacy_png"] = round(sum(p.stat().st_size for p in legacy_dir.glob("*.png")) / pages)
+
+    print(json.dumps({
+        "pages": pages,
+        "format": render.IMAGE_FORMAT,
+        "link_mbps": mbps,
+        "avg_bytes_per_page": sizes,
+        "viewer": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=30)
+    parser.add_argument("--mbps", type=float, default=20.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.pages, args.mbps))
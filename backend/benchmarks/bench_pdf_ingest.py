@@ -0,0 +1,70 @@
+"""
+Sequential vs process-pool PDF ingest and page rendering.
+
+Builds synthetic PDFs by replicating the test_docs pages and times
+`process_pdf` (text extraction) and `render_pages` (full-size page images) in both modes.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pdf_ingest [--pages 50 200] [--workers 4]
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+from benchmarks.common import BENCH_UPLOAD_DIR, make_large_pdf, render_pages
+
+from app.pipeline import pdf_processor  # noqa: E402
+
+
+def _configure(workers: int, min_pages: int):
+    pdf_processor.PDF_WORKERS = workers
+    pdf_processor.PDF_PARALLEL_MIN_PAGES = min_pages
+
+
+def _run(data: bytes, label: str) -> dict:
+    t0 = time.perf_counter()
+    meta, page_info, _ = pdf_processor.process_pdf(data, f"{label}.pdf", doc_id=f"BENCH-{label}")
+    ingest_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    render_pages(meta.doc_id, [p.page_no for p in page_info])
+    render_s = time.perf_counter() - t0
+
+    shutil.rmtree(BENCH_UPLOAD_DIR / meta.doc_id)
+    return {"ingest_s": round(ingest_s, 3), "render_s": round(render_s, 3)}
+
+
+def main(page_counts: list[int], workers: int):
+    results = []
+    for pages in page_counts:
+        data = make_large_pdf(pages)
+
+        _configure(workers=1, min_pages=10**9)
+        sequential = _run(data, f"seq-{pages}")
+
+        _configure(workers=workers, min_pages=1)
+        pdf_processor.get_process_pool()  # exclude worker spawn from the timing
+        _run(make_large_pdf(min(pages, 4)), f"warmup-{pages}")
+        parallel = _run(data, f"par-{pages}")
+
+        results.append({
+            "pages": pages,
+            "workers": workers,
+            "sequential": sequential,
+            "parallel": parallel,
+            "ingest_speedup": round(sequential["ingest_s"] / max(parallel["ingest_s"], 1e-9), 2),
+            "render_speedup": round(sequential["render_s"] / max(parallel["render_s"], 1e-9), 2),
+        })
+        pdf_processor.shutdown_process_pool()
+
+    print(json.dumps({"cpu_count": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    main(args.pages, args.workers)
@@ -0,0 +1,301 @@
+"""
+Full analysis pipeline, offline: per-stage latency, throughput and peak memory.
+
+Runs `run_analysis` over test_docs/*.pdf and synthetic large PDFs with every
+external service replaced by a local stand-in: the fake Gemini model (canned
+JSON) and a FakeServiceServer answering Nominatim and PVGIS over HTTP. Each
+stand-in has its own latency and error rate. Reported per scenario:
+
+    stages      p50/p95 per pipeline stage (ingest, extract, ground, verify, save)
+    calls       p50/p95 of process_pdf, anonymize_pages, the extractors, run_verification
+    spans       p50/p95 of the report's own timing spans (per analysis, summed per span)
+    throughput  documents and pages per second (wall time, --concurrency analyses at once)
+    memory      peak RSS of this process and of the PDF pool workers (Linux, else null)
+    failures    analyses that raised, by exception type
+
+Geocoding/PVGIS caches are cleared before every analysis (--warm-caches keeps
+them) so each run exercises the fake services. Results are saved as JSON with
+the git commit, so runs on two commits can be diffed:
+
+    python -m benchmarks.bench_pipeline --out before.json
+    ...
+    python -m benchmarks.bench_pipeline --compare before.json
+
+Usage (from backend/):
+    python -m benchmarks.bench_pipeline [--pages 100 300] [--repeat 3] [--concurrency 1]
+        [--llm-latency 0.5] [--llm-error-rate 0] [--nominatim-latency 0.2]
+        [--pvgis-latency 0.5] [--http-error-rate 0] [--no-rules] [--warm-caches]
+        [--out FILE] [--compare FILE]
+"""
+import argparse
+import asyncio
+import functools
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.common import (
+    TEST_DOCS_DIR, FakeGenerativeModel, FakeServiceServer, StageTimer, install_fake_llm, make_large_pdf, summarize_ms,
+)
+
+from app import analysis  # noqa: E402
+from app.pipeline import gemini_analyzer, geocoding, pdf_processor, pvgis  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Functions timed on every call: (module the pipeline looks them up in, attribute)
+TIMED_CALLS = [
+    (analysis, "process_pdf"),
+    (gemini_analyzer, "anonymize_pages"),
+    (analysis, "extract_rule_facts"),
+    (analysis, "extract_facts_from_text"),
+    (analysis, "extract_facts_from_images"),
+    (analysis, "ground_facts"),
+    (analysis, "run_verification"),
+]
+
+_samples: dict[str, list[float]] = {}
+
+
+def _record(name: str, t0: float):
+    _samples.setdefault(name, []).append(time.perf_counter() - t0)
+
+
+def _timed(name: str, fn):
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                _record(name, t0)
+    else:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(name, t0)
+    return wrapper
+
+
+def instrument():
+    for module, name in TIMED_CALLS:
+        setattr(module, name, _timed(name, getattr(module, name)))
+
+
+def _status_kb(pid: int | str, field: str) -> int | None:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _pool_pids() -> list[int]:
+    pool = pdf_processor._pool
+    return list(pool._processes) if pool is not None and pool._processes else []
+
+
+def reset_peak_rss():
+    """Restart VmHWM accounting for this process and the pool workers (Linux >= 4.0)."""
+    for pid in ["self", *_pool_pids()]:
+        try:
+            Path(f"/proc/{pid}/clear_refs").write_text("5")
+        except OSError:
+            pass
+
+
+def peak_rss_mb() -> dict:
+    own = _status_kb("self", "VmHWM")
+    workers = [kb for kb in (_status_kb(pid, "VmHWM") for pid in _pool_pids()) if kb is not None]
+    return {
+        "process": round(own / 1024, 1) if own is not None else None,
+        "pool_worker_max": round(max(workers) / 1024, 1) if workers else None,
+    }
+
+
+def clear_service_caches():
+    geocoding._get_cache().clear()
+    pvgis._get_cache().clear()
+
+
+def load_documents(page_counts: list[int]) -> dict[str, list[tuple[str, bytes]]]:
+    scenarios = {"test_docs": [(p.name, p.read_bytes()) for p in sorted(TEST_DOCS_DIR.glob("*.pdf"))]}
+    for pages in page_counts:
+        scenarios[f"synthetic_{pages}p"] = [(f"synthetic_{pages}p.pdf", make_large_pdf(pages))]
+    return scenarios
+
+
+async def run_scenario(docs: list[tuple[str, bytes]], repeat: int, concurrency: int, cold: bool, fake) -> dict:
+    _samples.clear()
+    stage_samples: dict[str, list[float]] = {}
+    span_samples: dict[str, list[float]] = {}
+    failures: dict[str, int] = {}
+    pages = 0
+    services_before = fake.stats()
+    llm_before = (FakeGenerativeModel.calls, FakeGenerativeModel.errors)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(filename: str, data: bytes):
+        nonlocal pages
+        async with semaphore:
+            if cold:
+                await asyncio.to_thread(clear_service_caches)
+            timer = StageTimer()
+            try:
+                report = await analysis.run_analysis(data, filename, on_stage=timer)
+            except Exception as e:
+                failures[type(e).__name__] = failures.get(type(e).__name__, 0) + 1
+                return
+            timer.finish()
+            pages += report.document.pages
+            for name, ms in timer.timings.items():
+                stage_samples.setdefault(name, []).append(ms / 1000)
+            for timing in report.timings or []:
+                labels = ",".join(f"{k}={v}" for k, v in sorted(timing.labels.items()))
+                name = f"{timing.name}[{labels}]" if labels else timing.name
+                span_samples.setdefault(name, []).append(timing.total_ms / 1000)
+
+    reset_peak_rss()
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(name, data) for _ in range(repeat) for name, data in docs))
+    wall = time.perf_counter() - t0
+    runs = repeat * len(docs)
+    completed = runs - sum(failures.values())
+    services = fake.stats()
+
+    return {
+        "documents": [name for name, _ in docs],
+        "runs": runs,
+        "completed": completed,
+        "failures": failures,
+        "wall_s": round(wall, 3),
+        "throughput": {
+            "docs_per_s": round(completed / wall, 3),
+            "pages_per_s": round(pages / wall, 1),
+        },
+        "stages": {name: summarize_ms(stage_samples[name]) for name in analysis.STAGES if name in stage_samples},
+        "calls": {name: summarize_ms(values) for name, values in _samples.items()},
+        "spans": {name: summarize_ms(values) for name, values in sorted(span_samples.items())},
+        "peak_rss_mb": peak_rss_mb(),
+        "service_calls": {
+            "llm": {
+                "requests": FakeGenerativeModel.calls - llm_before[0],
+                "errors": FakeGenerativeModel.errors - llm_before[1],
+            },
+            **{
+                name: {key: services[name][key] - services_before[name][key] for key in services[name]}
+                for name in services
+            },
+        },
+    }
+
+
+def _git(*args: str) -> str | None:
+    try:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(args: argparse.Namespace) -> dict:
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("out", "compare")},
+    }
+
+
+def _metrics(scenario: dict) -> dict[str, float | None]:
+    """Flat metric name -> value view of one scenario, for comparisons."""
+    flat = {f"throughput.{key}": value for key, value in scenario["throughput"].items()}
+    for group in ("stages", "calls", "spans"):
+        for name, summary in scenario.get(group, {}).items():
+            flat[f"{group}.{name}.p50_ms"] = summary["p50_ms"]
+            flat[f"{group}.{name}.p95_ms"] = summary["p95_ms"]
+    for key, value in scenario["peak_rss_mb"].items():
+        flat[f"peak_rss_mb.{key}"] = value
+    return flat
+
+
+def compare(base: dict, new: dict) -> str:
+    """Text table of every metric present in both runs, with the relative change."""
+    lines = [
+        f"base {base['meta'].get('commit')} ({base['meta'].get('timestamp')}) -> "
+        f"new {new['meta'].get('commit')} ({new['meta'].get('timestamp')})",
+        f"{'scenario':<18} {'metric':<40} {'base':>10} {'new':>10} {'change':>8}",
+    ]
+    for name, scenario in new["scenarios"].items():
+        if name not in base["scenarios"]:
+            continue
+        old_metrics = _metrics(base["scenarios"][name])
+        for metric, value in _metrics(scenario).items():
+            old = old_metrics.get(metric)
+            if old is None or value is None:
+                continue
+            change = f"{(value - old) / old * 100:+.1f}%" if old else "n/a"
+            lines.append(f"{name:<18} {metric:<40} {old:>10} {value:>10} {change:>8}")
+    return "\n".join(lines)
+
+
+async def main(args: argparse.Namespace):
+    install_fake_llm(latency_s=args.llm_latency, rules=args.rules, error_rate=args.llm_error_rate)
+    instrument()
+    results = {"meta": run_metadata(args), "scenarios": {}}
+
+    with FakeServiceServer(
+        latency_s={"nominatim": args.nominatim_latency, "pvgis": args.pvgis_latency},
+        error_rate={"nominatim": args.http_error_rate, "pvgis": args.http_error_rate},
+    ) as fake:
+        fake.install()
+        for name, docs in load_documents(args.pages).items():
+            results["scenarios"][name] = await run_scenario(
+                docs, args.repeat, args.concurrency, not args.warm_caches, fake
+            )
+    await geocoding.aclose_client()
+    await pvgis.aclose_client()
+    pdf_processor.shutdown_process_pool()
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"pipeline-{results['meta']['commit'] or 'nogit'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(json.dumps(results, indent=2))
+    print(f"\nSaved to {out}", file=sys.stderr)
+
+    if args.compare:
+        print(compare(json.loads(Path(args.compare).read_text()), results))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="*", default=[100, 300], help="synthetic document sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="analyses per document")
+    parser.add_argument("--concurrency", type=int, default=1, help="analyses in flight at once")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--nominatim-latency", type=float, default=0.2)
+    parser.add_argument("--pvgis-latency", type=float, default=0.5)
+    parser.add_argument("--http-error-rate", type=float, default=0.0, help="Nominatim and PVGIS 503 rate")
+    parser.add_argument("--no-rules", dest="rules", action="store_false", help="always call the (fake) LLM")
+    parser.add_argument("--warm-caches", action="store_true", help="keep geocoding/PVGIS caches between runs")
+    parser.add_argument("--out", help="results file (default benchmarks/results/pipeline-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,121 @@
+"""
+GET /api/reports latency and size: legacy json.loads + re-serialize vs stored bytes.
+
+Builds a large synthetic report, stores it the old way (indent=2, parsed and
+re-serialized by FastAPI on every request) and the new way (compact bytes,
+gzip sibling, ETag), then times sequential requests through the ASGI app:
+legacy, new identity, new gzip, and revalidation (If-None-Match -> 304).
+
+Usage (from backend/):
+    python -m benchmarks.bench_reports [--pages 2000] [--facts 300] [--requests 200]
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from benchmarks.common import summarize_ms
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, HTTPException  # noqa: E402
+
+from app.config import UPLOAD_DIR  # noqa: E402
+from app.main import app  # noqa: E402
+from app import reports  # noqa: E402
+from app.schemas import (  # noqa: E402
+    AnalysisReport, DocumentMeta, PageInfo, ExtractedFact, Evidence, VerificationResult, RedFlag, ScoreCard,
+)
+
+DOC_ID = "BENCH-REPORT"
+
+
+def make_report(pages: int, facts: int) -> AnalysisReport:
+    evidence = [
+        Evidence(page_no=i % pages + 1, snippet=f"Moc instalacji: {49 + i % 7},5 kWp (pozycja {i})")
+        for i in range(3)
+    ]
+    return AnalysisReport(
+        document=DocumentMeta(doc_id=DOC_ID, filename="large.pdf", sha256="0" * 64, pages=pages,
+                              created_at=datetime.now()),
+        page_info=[PageInfo(page_no=i + 1, has_text=True, char_count=2500 + i, relevance=i % 40 / 2)
+                   for i in range(pages)],
+        facts=[ExtractedFact(field=f"field_{i}", value=i * 1.5, unit="kWp", confidence=0.9, evidence=evidence)
+               for i in range(facts)],
+        verifications=[VerificationResult(check_id=f"CHK-{i}", check_type="BENCH", inputs={"a": i}, outputs={"b": i},
+                                          result="OK", why="Synthetic check " * 5, evidence=evidence)
+                       for i in range(20)],
+        red_flags=[RedFlag(flag_id=f"RF-{i}", severity="MEDIUM", category="BENCH", title="Synthetic flag",
+                           description="Synthetic description " * 5, recommended_action="None", evidence=evidence)
+                   for i in range(20)],
+        scorecard=ScoreCard(evidence_coverage=80, consistency=100, feasibility=90, traffic_light="GREEN"),
+    )
+
+
+legacy_app = FastAPI()
+
+
+@legacy_app.get("/api/reports/{doc_id}")
+def legacy_get_report(doc_id: str):
+    """The original handler."""
+    path = UPLOAD_DIR / doc_id / "legacy_report.json"
+    if not path.exists():
+        raise HTTPException(404, "Report not found")
+    return json.loads(path.read_text())
+
+
+async def _time(client: httpx.AsyncClient, n: int, headers: dict) -> tuple[dict, int, int]:
+    latencies, size, status = [], 0, 0
+    for _ in range(n):
+        t0 = time.perf_counter()
+        response = await client.get(f"/api/reports/{DOC_ID}", headers=headers)
+        latencies.append(time.perf_counter() - t0)
+        # httpx decodes gzip transparently; count what went over the wire
+        size, status = int(response.headers.get("content-length", len(response.content))), response.status_code
+    return summarize_ms(latencies), size, status
+
+
+async def main(pages: int, facts: int, requests: int):
+    report = make_report(pages, facts)
+    doc_dir = UPLOAD_DIR / DOC_ID
+    doc_dir.mkdir(parents=True, exist_ok=True)
+
+    t0 = time.perf_counter()
+    (doc_dir / "legacy_report.json").write_text(report.model_dump_json(indent=2), encoding="utf-8")
+    legacy_save_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    reports.save_report(report)
+    save_ms = (time.perf_counter() - t0) * 1000
+
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=legacy_app), base_url="http://bench") as client:
+        results["legacy"] = await _time(client, requests, {"accept-encoding": "identity"})
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        results["stored_identity"] = await _time(client, requests, {"accept-encoding": "identity"})
+        results["stored_gzip"] = await _time(client, requests, {"accept-encoding": "gzip"})
+        etag = (await client.get(f"/api/reports/{DOC_ID}", headers={"accept-encoding": "gzip"})).headers["etag"]
+        results["revalidate_304"] = await _time(client, requests, {"accept-encoding": "gzip", "if-none-match": etag})
+
+    print(json.dumps({
+        "pages": pages,
+        "facts": facts,
+        "save_ms": {"legacy_indent2": round(legacy_save_ms, 1), "compact_plus_gzip": round(save_ms, 1)},
+        "file_bytes": {
+            "legacy_indent2": (doc_dir / "legacy_report.json").stat().st_size,
+            "compact": reports.report_path(DOC_ID).stat().st_size,
+            "gzip": reports.report_path(DOC_ID).with_suffix(".json.gz").stat().st_size,
+        },
+        "endpoints": {
+            name: {"status": status, "bytes": size, "latency_ms": latency}
+            for name, (latency, size, status) in results.items()
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--facts", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.pages, args.facts, args.requests))
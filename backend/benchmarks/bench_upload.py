@@ -0,0 +1,143 @@
+"""
+Upload ingest peak memory: whole-body `file.read()` vs streamed-to-disk uploads.
+
+Starts a real uvicorn server per variant (fresh process, so its peak RSS is
+comparable), sends concurrent uploads of a large PDF over TCP and reads the
+server's VmHWM from /proc (Linux only). Both endpoints run `process_pdf`
+only - the LLM/verification stages are not part of the measurement:
+
+    legacy    await file.read() + size check, process_pdf(bytes)
+    streamed  uploads.save_upload() (chunked, hashed on the fly), process_pdf(path)
+
+Usage (from backend/):
+    python -m benchmarks.bench_upload [--size-mb 40] [--concurrency 1 4 8]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.common import BENCH_UPLOAD_DIR, TEST_DOCS_DIR
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, UploadFile, File, HTTPException  # noqa: E402
+
+from app import uploads  # noqa: E402
+from app.pipeline.pdf_processor import process_pdf  # noqa: E402
+
+bench_app = FastAPI()
+
+
+@bench_app.post("/legacy")
+async def legacy_upload(file: UploadFile = File(...)):
+    """The original handler: whole upload in memory, size checked afterwards."""
+    content = await file.read()
+    if len(content) > 50 * 1024 * 1024:
+        raise HTTPException(400, "File too large (max 50MB)")
+    meta, _, _ = await asyncio.to_thread(process_pdf, content, file.filename)
+    return {"pages": meta.pages}
+
+
+@bench_app.post("/streamed")
+async def streamed_upload(file: UploadFile = File(...)):
+    try:
+        upload = await uploads.save_upload(file)
+    except uploads.UploadError as e:
+        raise HTTPException(400, str(e))
+    meta, _, _ = await asyncio.to_thread(process_pdf, upload.path, file.filename, None, False, upload.sha256)
+    return {"pages": meta.pages}
+
+
+@bench_app.get("/")
+def health():
+    return {"status": "ok"}
+
+
+def make_padded_pdf(path: Path, size_mb: int):
+    """test_docs pages plus an incompressible attachment, so the file really is `size_mb` MB."""
+    import fitz
+
+    out = fitz.open()
+    for src_path in sorted(TEST_DOCS_DIR.glob("*.pdf")):
+        with fitz.open(src_path) as src:
+            out.insert_pdf(src)
+    out.embfile_add("padding.bin", os.urandom(size_mb * 1024 * 1024))
+    out.save(path)
+    out.close()
+
+
+def _memory_kb(pid: int) -> dict:
+    status = Path(f"/proc/{pid}/status").read_text()
+    fields = dict(line.split(":", 1) for line in status.splitlines() if ":" in line)
+    return {key: int(fields[key].split()[0]) for key in ("VmRSS", "VmHWM")}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _upload(client: httpx.AsyncClient, url: str, pdf: Path) -> float:
+    t0 = time.perf_counter()
+    with open(pdf, "rb") as f:
+        response = await client.post(url, files={"file": ("large.pdf", f, "application/pdf")})
+    response.raise_for_status()
+    return time.perf_counter() - t0
+
+
+async def measure(variant: str, pdf: Path, concurrency: int) -> dict:
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.bench_upload:bench_app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, "UPLOAD_DIR": str(BENCH_UPLOAD_DIR)},
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(timeout=300) as client:
+            for _ in range(100):
+                try:
+                    await client.get(base + "/")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            idle = _memory_kb(server.pid)
+            t0 = time.perf_counter()
+            latencies = await asyncio.gather(*[_upload(client, f"{base}/{variant}", pdf) for _ in range(concurrency)])
+            wall = time.perf_counter() - t0
+            after = _memory_kb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "variant": variant,
+        "concurrency": concurrency,
+        "idle_rss_mb": round(idle["VmRSS"] / 1024, 1),
+        "peak_rss_mb": round(after["VmHWM"] / 1024, 1),
+        "peak_over_idle_mb": round((after["VmHWM"] - idle["VmRSS"]) / 1024, 1),
+        "wall_s": round(wall, 2),
+        "max_upload_s": round(max(latencies), 2),
+    }
+
+
+async def main(size_mb: int, concurrency_levels: list[int]):
+    pdf = BENCH_UPLOAD_DIR / "bench_upload.pdf"
+    make_padded_pdf(pdf, size_mb)
+    results = []
+    for concurrency in concurrency_levels:
+        for variant in ("legacy", "streamed"):
+            results.append(await measure(variant, pdf, concurrency))
+    print(json.dumps({"file_mb": round(pdf.stat().st_size / 1024 / 1024, 1), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+    asyncio.run(main(args.size_mb, args.concurrency))
@@ -0,0 +1,332 @@
+"""
+Shared helpers for the offline benchmarks.
+
+Benchmarks run against a temporary UPLOAD_DIR and replace the external
+services (Gemini, Nominatim, PVGIS) with local stand-ins, so they never
+touch the network. Import this module BEFORE importing anything from `app`.
+
+Stand-ins: `install_fake_llm` (in-process Gemini model), `install_fake_http`
+(in-process httpx transports) and `FakeServiceServer` (a real local HTTP
+server the app reaches through NOMINATIM_URL / PVGIS_API_URL).
+"""
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+BENCH_UPLOAD_DIR = Path(tempfile.mkdtemp(prefix="greenloan-bench-"))
+os.environ["UPLOAD_DIR"] = str(BENCH_UPLOAD_DIR)
+
+import httpx  # noqa: E402
+
+TEST_DOCS_DIR = Path(__file__).resolve().parents[2] / "test_docs"
+
+CANNED_FACTS = [
+    {"field": "project_location_text", "value": "Warszawa, Polska", "unit": None, "confidence": 0.9,
+     "evidence": [{"page_no": 1, "snippet": "Lokalizacja: Warszawa"}]},
+    {"field": "declared_power_kwp", "value": 49.5, "unit": "kWp", "confidence": 0.95,
+     "evidence": [{"page_no": 1, "snippet": "Moc instalacji: 49,5 kWp"}]},
+    {"field": "system_type", "value": "rooftop", "unit": None, "confidence": 0.8,
+     "evidence": [{"page_no": 1, "snippet": "instalacja dachowa"}]},
+    {"field": "declared_yield_kwh_per_kwp", "value": 1050, "unit": "kWh/kWp", "confidence": 0.9,
+     "evidence": [{"page_no": 1, "snippet": "1050 kWh/kWp"}]},
+    {"field": "roof_area_m2", "value": 300, "unit": "m²", "confidence": 0.85,
+     "evidence": [{"page_no": 1, "snippet": "powierzchnia dachu 300 m²"}]},
+]
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeServiceError(Exception):
+    """Injected failure of a fake service call."""
+
+
+class FakeGenerativeModel:
+    """Blocking stand-in for genai.GenerativeModel (sleeps like a network call)."""
+    latency_s = 1.0
+    error_rate = 0.0
+    rng = random.Random(0)
+    calls = 0
+    errors = 0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def generate_content(self, contents, **kwargs):
+        time.sleep(self.latency_s)
+        FakeGenerativeModel.calls += 1
+        if self.rng.random() < self.error_rate:
+            FakeGenerativeModel.errors += 1
+            raise FakeServiceError("503 The model is overloaded (fake)")
+        return FakeResponse("```json\n" + json.dumps(CANNED_FACTS) + "\n```")
+
+
+def install_fake_llm(
+    latency_s: float = 1.0,
+    cache: bool = False,
+    model_cls=None,
+    rules: bool = False,
+    error_rate: float = 0.0,
+    seed: int = 0
+):
+    """
+    Route Gemini calls to FakeGenerativeModel. The response cache and the rule-based
+    fast path are off by default so every analysis pays the (fake) LLM latency.
+    `error_rate` is the fraction of calls that raise FakeServiceError.
+    """
+    from app import analysis
+    from app.pipeline import gemini_analyzer
+
+    analysis.EXTRACTION_RULES = "hybrid" if rules else "off"
+    FakeGenerativeModel.latency_s = latency_s
+    FakeGenerativeModel.error_rate = error_rate
+    FakeGenerativeModel.rng = random.Random(seed)
+    gemini_analyzer.GOOGLE_API_KEY = "bench"
+    gemini_analyzer.LLM_CACHE_ENABLED = cache
+    gemini_analyzer.genai.configure = lambda **kwargs: None
+    gemini_analyzer.genai.GenerativeModel = model_cls or FakeGenerativeModel
+    gemini_analyzer._model = None
+
+
+def nominatim_payload() -> list[dict]:
+    return [{
+        "lat": "52.2297", "lon": "21.0122", "type": "city",
+        "display_name": "Warszawa, Polska", "address": {"country_code": "pl"},
+    }]
+
+
+def pvgis_payload(peakpower: float) -> dict:
+    monthly = [w * peakpower for w in (30, 45, 80, 110, 130, 135, 140, 125, 90, 60, 35, 25)]
+    return {"outputs": {
+        "totals": {"fixed": {"E_y": sum(monthly)}},
+        "monthly": {"fixed": [{"month": i + 1, "E_m": m} for i, m in enumerate(monthly)]},
+    }}
+
+
+def _nominatim_handler(latency_s: float):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency_s)
+        return httpx.Response(200, json=nominatim_payload())
+    return handler
+
+
+def _pvgis_handler(latency_s: float):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency_s)
+        return httpx.Response(200, json=pvgis_payload(float(request.url.params.get("peakpower", 1))))
+    return handler
+
+
+def install_fake_http(nominatim_latency_s: float = 0.2, pvgis_latency_s: float = 0.5):
+    """Point the shared Nominatim/PVGIS clients at in-process mock transports."""
+    from app.pipeline import geocoding, pvgis
+
+    geocoding._client = httpx.AsyncClient(transport=httpx.MockTransport(_nominatim_handler(nominatim_latency_s)))
+    pvgis._client = httpx.AsyncClient(transport=httpx.MockTransport(_pvgis_handler(pvgis_latency_s)))
+
+
+class FakeServiceServer:
+    """
+    Local HTTP stand-in for Nominatim (`/search`) and PVGIS (`/PVcalc`), served
+    from a background thread. Each service has its own latency and error rate
+    (failed calls answer 503); request and error counts are kept per service.
+
+        with FakeServiceServer(latency_s={"pvgis": 0.5}) as fake:
+            fake.install()  # NOMINATIM_URL / PVGIS_API_URL -> this server
+    """
+    PATHS = {"/search": "nominatim", "/PVcalc": "pvgis"}
+
+    def __init__(self, latency_s: dict | None = None, error_rate: dict | None = None, seed: int = 0):
+        self.latency_s = {"nominatim": 0.2, "pvgis": 0.5, **(latency_s or {})}
+        self.error_rate = {"nominatim": 0.0, "pvgis": 0.0, **(error_rate or {})}
+        self.requests = {name: 0 for name in self.PATHS.values()}
+        self.errors = {name: 0 for name in self.PATHS.values()}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                service = fake.PATHS.get(url.path)
+                if service is None:
+                    self.send_error(404)
+                    return
+                time.sleep(fake.latency_s[service])
+                with fake._lock:
+                    fake.requests[service] += 1
+                    failed = fake._rng.random() < fake.error_rate[service]
+                    fake.errors[service] += failed
+                if failed:
+                    self.send_error(503)
+                    return
+                if service == "nominatim":
+                    payload = nominatim_payload()
+                else:
+                    payload = pvgis_payload(float(parse_qs(url.query).get("peakpower", ["1"])[0]))
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def install(self):
+        """Point the app's Nominatim/PVGIS clients at this server (real httpx clients, over TCP)."""
+        from app.pipeline import geocoding, pvgis
+
+        geocoding.NOMINATIM_URL = self.base_url + "/search"
+        pvgis.PVGIS_API_URL = self.base_url + "/PVcalc"
+        geocoding._client = None
+        pvgis._client = None
+
+    def stats(self) -> dict:
+        return {name: {"requests": self.requests[name], "errors": self.errors[name]} for name in self.requests}
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def make_large_pdf(page_count: int) -> bytes:
+    """Synthetic PDF: test_docs pages replicated up to `page_count` pages."""
+    import fitz
+
+    sources = [fitz.open(path) for path in sorted(TEST_DOCS_DIR.glob("*.pdf"))]
+    out = fitz.open()
+    i = 0
+    while out.page_count < page_count:
+        src = sources[i % len(sources)]
+        take = min(src.page_count, page_count - out.page_count)
+        out.insert_pdf(src, from_page=0, to_page=take - 1)
+        i += 1
+    data = out.tobytes()
+    out.close()
+    for src in sources:
+        src.close()
+    return data
+
+
+def _texts(pdf_path: str, page_nos: list[int]) -> list[str]:
+    """Process-pool worker: plain text of the given pages (1-based)."""
+    import fitz
+
+    with fitz.open(pdf_path) as pdf:
+        return [pdf[page_no - 1].get_text() for page_no in page_nos]
+
+
+def page_texts(pdf_path: Path, in_pool: bool = False) -> list[str]:
+    """Plain text of every page, split across the PDF process pool like ingest."""
+    from app.pipeline import pdf_processor
+
+    return pdf_processor._map_pages(pdf_path, in_pool, _texts)
+
+
+def _render_to_files(pdf_path: str, page_nos: list[int], out_dir: str, size: str) -> int:
+    """Process-pool worker: render pages into out_dir, return bytes written."""
+    import fitz
+    from app.pipeline import render
+
+    written = 0
+    with fitz.open(pdf_path) as pdf:
+        for page_no in page_nos:
+            if not 1 <= page_no <= pdf.page_count:
+                continue
+            data = render._encode_page(pdf[page_no - 1], size)
+            render._write_image(Path(out_dir) / f"{page_no:03d}-{size}{render.IMAGE_SUFFIX}", data)
+            written += len(data)
+    return written
+
+
+def render_pages(doc_id: str, page_nos: list[int], size: str | None = None) -> list[Path]:
+    """
+    Render (or fetch from the page cache) several pages: missing pages of a large
+    request are rendered in the PDF process pool first. Missing pages are skipped.
+    """
+    from app import metrics
+    from app.pipeline import pdf_processor, render
+
+    size = size or render.DEFAULT_PAGE_SIZE
+    missing = [n for n in page_nos if not render.page_image_path(doc_id, n, size).exists()]
+    pdf_path = pdf_processor.source_pdf_path(doc_id)
+    if pdf_path is not None and pdf_processor.use_process_pool(len(missing)):
+        out_dir = render.page_image_path(doc_id, 1).parent
+        out_dir.mkdir(parents=True, exist_ok=True)
+        pool = pdf_processor.get_process_pool()
+        with metrics.span("render.pages", size=size):
+            futures = [
+                pool.submit(_render_to_files, str(pdf_path), chunk, str(out_dir), size)
+                for chunk in pdf_processor.split_pages(missing, pdf_processor.PDF_WORKERS)
+            ]
+            render._account(sum(future.result() for future in futures))
+
+    paths = [render.render_page(doc_id, page_no, size) for page_no in page_nos]
+    return [path for path in paths if path is not None]
+
+
+class StageTimer:
+    """`on_stage` callback for run_analysis recording wall time per stage in milliseconds."""
+
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+        self._current: str | None = None
+        self._t0 = 0.0
+
+    def __call__(self, name: str):
+        self.finish()
+        self._current = name
+        self._t0 = time.perf_counter()
+
+    def finish(self):
+        if self._current is not None:
+            self.timings[self._current] = round((time.perf_counter() - self._t0) * 1000, 1)
+            self._current = None
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def summarize_ms(values: list[float]) -> dict:
+    """p50/p95/max summary of latencies given in seconds."""
+    return {
+        "n": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2) if values else 0.0,
+        "mean_ms": round(statistics.fmean(values) * 1000, 2) if values else 0.0,
+    }
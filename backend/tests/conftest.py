@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Keep app.config from creating ./uploads (must run before anything imports `app`)
+os.environ["UPLOAD_DIR"] = tempfile.mkdtemp(prefix="greenloan-test-")
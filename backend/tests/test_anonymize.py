@@ -0,0 +1,103 @@
+"""
+Single-scan anonymization against the legacy sequential re.sub passes.
+"""
+import random
+from pathlib import Path
+
+import pytest
+
+from app.pipeline import anonymize, pdf_processor
+from app.pipeline.anonymize import (
+    EMAIL_PATTERN, IBAN_PATTERN, PESEL_PATTERN, NIP_PATTERN, REGON_PATTERN, PHONE_PATTERN, NAME_PATTERN,
+)
+
+TEST_DOCS_DIR = Path(__file__).resolve().parents[2] / "test_docs"
+
+
+def legacy_anonymize_text(text: str) -> str:
+    """The original implementation: one full re.sub pass per pattern."""
+    result = EMAIL_PATTERN.sub('[EMAIL]', text)
+    result = IBAN_PATTERN.sub('[IBAN]', result)
+    result = PESEL_PATTERN.sub('[PESEL]', result)
+    result = NIP_PATTERN.sub('[NIP]', result)
+    result = REGON_PATTERN.sub('[REGON]', result)
+    result = PHONE_PATTERN.sub('[PHONE]', result)
+    return NAME_PATTERN.sub('[NAME]', result)
+
+
+EDGE_CASES = [
+    "",
+    "Brak danych osobowych. Moc 49,5 kWp, uzysk 1050 kWh/kWp.",
+    "Kontakt: jan.kowalski@firma.pl, tel. +48 601 234 567",
+    "PESEL 90010112345 NIP 1234567890 REGON 123456789 konto PL61 1090 1014 0000 0712 1981 2874",
+    "12345678901234 123456789012 12345678 1234567890a a123456789",
+    "Jan Kowalski KOWALSKI JAN Anna Nowak-Zielińska Łukasz Żółć",
+    "mail:a@b.pl Jan Kowalski+48601234567 KOWALSKI a@b.pl KOWALSKI",
+    "Jan\nKowalski\tANNA  NOWAK",
+    "601-234-567 (22) 123 45 67 601.234.567 +48601234567 48 601 234 567",
+    "[EMAIL] KOWALSKI [NAME] Jan [PHONE] Kowalski",
+    "x@y.com123456789 123456789@x.com 90010112345@firma.pl",
+    "DE89 3704 0044 0532 0130 00 GB29NWBK60161331926819 PL611090101400000712198128",
+    "Wykonawca: ABC SOLAR Sp. z o.o., ul. Słoneczna 15, 00-950 Warszawa",
+    "٠١٢٣٤٥٦٧٨٩٠ 1234567890١ jan@example.com.pl.",
+    "Jan Kowalski, Jan Kowalski; JAN KOWALSKI: jan@kowalski.pl",
+]
+
+_ALPHABET = (
+    ["Jan", "Kowalski", "ANNA", "NOWAK", "Łódź", "kWp", "PLN", "ul.", "tel.", "+48", "(22)", "@", ".pl",
+     "a@b.com", "x.y@firma.com.pl", "PL61", "1090", "[NAME]", "[", "]", "-", ".", ",", "\n", " ", "  ", "\t"]
+)
+
+
+def _random_text(rng: random.Random) -> str:
+    tokens = []
+    for _ in range(rng.randint(1, 40)):
+        r = rng.random()
+        if r < 0.35:
+            tokens.append("".join(rng.choice("0123456789") for _ in range(rng.randint(1, 14))))
+        elif r < 0.45:
+            tokens.append(rng.choice(" -.").join(
+                "".join(rng.choice("0123456789") for _ in range(rng.randint(2, 4))) for _ in range(rng.randint(2, 4))
+            ))
+        else:
+            tokens.append(rng.choice(_ALPHABET))
+        tokens.append(rng.choice(["", " ", " ", "\n", ", "]))
+    return "".join(tokens)
+
+
+def _check(text: str):
+    assert anonymize.anonymize_text(text) == legacy_anonymize_text(text)
+
+
+@pytest.mark.parametrize("text", EDGE_CASES)
+def test_matches_legacy_on_edge_cases(text):
+    _check(text)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_legacy_on_random_text(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        _check(_random_text(rng))
+
+
+def test_matches_legacy_on_test_docs():
+    pages = [p for path in sorted(TEST_DOCS_DIR.glob("*.pdf")) for p, _ in pdf_processor.extract_texts_and_words(path)]
+    assert pages
+    for page in pages:
+        _check(page)
+
+
+
+@pytest.mark.parametrize("text, expected", [
+    # A less specific match that starts first gives way to a more specific one inside it
+    ("Jan Kowalski@firma.pl", "Jan [EMAIL]"),
+    ("tel. 601 234 567123@x.pl", "tel. 601 234 [EMAIL]"),
+    # The same pattern continues right after its own replacement...
+    ("a@b.comx.y@firma.com.pl", "[EMAIL][EMAIL]"),
+    # ...while less specific ones see the placeholder's bracket
+    ("a@b.pl+48601234567", "[EMAIL]+[PESEL]"),
+])
+def test_precedence(text, expected):
+    assert anonymize.anonymize_text(text) == expected
+    _check(text)
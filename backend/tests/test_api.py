@@ -0,0 +1,35 @@
+import fitz
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.pipeline import render
+from app.pipeline.pdf_processor import process_pdf
+
+DOC_ID = "TEST-PAGES"
+
+
+@pytest.fixture(scope="module")
+def client():
+    with fitz.open() as pdf:
+        for i in range(2):
+            pdf.new_page().insert_text((72, 72), f"Page {i + 1}")
+        data = pdf.tobytes()
+    process_pdf(data, "test.pdf", doc_id=DOC_ID)
+    return TestClient(app)
+
+
+def test_get_page_revalidates_with_etag(client):
+    response = client.get(f"/api/page/{DOC_ID}/2?size=thumb")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == render.MEDIA_TYPE
+
+    etag = response.headers["etag"]
+    response = client.get(f"/api/page/{DOC_ID}/2?size=thumb", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize("path", [f"/api/page/{DOC_ID}/3", f"/api/page/{DOC_ID}/0", "/api/page/NO-SUCH-DOC/1"])
+def test_get_page_missing_is_404_even_with_matching_etag(client, path):
+    response = client.get(path, headers={"If-None-Match": "*"})
+    assert response.status_code == 404
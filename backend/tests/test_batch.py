@@ -0,0 +1,56 @@
+import asyncio
+import zipfile
+
+import pytest
+
+from app import batch
+from app.uploads import INCOMING_DIR, StoredUpload, incoming_path
+
+
+def _zip(tmp_path, members):
+    path = tmp_path / "docs.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return path
+
+
+def test_zip_members_need_the_pdf_signature(tmp_path):
+    before = set(INCOMING_DIR.glob("*")) if INCOMING_DIR.exists() else set()
+    path = _zip(tmp_path, {"a.pdf": b"%PDF-1.7\n" + b"x" * 2000, "b.pdf": b"MZ not a pdf"})
+
+    with pytest.raises(batch.BatchError, match="docs.zip/b.pdf: not a PDF file"):
+        batch._pdfs_from_zip("docs.zip", path, max_files=10, max_bytes=10**6)
+    assert set(INCOMING_DIR.glob("*")) == before  # a.pdf was extracted, then removed
+
+
+def test_zip_member_with_pdf_signature_is_extracted(tmp_path):
+    path = _zip(tmp_path, {"dir/a.pdf": b"%PDF-1.4\n%%EOF", "notes.txt": b"skip"})
+
+    pdfs = batch._pdfs_from_zip("docs.zip", path, max_files=10, max_bytes=10**6)
+    assert [name for name, _ in pdfs] == ["a.pdf"]
+    assert pdfs[0][1].path.read_bytes() == b"%PDF-1.4\n%%EOF"
+    batch._discard_all(pdfs)
+
+
+def test_failed_batch_is_not_left_running(monkeypatch):
+    async def analyze(entry, upload, force):
+        raise OSError("disk full")
+
+    runner = batch.BatchRunner()
+    monkeypatch.setattr(runner, "_analyze", analyze)
+    path = incoming_path()
+    path.write_bytes(b"%PDF-1.4")
+
+    async def run():
+        manifest = runner.start([("a.pdf", StoredUpload(path, "0" * 64, 8))])
+        await asyncio.gather(*runner._tasks)
+        return manifest.batch_id
+
+    batch_id = asyncio.run(run())
+    manifest = batch.BatchRunner.load(batch_id)
+    assert manifest.status == "FAILED"
+    assert manifest.documents[0].status == "FAILED"
+    assert manifest.finished_at is not None
+    assert runner.get(batch_id) is None
+    assert not path.exists()
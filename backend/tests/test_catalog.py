@@ -0,0 +1,65 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import catalog
+from app.schemas import AnalysisReport, DocumentMeta, ScoreCard
+
+CET = timezone(timedelta(hours=1))
+
+
+@pytest.fixture
+def fresh_catalog(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog, "CATALOG_PATH", tmp_path / "catalog.sqlite3")
+    monkeypatch.setattr(catalog, "_local", catalog.threading.local())
+    monkeypatch.setattr(catalog, "_initialized", False)
+
+
+def _report(doc_id: str, created_at: datetime) -> AnalysisReport:
+    return AnalysisReport(
+        document=DocumentMeta(doc_id=doc_id, filename=f"{doc_id}.pdf", sha256="0" * 64, pages=1, created_at=created_at),
+        page_info=[],
+        facts=[],
+        verifications=[],
+        red_flags=[],
+        scorecard=ScoreCard(evidence_coverage=0, consistency=0, feasibility=0, traffic_light="RED"),
+    )
+
+
+def _ids(**filters) -> list[str]:
+    return [item.doc_id for item in catalog.list_reports(filters, sort="created_at").items]
+
+
+def test_created_filters_compare_instants(fresh_catalog):
+    catalog.index_report(_report("A", datetime(2026, 3, 1, 12, 0, 0, tzinfo=timezone.utc)))
+    catalog.index_report(_report("B", datetime(2026, 3, 1, 12, 0, 0, 500, tzinfo=timezone.utc)))
+    catalog.index_report(_report("C", datetime(2026, 3, 1, 14, 30, tzinfo=CET)))  # 13:30 UTC
+
+    # isoformat() would compare "...12:00:00" with "...12:00:00.000500" and "+01:00" text
+    assert _ids(created_from=datetime(2026, 3, 1, 12, 0, 0, 1, tzinfo=timezone.utc)) == ["B", "C"]
+    assert _ids(created_to=datetime(2026, 3, 1, 13, 0, tzinfo=CET)) == ["A"]  # 12:00 UTC
+    assert _ids(created_to=datetime(2026, 3, 1, 14, 29, tzinfo=CET)) == ["A", "B"]
+    assert _ids(created_from=datetime(2026, 3, 1, 14, 0, tzinfo=CET)) == ["C"]
+
+
+def test_created_at_is_returned_as_utc(fresh_catalog):
+    created = datetime(2026, 3, 1, 14, 30, tzinfo=CET)
+    catalog.index_report(_report("A", created))
+    assert catalog.list_reports().items[0].created_at == created
+
+
+def test_old_rows_are_migrated(fresh_catalog):
+    conn = sqlite3.connect(catalog.CATALOG_PATH)
+    conn.execute("CREATE TABLE reports (doc_id TEXT PRIMARY KEY, sha256 TEXT NOT NULL, filename TEXT NOT NULL,"
+                 " created_at TEXT NOT NULL, traffic_light TEXT NOT NULL, evidence_coverage INTEGER NOT NULL,"
+                 " consistency INTEGER NOT NULL, feasibility INTEGER NOT NULL, country_code TEXT,"
+                 " power_kwp REAL, pvgis_delta_pct REAL)")
+    conn.execute("INSERT INTO reports VALUES ('OLD', '', 'old.pdf', '2026-03-01T12:00:00+00:00', 'RED', 0, 0, 0,"
+                 " NULL, NULL, NULL)")
+    conn.commit()
+    conn.close()
+
+    assert _ids(created_from=datetime(2026, 3, 1, 11, 59, tzinfo=timezone.utc)) == ["OLD"]
+    stored = catalog._conn().execute("SELECT created_at FROM reports").fetchone()[0]
+    assert stored == "2026-03-01T12:00:00.000000"
@@ -0,0 +1,138 @@
+import asyncio
+import json
+
+import pytest
+
+from app.pipeline import gemini_analyzer
+from app.pipeline.cache_store import SQLiteCache
+from app.schemas import Evidence, ExtractedFact
+
+ANSWER = json.dumps([{"field": "declared_power_kwp", "value": 49.5, "unit": "kWp", "confidence": 0.9,
+                      "evidence": [{"page_no": 1, "snippet": "49,5 kWp"}]}])
+
+
+def _page_per_chunk(pages, page_nos=None):
+    return [[(i + 1, text)] for i, text in enumerate(pages)]
+
+
+def _fact(field, value, confidence, page_no=1, snippet="s"):
+    return ExtractedFact(field=field, value=value, confidence=confidence,
+                         evidence=[Evidence(page_no=page_no, snippet=snippet)])
+
+
+def test_merge_facts_deduplicates_within_a_single_chunk():
+    merged = gemini_analyzer.merge_facts([[
+        _fact("declared_power_kwp", 49.5, 0.7, snippet="49,5 kWp"),
+        _fact("declared_power_kwp", 49.5, 0.9, page_no=2, snippet="moc 49.5 kWp"),
+    ]])
+    assert len(merged) == 1
+    assert merged[0].confidence == 0.9
+    assert [ev.snippet for ev in merged[0].evidence] == ["moc 49.5 kWp", "49,5 kWp"]
+
+
+def test_chunked_extraction_merges_surviving_chunks(monkeypatch):
+    async def extract_chunk(chunk, fields):
+        if chunk[0][0] == 2:
+            raise RuntimeError("quota exceeded")
+        return [_fact("declared_power_kwp", 10, 0.8, page_no=chunk[0][0])]
+
+    monkeypatch.setattr(gemini_analyzer, "_extract_chunk", extract_chunk)
+    monkeypatch.setattr(gemini_analyzer, "chunk_pages", _page_per_chunk)
+    facts = asyncio.run(gemini_analyzer._extract_chunked(["a", "b", "c"], None, None))
+    assert [(f.field, [ev.page_no for ev in f.evidence]) for f in facts] == [("declared_power_kwp", [1, 3])]
+
+
+def test_chunked_extraction_raises_when_every_chunk_fails(monkeypatch):
+    async def extract_chunk(chunk, fields):
+        raise RuntimeError("quota exceeded")
+
+    monkeypatch.setattr(gemini_analyzer, "_extract_chunk", extract_chunk)
+    monkeypatch.setattr(gemini_analyzer, "chunk_pages", _page_per_chunk)
+    with pytest.raises(RuntimeError, match="quota"):
+        asyncio.run(gemini_analyzer._extract_chunked(["a", "b"], None, None))
+
+
+class _Model:
+    def __init__(self, text: str):
+        self.text = text
+        self.calls = 0
+
+    def generate_content(self, contents):
+        self.calls += 1
+        return type("Response", (), {"text": self.text})()
+
+
+@pytest.fixture
+def llm(tmp_path, monkeypatch):
+    """Fake model behind a fresh response cache."""
+    model = _Model(ANSWER)
+    cache = SQLiteCache(tmp_path / "responses.sqlite3")
+    monkeypatch.setattr(gemini_analyzer, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(gemini_analyzer, "_get_cache", lambda: cache)
+    monkeypatch.setattr(gemini_analyzer, "_get_model", lambda: model)
+    return model, cache
+
+
+def test_cache_key_covers_content_kind_and_prompt_version(monkeypatch):
+    key = gemini_analyzer._cache_key("text", b"page one")
+    assert key == gemini_analyzer._cache_key("text", b"page one")
+    assert key != gemini_analyzer._cache_key("text", b"page two")
+    assert key != gemini_analyzer._cache_key(gemini_analyzer._kind("text", ["declared_power_kwp"]), b"page one")
+    assert key != gemini_analyzer._cache_key("image", b"page one")
+    # Parts are hashed separately: moving bytes between parts changes the key
+    assert gemini_analyzer._cache_key("image", b"ab", b"c") != gemini_analyzer._cache_key("image", b"a", b"bc")
+
+    monkeypatch.setattr(gemini_analyzer, "PROMPT_VERSION", "next")
+    assert key != gemini_analyzer._cache_key("text", b"page one")
+
+
+def test_repeated_prompt_is_answered_from_cache(llm):
+    model, cache = llm
+    key = gemini_analyzer._cache_key("text", b"page one")
+
+    first = asyncio.run(gemini_analyzer._generate_facts(key, "prompt", "test"))
+    second = asyncio.run(gemini_analyzer._generate_facts(key, "prompt", "test"))
+
+    assert model.calls == 1
+    assert first == second
+    assert first[0].value == 49.5
+    assert cache.hits == 1
+
+
+def test_unparseable_answer_is_not_cached(llm):
+    model, cache = llm
+    model.text = "Sorry, I cannot help with that."
+    key = gemini_analyzer._cache_key("text", b"page one")
+
+    assert asyncio.run(gemini_analyzer._generate_facts(key, "prompt", "test")) == []
+    assert asyncio.run(gemini_analyzer._generate_facts(key, "prompt", "test")) == []
+    assert model.calls == 2
+    assert len(cache) == 0
+
+
+def test_chunk_pages_packs_whole_pages_up_to_the_budget():
+    # Budget 10 tokens = 40 chars; pages are joined with "\n\n" (2 chars)
+    pages = ["a" * 19, "b" * 19, "c" * 19]
+    chunks = gemini_analyzer.chunk_pages(pages, max_tokens=10)
+    assert [[page_no for page_no, _ in chunk] for chunk in chunks] == [[1, 2], [3]]
+
+    exact = gemini_analyzer.chunk_pages(["a" * 20, "b" * 18], max_tokens=10)  # 20 + 2 + 18 == 40
+    assert len(exact) == 1
+    assert len(gemini_analyzer.chunk_pages(["a" * 20, "b" * 19], max_tokens=10)) == 2
+
+
+def test_chunk_pages_splits_large_pages_at_line_breaks():
+    page = "".join(f"line {i:02d} {'x' * 10}\n" for i in range(10))  # 10 lines of 19 chars
+    chunks = gemini_analyzer.chunk_pages(["intro", page], max_tokens=10, page_nos=[4, 7])
+
+    pieces = [piece for chunk in chunks for piece in chunk]
+    assert "".join(text for page_no, text in pieces if page_no == 7) == page  # nothing lost or reordered
+    assert all(text.endswith("\n") for page_no, text in pieces if page_no == 7)  # cut at line ends only
+    assert all(sum(len(t) for _, t in chunk) + 2 * (len(chunk) - 1) <= 40 for chunk in chunks)
+    assert pieces[0] == (4, "intro")
+
+
+def test_chunk_pages_cuts_a_line_longer_than_the_budget():
+    chunks = gemini_analyzer.chunk_pages(["y" * 100], max_tokens=10)
+    assert [len(text) for chunk in chunks for _, text in chunk] == [40, 40, 20]
+    assert {page_no for chunk in chunks for page_no, _ in chunk} == {1}
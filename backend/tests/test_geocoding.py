@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+
+from app.pipeline import cache_store, geocoding
+from app.pipeline.cache_store import MISSING, SQLiteCache
+
+
+@pytest.fixture
+def geocache(tmp_path, monkeypatch):
+    """Geocoding module pointed at an empty cache directory."""
+    monkeypatch.setattr(geocoding, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(geocoding, "LEGACY_CACHE_FILE", tmp_path / "nominatim_cache.json")
+    monkeypatch.setattr(geocoding, "_cache", None)
+    return tmp_path
+
+
+def _expires_at(cache: SQLiteCache, key: str) -> float | None:
+    return cache._conn().execute("SELECT expires_at FROM entries WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_legacy_json_cache_is_migrated_once(geocache):
+    found = {"lat": 52.23, "lon": 21.01, "display_name": "Warszawa", "country_code": "PL", "confidence": 0.7}
+    (geocache / "nominatim_cache.json").write_text(json.dumps({"found": found, "missing": None}), encoding="utf-8")
+
+    cache = geocoding._get_cache()
+
+    assert cache.get("found") == found
+    assert cache.get("missing") is None
+    assert _expires_at(cache, "found") is None
+    assert _expires_at(cache, "missing") is not None  # negative results expire
+    assert not (geocache / "nominatim_cache.json").exists()
+    assert (geocache / "nominatim_cache.json.migrated").exists()
+
+
+def test_unreadable_legacy_cache_is_left_in_place(geocache):
+    (geocache / "nominatim_cache.json").write_text("{not json", encoding="utf-8")
+
+    cache = geocoding._get_cache()
+
+    assert len(cache) == 0
+    assert (geocache / "nominatim_cache.json").exists()
+
+
+def test_negative_result_expires(tmp_path, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(cache_store.time, "time", lambda: now)
+    cache = SQLiteCache(tmp_path / "ttl.sqlite3")
+    cache.set("missing", None, ttl=60)
+    cache.set("found", {"lat": 1.0}, ttl=None)
+
+    now += 59
+    assert cache.get("missing") is None
+    now += 1
+    assert cache.get("missing") is MISSING  # expired in the in-process LRU
+    cache._memory.clear()
+    assert cache.get("missing") is MISSING  # and in the database
+    assert cache.get("found") == {"lat": 1.0}
+
+    cache.evict()
+    assert len(cache) == 1
+
+
+def test_geocode_caches_misses_with_negative_ttl(geocache, monkeypatch):
+    async def not_found(address):
+        return None
+
+    monkeypatch.setattr(geocoding, "_try_geocode", not_found)
+    address = "Nieistniejaca 1, Warszawa"
+
+    assert asyncio.run(geocoding.geocode(address)) is None
+
+    cache = geocoding._get_cache()
+    key = geocoding._get_cache_key(address)
+    assert cache.get(key) is None
+    expires_in = _expires_at(cache, key) - cache_store.time.time()
+    assert geocoding.NEGATIVE_TTL - 60 < expires_in <= geocoding.NEGATIVE_TTL
+
+
+def test_concurrent_lookups_of_one_address_share_a_request(geocache, monkeypatch):
+    calls = []
+
+    async def lookup(address):
+        calls.append(address)
+        await asyncio.sleep(0.05)
+        return {"lat": "52.23", "lon": "21.01", "display_name": "Warszawa", "type": "city",
+                "address": {"country_code": "pl"}}
+
+    monkeypatch.setattr(geocoding, "_try_geocode", lookup)
+
+    async def run():
+        return await asyncio.gather(
+            geocoding.geocode("Marszalkowska 1, Warszawa"),
+            geocoding.geocode("  marszalkowska 1, warszawa"),
+            geocoding.geocode("MARSZALKOWSKA 1, WARSZAWA"),
+        )
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert all(r is not None and (r.lat, r.country_code) == (52.23, "PL") for r in results)
+    assert geocoding._inflight == {}
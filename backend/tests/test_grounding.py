@@ -0,0 +1,52 @@
+from app.config import GROUNDING_PENALTY, UPLOAD_DIR
+from app.pipeline import grounding
+from app.pipeline.word_index import WordIndex, save_index
+from app.schemas import Evidence, ExtractedFact
+from tests.test_word_index import PAGE_1, PAGE_2, _page
+
+
+def _index() -> WordIndex:
+    return WordIndex(WordIndex.build([_page(PAGE_1), _page(PAGE_2)]))
+
+
+def test_evidence_on_cited_page_is_verified():
+    evidence = grounding.ground_evidence(_index(), Evidence(page_no=1, snippet="moc instalacji 49,5 kWp"))
+
+    assert (evidence.page_no, evidence.grounding, evidence.grounding_score) == (1, "VERIFIED", 1.0)
+    assert evidence.cited_page_no is None
+
+
+def test_evidence_on_another_page_is_relocated():
+    evidence = grounding.ground_evidence(_index(), Evidence(page_no=1, snippet="w ciagu 30 dni od podpisania"))
+
+    assert (evidence.page_no, evidence.grounding, evidence.cited_page_no) == (2, "RELOCATED", 1)
+
+
+def test_missing_evidence_is_not_found():
+    evidence = grounding.ground_evidence(_index(), Evidence(page_no=2, snippet="pompa ciepla gruntowa 12 kW"))
+
+    assert (evidence.page_no, evidence.grounding, evidence.grounding_score) == (2, "NOT_FOUND", 0.0)
+
+
+def test_evidence_without_text_to_check_is_left_alone():
+    index = _index()
+    for evidence in (Evidence(page_no=3, snippet="moc instalacji"), Evidence(page_no=1, snippet="  ")):
+        assert grounding.ground_evidence(index, evidence) is evidence
+
+
+def test_ground_facts_penalizes_facts_with_no_evidence_found():
+    doc_dir = UPLOAD_DIR / "GROUNDING-DOC"
+    doc_dir.mkdir(parents=True, exist_ok=True)
+    save_index(doc_dir, [_page(PAGE_1), _page(PAGE_2)])
+    found = ExtractedFact(field="pv_power_kwp", value=49.5, confidence=0.9,
+                          evidence=[Evidence(page_no=1, snippet="moc instalacji 49,5 kWp")])
+    missing = ExtractedFact(field="capex_total", value=250000, confidence=0.9,
+                            evidence=[Evidence(page_no=1, snippet="koszt calkowity 250 000 PLN brutto")])
+
+    grounded = grounding.ground_facts("GROUNDING-DOC", [found, missing])
+
+    assert grounded[0].confidence == 0.9
+    assert grounded[0].evidence[0].grounding == "VERIFIED"
+    assert grounded[1].confidence == round(0.9 * GROUNDING_PENALTY, 2)
+    assert grounded[1].evidence[0].grounding == "NOT_FOUND"
+    assert grounding.ground_facts("NO-SUCH-DOC", [found]) == [found]
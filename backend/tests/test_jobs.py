@@ -0,0 +1,79 @@
+import asyncio
+import hashlib
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app import artifacts, jobs, reports
+from app.config import UPLOAD_DIR
+from app.schemas import AnalysisReport, DocumentMeta, ScoreCard
+from app.uploads import StoredUpload, incoming_path
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    """Doc ids analyzed; the fake analysis only saves an empty report."""
+    calls = []
+
+    async def fake_run_analysis(path, filename, doc_id, on_stage, ingest_in_pool, sha256):
+        calls.append(doc_id)
+        await asyncio.sleep(0.01)
+        (UPLOAD_DIR / doc_id).mkdir(parents=True, exist_ok=True)
+        reports.save_report(AnalysisReport(
+            document=DocumentMeta(doc_id=doc_id, filename=filename, sha256=sha256, pages=1, created_at=datetime.now()),
+            page_info=[], facts=[], verifications=[], red_flags=[],
+            scorecard=ScoreCard(evidence_coverage=0, consistency=0, feasibility=0, traffic_light="RED")
+        ))
+
+    monkeypatch.setattr(jobs, "run_analysis", fake_run_analysis)
+    return calls
+
+
+def _upload(data: bytes) -> StoredUpload:
+    path = incoming_path()
+    path.write_bytes(data)
+    return StoredUpload(path, hashlib.sha256(data).hexdigest(), len(data))
+
+
+def test_identical_upload_joins_the_inflight_job(runs):
+    data = uuid.uuid4().bytes
+
+    async def run():
+        manager = jobs.JobManager(workers=1)
+        first = await manager.submit(_upload(data), "a.pdf")
+        second_upload = _upload(data)
+        second = await manager.submit(second_upload, "a.pdf")
+        await manager.wait(first.job_id)
+        await manager.shutdown()
+        return first, second, second_upload
+
+    first, second, second_upload = asyncio.run(run())
+
+    assert not first.reused
+    assert second.reused and second.job_id == first.job_id
+    assert not second_upload.path.exists()  # the duplicate upload is dropped
+    assert runs == [first.job_id]
+
+
+def test_finished_analysis_is_reused_unless_forced(runs):
+    data = uuid.uuid4().bytes
+    sha256 = hashlib.sha256(data).hexdigest()
+
+    async def run():
+        manager = jobs.JobManager(workers=1)
+        first = await manager.submit(_upload(data), "a.pdf")
+        await manager.wait(first.job_id)
+        reused = await jobs.JobManager(workers=1).submit(_upload(data), "b.pdf")  # e.g. after a restart
+        forced = await manager.submit(_upload(data), "b.pdf", force=True)
+        await manager.wait(forced.job_id)
+        await manager.shutdown()
+        return first, reused, forced
+
+    first, reused, forced = asyncio.run(run())
+
+    assert reused.reused and reused.state == "DONE"
+    assert (reused.doc_id, reused.filename) == (first.doc_id, "a.pdf")
+    assert not forced.reused and forced.job_id != first.job_id
+    assert runs == [first.job_id, forced.job_id]
+    assert artifacts.lookup(sha256) == forced.doc_id  # the latest analysis wins
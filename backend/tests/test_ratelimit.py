@@ -0,0 +1,46 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from app.pipeline import ratelimit
+from app.pipeline.ratelimit import SharedTokenBucket
+
+
+def _send_time(path) -> float:
+    """When a request reserved now (in this process) may be sent."""
+    wait = SharedTokenBucket(path, rate=1.0).reserve()
+    return time.time() + wait
+
+
+def test_bucket_refills_at_rate(tmp_path, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(ratelimit.time, "time", lambda: now)
+    bucket = SharedTokenBucket(tmp_path / "bucket.state", rate=2.0)
+
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.5  # burst of one: the next token comes in 1 / rate
+    assert bucket.reserve() == 1.0
+    now += 10
+    assert bucket.reserve() == 0.0  # refilled, but never above the burst
+    assert bucket.reserve() == 0.5
+
+
+def test_buckets_on_one_file_share_the_budget(tmp_path):
+    path = tmp_path / "bucket.state"
+    first, second = SharedTokenBucket(path, rate=1.0), SharedTokenBucket(path, rate=1.0)
+
+    assert first.reserve() == 0.0
+    assert second.reserve() == pytest.approx(1.0, abs=0.05)
+    assert first.reserve() == pytest.approx(2.0, abs=0.05)
+
+
+@pytest.mark.skipif(ratelimit.fcntl is None, reason="per-process bucket without fcntl")
+def test_processes_share_the_budget(tmp_path):
+    path = tmp_path / "bucket.state"
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        send_times = sorted(pool.map(_send_time, [path] * 4))
+
+    # Each reservation is queued behind the previous one, whichever process made it
+    gaps = [b - a for a, b in zip(send_times, send_times[1:])]
+    assert gaps == pytest.approx([1.0, 1.0, 1.0], abs=0.05)
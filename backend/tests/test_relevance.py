@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pytest
+
+from app.pipeline import pdf_processor
+from app.pipeline.relevance import score_page, select_pages
+from app.pipeline.rule_extractor import extract_facts
+from app.schemas import PageInfo
+
+TEST_DOCS_DIR = Path(__file__).resolve().parents[2] / "test_docs"
+
+
+@pytest.fixture(scope="module")
+def kosztorys() -> tuple[list[PageInfo], list[str]]:
+    texts = [text for text, _ in pdf_processor.extract_texts_and_words(TEST_DOCS_DIR / "kosztorys_warsaw.pdf")]
+    return [
+        PageInfo(page_no=i, has_text=bool(text.strip()), char_count=len(text), relevance=score_page(text))
+        for i, text in enumerate(texts, 1)
+    ], texts
+
+
+def test_pages_with_facts_outrank_pages_without(kosztorys):
+    pages, texts = kosztorys
+    with_facts = {p.page_no for p in pages if extract_facts([texts[p.page_no - 1]], [p.page_no])}
+    assert with_facts == {1, 2, 4, 5}
+
+    ranked = [p.page_no for p in sorted(pages, key=lambda p: -p.relevance)]
+    assert set(ranked[:len(with_facts)]) == with_facts
+
+
+def test_top_n_keeps_the_summary_pages_in_document_order(kosztorys):
+    pages, _ = kosztorys
+    selected = select_pages(pages, top_n=3, min_score=1000)
+    assert [p.page_no for p in selected] == [1, 2, 5]
+
+
+def test_min_score_adds_pages_beyond_top_n(kosztorys):
+    pages, _ = kosztorys
+    selected = select_pages(pages, top_n=1, min_score=10)
+    assert [p.page_no for p in selected] == [1, 2, 4, 5]
+
+
+def test_offer_page_scores_highest():
+    text = pdf_processor.extract_texts_and_words(TEST_DOCS_DIR / "pv_offer_demo_yellow.pdf")[0][0]
+    assert score_page(text) > 50
+
+
+def test_short_pages_do_not_dominate():
+    assert score_page("") == 0.0
+    assert score_page("   \n") == 0.0
+    # One hit on a near-empty page is scored as if the page had MIN_PAGE_CHARS
+    assert score_page("Moc: 5 kWp") < 20
+
+
+def test_filtering_disabled_or_not_needed(kosztorys):
+    pages, _ = kosztorys
+    assert select_pages(pages, top_n=0) == pages
+    assert select_pages(pages, top_n=len(pages)) == pages
@@ -0,0 +1,49 @@
+import os
+import time
+
+import fitz
+
+from app.pipeline import render
+from app.pipeline.pdf_processor import process_pdf
+
+
+def _image(doc_id: str, page_no: int, size: int, age_s: float):
+    path = render.page_image_path(doc_id, page_no, "thumb")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    mtime = time.time() - age_s
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_eviction_spares_recently_used_images(monkeypatch):
+    monkeypatch.setattr(render, "RENDER_CACHE_MAX_MB", 1)
+    monkeypatch.setattr(render, "_cache_bytes", None)
+    mb = 1024 * 1024
+    old = _image("EVICT", 1, mb // 2, age_s=3600)
+    older = _image("EVICT", 2, mb // 2, age_s=7200)
+    fresh = _image("EVICT", 3, mb // 2, age_s=1)
+    fresh2 = _image("EVICT", 4, mb // 2, age_s=0)
+
+    render._account(0)
+
+    assert not older.exists() and not old.exists()
+    assert fresh.exists() and fresh2.exists()  # over budget, but possibly being served
+
+
+def test_document_info_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(render, "DOC_INFO_CACHE_SIZE", 2)
+    monkeypatch.setattr(render, "_doc_info", render.OrderedDict())
+    with fitz.open() as pdf:
+        pdf.new_page()
+        data = pdf.tobytes()
+    for doc_id in ("LRU-A", "LRU-B", "LRU-C"):
+        process_pdf(data, "test.pdf", doc_id=doc_id)
+
+    render.document_info("LRU-A")
+    render.document_info("LRU-B")
+    render.document_info("LRU-A")  # hit: A becomes the most recent
+    render.document_info("LRU-C")
+
+    assert list(render._doc_info) == ["LRU-A", "LRU-C"]
+    assert render.document_info("LRU-B")[1] == 1  # evicted entries are simply read again
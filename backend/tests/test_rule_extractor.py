@@ -0,0 +1,49 @@
+import pytest
+
+from app.pipeline.rule_extractor import extract_facts, parse_number
+
+
+@pytest.mark.parametrize("text, kwargs, expected", [
+    ("49,5", {}, 49.5),
+    ("49.5", {}, 49.5),
+    ("1.050,5", {}, 1050.5),
+    ("1,234.5", {}, 1234.5),
+    ("195 000,00", {"unit_context": True}, 195000.0),
+    ("1 234 567", {}, 1234567.0),
+    ("1.234.567", {}, 1234567.0),
+    # A single group is only a thousands group with context
+    ("12.500", {}, 12.5),
+    ("12.500", {"unit_context": True}, 12.5),  # e.g. MWh may have three decimals
+    ("12.500", {"unit_context": True, "integral": True}, 12500.0),  # e.g. PLN never does
+    ("1,050", {"integral": True}, 1050.0),
+    ("0.500", {"integral": True}, 0.5),
+    ("1 050", {}, 1.0),  # the space ends the number without a unit
+    ("1 050", {"unit_context": True}, 1050.0),
+    ("1 050", {"unit_context": True}, 1050.0),
+    ("2024 100", {"unit_context": True}, 2024.0),  # not a thousands group: four leading digits
+    ("abc", {}, None),
+])
+def test_parse_number(text, kwargs, expected):
+    assert parse_number(text, **kwargs) == expected
+
+
+def _facts(text: str) -> dict:
+    return {f.field: f.value for f in extract_facts([text])}
+
+
+def test_three_decimal_energy_is_not_multiplied():
+    assert _facts("Roczna produkcja energii: 12.500 MWh")["declared_annual_energy_mwh"] == 12.5
+
+
+def test_currency_amount_with_dot_grouping():
+    assert _facts("Koszt całkowity: 12.500 PLN netto")["capex_total"] == 12500
+
+
+def test_year_is_not_joined_with_the_amount():
+    assert _facts("Wartość inwestycji w 2024 100 000 PLN")["capex_total"] == 100000
+
+
+def test_space_grouped_yield_and_power():
+    facts = _facts("Moc instalacji: 1 050 kWp, uzysk 1.020 kWh/kWp")
+    assert facts["declared_power_kwp"] == 1050
+    assert facts["declared_yield_kwh_per_kwp"] == 1020
@@ -0,0 +1,47 @@
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app import uploads
+
+LIMIT = 1024
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(uploads.ContentLengthLimit, paths={"/upload"}, max_bytes=LIMIT)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    return app
+
+
+def _multipart(size: int) -> tuple[bytes, dict]:
+    body = (
+        b'--b\r\nContent-Disposition: form-data; name="file"; filename="a.pdf"\r\n'
+        b"Content-Type: application/pdf\r\n\r\n" + b"x" * size + b"\r\n--b--\r\n"
+    )
+    return body, {"content-type": "multipart/form-data; boundary=b"}
+
+
+def test_declared_length_over_limit_is_refused():
+    body, headers = _multipart(LIMIT + uploads.UPLOAD_OVERHEAD_BYTES + 1)
+    response = TestClient(_app()).post("/upload", content=body, headers=headers)
+    assert response.status_code == 413
+
+
+def test_chunked_body_is_counted():
+    body, headers = _multipart(LIMIT + uploads.UPLOAD_OVERHEAD_BYTES + 1)
+    chunks = (body[i:i + 4096] for i in range(0, len(body), 4096))  # no Content-Length
+    response = TestClient(_app()).post("/upload", content=chunks, headers=headers)
+    assert response.status_code == 413
+    assert response.json()["detail"].startswith("File too large")
+
+
+def test_body_within_limit_passes():
+    body, headers = _multipart(LIMIT)
+    chunks = (body[i:i + 256] for i in range(0, len(body), 256))
+    response = TestClient(_app()).post("/upload", content=chunks, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"size": LIMIT}
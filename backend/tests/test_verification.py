@@ -0,0 +1,20 @@
+import pytest
+
+from app.schemas import ExtractedFact
+from app.pipeline.verification import FactIndex
+
+
+@pytest.mark.parametrize("value, expected", [
+    (49.5, 49.5),
+    ("49,5", 49.5),
+    ("1 050", 1050.0),
+    ("1 050 kWh/kWp", 1050.0),
+    ("1 234,5 kWp", 1234.5),
+    ("195 000 PLN", 195000.0),
+    ("1.234.567,89 zł", 1234567.89),
+    ("approx. 300 m²", 300.0),
+    ("n/a", None),
+])
+def test_number_parses_grouped_thousands(value, expected):
+    index = FactIndex([ExtractedFact(field="x", value=value, confidence=0.9)])
+    assert index.number("x") == expected
@@ -0,0 +1,76 @@
+import numpy as np
+
+from app.config import UPLOAD_DIR
+from app.pipeline import word_index
+from app.pipeline.word_index import PageWords, WordIndex, _align, save_index, snippet_tokens
+
+PAGE_1 = "Oferta dla klienta Jan Kowalski moc instalacji 49,5 kWp cena netto 195 000 PLN".split()
+PAGE_2 = "Harmonogram montazu instalacja zostanie wykonana w ciagu 30 dni od podpisania umowy".split()
+
+
+def _page(words: list[str], per_line: int = 5) -> PageWords:
+    """Words laid out left to right, `per_line` words per line, 20 pt apart."""
+    tokens, boxes, lines = [], [], []
+    for i, word in enumerate(words):
+        token = word_index.normalize_word(word)
+        if tokens and lines[-1] == i // per_line and word_index._joins_number(tokens[-1], token):
+            tokens[-1] += token
+            continue
+        x, y = 50 + 60 * (i % per_line), 100 + 20 * (i // per_line)
+        tokens.append(token)
+        boxes.append((x, y, x + 50, y + 12))
+        lines.append(i // per_line)
+    return PageWords(np.array(boxes, np.float32), np.array(lines, np.int32), tokens, (595.0, 842.0))
+
+
+def _index() -> WordIndex:
+    return WordIndex(WordIndex.build([_page(PAGE_1), _page(PAGE_2)]))
+
+
+def test_snippet_tokens_normalize_and_keep_placeholders():
+    assert snippet_tokens("Moc: 49,5 kWp, cena 195 000 [NAME]") == ["moc", "495", "kwp", "cena", "195000", None]
+
+
+def test_align_finds_best_stretch_with_free_ends():
+    assert _align([3, 4, 5], [1, 2, 3, 4, 5, 6]) == (0, 2, 5)
+    assert _align([3, None, 5], [1, 2, 3, 9, 5, 6]) == (0, 2, 5)  # None matches any word
+    assert _align([3, 4, 5], [1, 3, 9, 5, 6]) == (1, 1, 4)  # one substituted word
+    assert _align([7, 8], []) == (2, 0, 0)
+
+
+def test_locate_exact_snippet_returns_page_and_line_boxes():
+    matches = _index().locate("Jan Kowalski moc instalacji")
+
+    assert len(matches) == 1
+    match = matches[0]
+    assert (match.page_no, match.score) == (1, 1.0)
+    assert (match.page_width, match.page_height) == (595.0, 842.0)
+    # Words 3-6 of the page span two lines: one merged box per line
+    assert match.boxes == [[230.0, 100.0, 340.0, 112.0], [50.0, 120.0, 160.0, 132.0]]
+
+
+def test_locate_tolerates_placeholders_and_edits():
+    index = _index()
+
+    placeholder = index.locate("Oferta dla klienta [NAME] [NAME] moc")
+    assert [(m.page_no, m.score) for m in placeholder] == [(1, 1.0)]
+
+    edited = index.locate("instalacja zostanie wykonana w ciagu 60 dni")
+    assert edited[0].page_no == 2
+    assert edited[0].score == round(1 - 1 / 7, 3)
+
+
+def test_locate_rejects_unrelated_text():
+    assert _index().locate("pompa ciepla gruntowa o mocy 12 kW") == []
+
+
+def test_locate_by_doc_id_uses_saved_index():
+    doc_dir = UPLOAD_DIR / "WORDS-DOC"
+    doc_dir.mkdir(parents=True, exist_ok=True)
+    save_index(doc_dir, [_page(PAGE_1), _page(PAGE_2)])
+    word_index._cache.clear()  # force a load from words.npz
+
+    matches = word_index.locate("WORDS-DOC", "30 dni od podpisania umowy")
+
+    assert [m.page_no for m in matches] == [2]
+    assert word_index.locate("NO-SUCH-DOC", "30 dni") is None
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from app.pipeline import yield_grid
+
+
+def test_build_grid_ignores_missing_monthly_values():
+    samples = [
+        (52.0, 21.0, {"kwh_per_kwp": 1000.0, "monthly_kwh_per_kwp": [100.0] * 12, "optimal_angle": 37.0}),
+        (52.0, 21.5, {"kwh_per_kwp": 1100.0}),  # no monthly profile
+    ]
+    grid = yield_grid.build_grid(samples, step=0.25, radius=1.0)
+    i = round((52.0 - yield_grid.LAT_MIN) / 0.25)
+    j = round((21.25 - yield_grid.LON_MIN) / 0.25)  # halfway between the samples
+
+    assert grid[i, j, 0] == np.float32(1050.0)
+    assert np.allclose(grid[i, j, 1:13], 100.0)  # not pulled towards 0 by the missing profile
+    assert np.isnan(grid[0, 0]).all()  # out of range
+
+
+def test_build_grid_channel_without_any_sample_stays_nan():
+    grid = yield_grid.build_grid([(52.0, 21.0, {"kwh_per_kwp": 1000.0})], step=0.25, radius=1.0)
+    i = round((52.0 - yield_grid.LAT_MIN) / 0.25)
+    j = round((21.0 - yield_grid.LON_MIN) / 0.25)
+
+    assert grid[i, j, 0] == np.float32(1000.0)
+    assert np.isnan(grid[i, j, 1:13]).all()
+
+
+def test_typical_estimate_uses_country_range():
+    assert yield_grid.typical_estimate("PL", 10).kwh_per_kwp == 1025.0
+    assert yield_grid.typical_estimate("PL", 10).annual_kwh == 10250.0
+    assert yield_grid.typical_estimate("", 1).kwh_per_kwp == 1150.0  # European default
+
+
+@pytest.fixture
+def small_grid(tmp_path, monkeypatch):
+    """1-degree grid with annual yield 1000 + 10*row + col; node (2, 3) missing."""
+    monkeypatch.setattr(yield_grid, "YIELD_GRID_PATH", tmp_path / "grid.npy")
+    n_lat = int(yield_grid.LAT_MAX - yield_grid.LAT_MIN) + 1
+    n_lon = int(yield_grid.LON_MAX - yield_grid.LON_MIN) + 1
+    rows, cols = np.meshgrid(np.arange(n_lat), np.arange(n_lon), indexing="ij")
+    grid = np.zeros((n_lat, n_lon, yield_grid.CHANNELS), dtype=np.float32)
+    grid[:, :, 0] = 1000 + 10 * rows + cols
+    grid[2, 3] = np.nan
+    yield_grid.save_grid(grid, step=1.0, source="test", n_samples=0)
+    yield grid
+    yield_grid.reload()
+
+
+def _latlon(row, col):
+    return yield_grid.LAT_MIN + row, yield_grid.LON_MIN + col
+
+
+def test_interpolate_inside_cell_is_bilinear(small_grid):
+    values = yield_grid.interpolate(*_latlon(5.25, 7.5))
+    assert values[0] == pytest.approx(1000 + 52.5 + 7.5)
+
+
+def test_interpolate_on_node_and_grid_edge(small_grid):
+    n_lat, n_lon = small_grid.shape[:2]
+    assert yield_grid.interpolate(*_latlon(4, 6))[0] == pytest.approx(1046)
+    # The last row/column is reachable and uses the cell before it
+    last = yield_grid.interpolate(*_latlon(n_lat - 1, n_lon - 1))
+    assert last[0] == pytest.approx(1000 + 10 * (n_lat - 1) + n_lon - 1)
+
+
+def test_interpolate_outside_coverage(small_grid):
+    assert yield_grid.interpolate(yield_grid.LAT_MIN - 0.01, 10.0) is None
+    assert yield_grid.interpolate(50.0, yield_grid.LON_MAX + 0.01) is None
+    assert yield_grid.estimate(yield_grid.LAT_MAX + 1, 10.0, 5.0) is None
+
+
+def test_interpolate_renormalizes_around_missing_node(small_grid):
+    # Centre of the cell (2..3, 3..4): (2, 3) is NaN, the other three share its weight
+    values = yield_grid.interpolate(*_latlon(2.5, 3.5))
+    assert values[0] == pytest.approx((1024 + 1033 + 1034) / 3)
+    assert not np.isnan(values).any()
+    # On the missing node itself only zero-weight neighbours remain
+    assert yield_grid.interpolate(*_latlon(2, 3)) is None
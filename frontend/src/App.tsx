@@ -1,6 +1,6 @@
 import { useState } from 'react'
 import { Upload, FileText, Loader2 } from 'lucide-react'
-import type { AnalysisReport } from './types'
+import type { AnalysisReport, JobStatus } from './types'
 import { ScoreCardPanel } from './components/ScoreCard'
 import { FactsTable } from './components/FactsTable'
 import { RedFlagsPanel } from './components/RedFlags'
@@ -13,6 +13,14 @@ export default function App() {
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState<string | null>(null)
   const [selectedPage, setSelectedPage] = useState<number | null>(null)
+  const [selectedSnippet, setSelectedSnippet] = useState<string | null>(null)
+  const [job, setJob] = useState<JobStatus | null>(null)
+
+  // Evidence links pass their snippet so the viewer can highlight it
+  const openPage = (page: number, snippet?: string) => {
+    setSelectedPage(page)
+    setSelectedSnippet(snippet ?? null)
+  }
 
   const handleUpload = async (e: React.ChangeEvent<HTMLInputElement>) => {
     const file = e.target.files?.[0]
@@ -26,7 +34,7 @@ export default function App() {
     formData.append('file', file)
 
     try {
-      const res = await fetch(`${API_BASE}/api/analyze`, {
+      const res = await fetch(`${API_BASE}/api/jobs`, {
         method: 'POST',
         body: formData,
       })
@@ -35,15 +43,38 @@ export default function App() {
         throw new Error(await res.text())
       }
 
-      const data = await res.json()
-      setReport(data)
+      // Poll the job until the report is ready
+      let status: JobStatus = await res.json()
+      setJob(status)
+      while (status.state === 'QUEUED' || status.state === 'RUNNING') {
+        await new Promise(resolve => setTimeout(resolve, 1000))
+        const poll = await fetch(`${API_BASE}/api/jobs/${status.job_id}`)
+        if (!poll.ok) {
+          throw new Error(await poll.text())
+        }
+        status = await poll.json()
+        setJob(status)
+      }
+
+      if (status.state !== 'DONE' || !status.report_url) {
+        throw new Error(status.error || 'Analysis failed')
+      }
+
+      const reportRes = await fetch(`${API_BASE}${status.report_url}`)
+      if (!reportRes.ok) {
+        throw new Error(await reportRes.text())
+      }
+      setReport(await reportRes.json())
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Upload failed')
     } finally {
       setLoading(false)
+      setJob(null)
     }
   }
 
+  const runningStage = job?.stages.find(s => s.status === 'RUNNING')
+
   return (
     <div className="min-h-screen bg-gradient-to-br from-green-50 to-emerald-100">
       {/* Header */}
@@ -82,7 +113,13 @@ export default function App() {
           <div className="bg-white rounded-xl shadow-lg p-12 max-w-xl mx-auto text-center">
             <Loader2 className="w-12 h-12 text-green-500 animate-spin mx-auto mb-4" />
             <p className="text-lg font-medium text-gray-700">Analyzing document...</p>
-            <p className="text-sm text-gray-500 mt-2">Text extraction, OCR, data verification</p>
+            <p className="text-sm text-gray-500 mt-2">
+              {job?.state === 'QUEUED' && job.queue_position
+                ? `Queued (position ${job.queue_position})`
+                : runningStage
+                  ? `Stage: ${runningStage.name}`
+                  : 'Text extraction, OCR, data verification'}
+            </p>
           </div>
         )}
 
@@ -117,15 +154,15 @@ export default function App() {
             <ScoreCardPanel scorecard={report.scorecard} />
 
             {/* PVGIS Panel */}
-            <PVGISPanel verifications={report.verifications} onPageClick={setSelectedPage} />
+            <PVGISPanel verifications={report.verifications} onPageClick={openPage} />
 
             {/* Main content grid */}
             <div className="grid grid-cols-1 lg:grid-cols-2 gap-6">
               {/* Facts */}
-              <FactsTable facts={report.facts} onPageClick={setSelectedPage} />
+              <FactsTable facts={report.facts} onPageClick={openPage} />
 
               {/* Red Flags */}
-              <RedFlagsPanel flags={report.red_flags} onPageClick={setSelectedPage} />
+              <RedFlagsPanel flags={report.red_flags} onPageClick={openPage} />
             </div>
 
             {/* Page Viewer */}
@@ -134,6 +171,7 @@ export default function App() {
                 docId={report.document.doc_id}
                 pageNo={selectedPage}
                 totalPages={report.document.pages}
+                snippet={selectedSnippet}
                 onClose={() => setSelectedPage(null)}
                 onNavigate={setSelectedPage}
               />
@@ -3,7 +3,7 @@ import type { ExtractedFact } from '../types'
 
 interface Props {
   facts: ExtractedFact[]
-  onPageClick: (page: number) => void
+  onPageClick: (page: number, snippet?: string) => void
 }
 
 const FIELD_LABELS: Record<string, string> = {
@@ -54,6 +54,11 @@ export function FactsTable({ facts, onPageClick }: Props) {
                 </div>
               </div>
               <div className="flex items-center gap-2">
+                {fact.source === 'rules' && (
+                  <span className="text-xs px-2 py-1 rounded bg-gray-200 text-gray-600" title="Extracted by local rules (no AI call)">
+                    rules
+                  </span>
+                )}
                 <span className={`text-xs px-2 py-1 rounded ${
                   fact.confidence >= 0.8 ? 'bg-green-100 text-green-700' :
                   fact.confidence >= 0.6 ? 'bg-yellow-100 text-yellow-700' :
@@ -64,8 +69,17 @@ export function FactsTable({ facts, onPageClick }: Props) {
                 {fact.evidence.map((e, j) => (
                   <button
                     key={j}
-                    onClick={() => onPageClick(e.page_no)}
-                    className="text-xs px-2 py-1 bg-blue-100 text-blue-700 rounded hover:bg-blue-200 flex items-center gap-1"
+                    onClick={() => onPageClick(e.page_no, e.snippet)}
+                    className={`text-xs px-2 py-1 rounded flex items-center gap-1 ${
+                      e.grounding === 'NOT_FOUND'
+                        ? 'bg-red-100 text-red-700 hover:bg-red-200 line-through'
+                        : 'bg-blue-100 text-blue-700 hover:bg-blue-200'
+                    }`}
+                    title={
+                      e.grounding === 'NOT_FOUND' ? 'Quote not found in the document (unverified)' :
+                      e.grounding === 'RELOCATED' ? `Quote found on p.${e.page_no} (cited p.${e.cited_page_no})` :
+                      undefined
+                    }
                   >
                     p.{e.page_no}
                     <ExternalLink className="w-3 h-3" />
@@ -31,6 +31,7 @@ export function PVGISPanel({ verifications, onPageClick }: Props) {
   const lat = inputs.lat as number
   const lon = inputs.lon as number
   const source = inputs.declared_source as string
+  const yieldSource = outputs.yield_source as string | undefined
 
   const severityColors = {
     OK: 'bg-green-100 text-green-800 border-green-200',
@@ -76,6 +77,12 @@ export function PVGISPanel({ verifications, onPageClick }: Props) {
           <p className="text-xs text-gray-500 mb-1">PVGIS Estimate</p>
           <p className="text-xl font-bold text-blue-700">{pvgisYield?.toFixed(0)}</p>
           <p className="text-xs text-gray-500">kWh/kWp/year</p>
+          {yieldSource === "OFFLINE_GRID" && (
+            <p className="text-xs text-blue-500 mt-1">*Offline grid (PVGIS unavailable)</p>
+          )}
+          {yieldSource === "COUNTRY_TYPICAL" && (
+            <p className="text-xs text-amber-600 mt-1">*Country typical yield (PVGIS unavailable, not location-specific)</p>
+          )}
         </div>
       </div>
 
@@ -120,7 +127,9 @@ export function PVGISPanel({ verifications, onPageClick }: Props) {
 
       {/* PVGIS attribution */}
       <p className="text-xs text-gray-400 mt-4">
-        Data source: EU JRC PVGIS 5.2
+        Data source: {yieldSource === "COUNTRY_TYPICAL"
+          ? 'typical yield for the country (PVGIS unavailable)'
+          : `EU JRC PVGIS 5.2${yieldSource === "OFFLINE_GRID" ? ' (offline grid)' : ''}`}
       </p>
     </div>
   )
@@ -1,5 +1,7 @@
-import { X, ChevronLeft, ChevronRight } from 'lucide-react'
+import { useEffect, useState } from 'react'
+import { X, ChevronLeft, ChevronRight, Maximize2 } from 'lucide-react'
 import { API_BASE } from '../config'
+import type { SnippetMatch } from '../types'
 
 interface Props {
   docId: string
@@ -7,9 +9,33 @@ interface Props {
   totalPages: number
   onClose: () => void
   onNavigate: (page: number) => void
+  snippet?: string | null
 }
 
-export function PageViewer({ docId, pageNo, totalPages, onClose, onNavigate }: Props) {
+type PageSize = 'thumb' | 'screen' | 'full'
+
+function pageUrl(docId: string, pageNo: number, size: PageSize) {
+  return `${API_BASE}/api/page/${docId}/${pageNo}?size=${size}`
+}
+
+export function PageViewer({ docId, pageNo, totalPages, onClose, onNavigate, snippet }: Props) {
+  const [matches, setMatches] = useState<SnippetMatch[]>([])
+
+  // Resolve the evidence snippet to word boxes for highlighting
+  useEffect(() => {
+    setMatches([])
+    if (!snippet) return
+    const params = new URLSearchParams({ snippet, page_no: String(pageNo) })
+    let cancelled = false
+    fetch(`${API_BASE}/api/locate/${docId}?${params}`)
+      .then(res => (res.ok ? res.json() : { matches: [] }))
+      .then(data => { if (!cancelled) setMatches(data.matches) })
+      .catch(() => {})
+    return () => { cancelled = true }
+  }, [docId, snippet, pageNo])
+
+  const highlight = matches.find(m => m.page_no === pageNo)
+
   return (
     <div className="fixed inset-0 bg-black/70 flex items-center justify-center z-50 p-4">
       <div className="bg-white rounded-xl shadow-2xl max-w-4xl w-full max-h-[90vh] flex flex-col">
@@ -34,18 +60,61 @@ export function PageViewer({ docId, pageNo, totalPages, onClose, onNavigate }: P
               <ChevronRight className="w-5 h-5" />
             </button>
           </div>
-          <button onClick={onClose} className="p-2 hover:bg-gray-100 rounded">
-            <X className="w-5 h-5" />
-          </button>
+          <div className="flex items-center gap-2">
+            <a
+              href={pageUrl(docId, pageNo, 'full')}
+              target="_blank"
+              rel="noreferrer"
+              className="p-2 hover:bg-gray-100 rounded"
+              title="Full size"
+            >
+              <Maximize2 className="w-5 h-5" />
+            </a>
+            <button onClick={onClose} className="p-2 hover:bg-gray-100 rounded">
+              <X className="w-5 h-5" />
+            </button>
+          </div>
         </div>
 
         {/* Image */}
         <div className="flex-1 overflow-auto p-4 bg-gray-100">
-          <img
-            src={`${API_BASE}/api/page/${docId}/${pageNo}`}
-            alt={`Page ${pageNo}`}
-            className="max-w-full mx-auto shadow-lg"
-          />
+          <div className="relative w-fit max-w-full mx-auto shadow-lg">
+            <img
+              src={pageUrl(docId, pageNo, 'screen')}
+              alt={`Page ${pageNo}`}
+              className="block max-w-full"
+            />
+            {highlight?.boxes.map(([x0, y0, x1, y1], i) => (
+              <div
+                key={i}
+                className="absolute bg-yellow-300/40 border border-yellow-500 rounded-sm pointer-events-none"
+                style={{
+                  left: `${(x0 / highlight.page_width) * 100}%`,
+                  top: `${(y0 / highlight.page_height) * 100}%`,
+                  width: `${((x1 - x0) / highlight.page_width) * 100}%`,
+                  height: `${((y1 - y0) / highlight.page_height) * 100}%`,
+                }}
+              />
+            ))}
+          </div>
+        </div>
+
+        {/* Thumbnail strip */}
+        <div className="flex gap-2 overflow-x-auto p-2 border-t">
+          {Array.from({ length: totalPages }, (_, i) => i + 1).map((n) => (
+            <button
+              key={n}
+              onClick={() => onNavigate(n)}
+              className={`shrink-0 border-2 rounded ${n === pageNo ? 'border-blue-500' : 'border-transparent'}`}
+            >
+              <img
+                src={pageUrl(docId, n, 'thumb')}
+                alt={`Page ${n}`}
+                loading="lazy"
+                className="h-20 w-auto"
+              />
+            </button>
+          ))}
         </div>
       </div>
     </div>
@@ -1,6 +1,9 @@
 export interface Evidence {
   page_no: number
   snippet: string
+  grounding?: 'VERIFIED' | 'RELOCATED' | 'NOT_FOUND' | null
+  grounding_score?: number | null
+  cited_page_no?: number | null
 }
 
 export interface ExtractedFact {
@@ -9,6 +12,7 @@ export interface ExtractedFact {
   unit: string | null
   confidence: number
   evidence: Evidence[]
+  source?: 'llm' | 'rules'
 }
 
 export interface VerificationResult {
@@ -23,6 +27,7 @@ export interface VerificationResult {
   why: string
   pages_to_verify: number[]
   evidence: Evidence[]
+  duration_ms?: number | null
 }
 
 export interface RedFlag {
@@ -50,6 +55,8 @@ export interface PageInfo {
   page_no: number
   has_text: boolean
   char_count: number
+  relevance: number
+  sent_to_llm: boolean
 }
 
 export interface DocumentMeta {
@@ -60,6 +67,14 @@ export interface DocumentMeta {
   created_at: string
 }
 
+export interface SpanTiming {
+  name: string
+  labels: Record<string, string>
+  calls: number
+  total_ms: number
+  max_ms: number
+}
+
 export interface AnalysisReport {
   document: DocumentMeta
   page_info: PageInfo[]
@@ -67,4 +82,63 @@ export interface AnalysisReport {
   verifications: VerificationResult[]
   red_flags: RedFlag[]
   scorecard: ScoreCard
+  timings?: SpanTiming[] | null
+}
+
+export interface ReportSummary {
+  doc_id: string
+  sha256: string
+  filename: string
+  created_at: string
+  traffic_light: string
+  evidence_coverage: number
+  consistency: number
+  feasibility: number
+  country_code: string | null
+  power_kwp: number | null
+  pvgis_delta_pct: number | null
+  report_url: string
+}
+
+export interface ReportList {
+  total: number
+  limit: number
+  offset: number
+  items: ReportSummary[]
+}
+
+export interface SnippetMatch {
+  page_no: number
+  score: number
+  page_width: number
+  page_height: number
+  boxes: [number, number, number, number][]
+}
+
+export interface SnippetLocation {
+  doc_id: string
+  snippet: string
+  matches: SnippetMatch[]
+}
+
+export interface JobStage {
+  name: string
+  status: string
+  started_at: string | null
+  finished_at: string | null
+  duration_ms: number | null
+}
+
+export interface JobStatus {
+  job_id: string
+  doc_id: string
+  filename: string
+  state: string
+  stages: JobStage[]
+  queue_position: number | null
+  submitted_at: string
+  started_at: string | null
+  finished_at: string | null
+  error: string | null
+  report_url: string | null
 }